@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Measures how many notifications per second ktm accepts on its Unix domain
+socket, sent as lines and as length prefixed frames without waiting for the
+answers, compared to Notify calls via D-Bus.
+
+The daemon runs with the null renderer, so drawing doesn't count. Needs a
+session bus without another notification daemon, e.g.
+
+    dbus-run-session -- python -m benchmarks.bench_ingest [-n NOTIFICATIONS]
+"""
+
+from __future__ import absolute_import, print_function
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import struct
+import tempfile
+import threading
+import time
+
+from gi.repository import Gio
+
+from benchmarks.bench_transport import notify, start_daemon, stop_daemon
+
+
+def frames(count, prefixed):
+    data = []
+    for i in range(count):
+        message = json.dumps({"app_name": "bench", "summary": "summary {}"
+                              .format(i), "body": "body"}).encode("utf-8")
+        if prefixed:
+            data.append(struct.pack(">I", len(message)) + message)
+        else:
+            data.append(message + b"\n")
+    return b"".join(data)
+
+
+def send(path, data):
+    """
+    Sends data while reading the answers.
+
+    @returns: the answers.
+    """
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.connect(path)
+
+    def write():
+        client.sendall(data)
+        client.shutdown(socket.SHUT_WR)
+    writer = threading.Thread(target=write)
+    writer.start()
+
+    answers = []
+    chunk = client.recv(65536)
+    while chunk:
+        answers.append(chunk)
+        chunk = client.recv(65536)
+    writer.join()
+    client.close()
+    return b"".join(answers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-n", "--notifications", type=int, default=20000)
+    args = parser.parse_args()
+
+    if not os.environ.get("DBUS_SESSION_BUS_ADDRESS"):
+        parser.error("no session bus, run under dbus-run-session")
+
+    connection = Gio.bus_get_sync(Gio.BusType.SESSION, None)
+    tempDir = tempfile.mkdtemp()
+    path = os.path.join(tempDir, "ktm.sock")
+    daemon = start_daemon("dbus", os.path.join(tempDir, "history"),
+                          connection, options=["--socket", path])
+    try:
+        while not os.path.exists(path):
+            time.sleep(0.05)
+
+        for name, prefixed in (("lines", False), ("prefixed", True)):
+            data = frames(args.notifications, prefixed)
+            start = time.time()
+            answers = send(path, data)
+            elapsed = time.time() - start
+            if answers.count(b'"id"') != args.notifications:
+                raise RuntimeError("not every notification was accepted")
+            print("{:8} {:10.0f} notifications/s".format(
+                name, args.notifications / elapsed))
+
+        calls = min(args.notifications, 2000)
+        start = time.time()
+        for i in range(calls):
+            notify(connection, "summary {}".format(i), {})
+        print("{:8} {:10.0f} notifications/s".format(
+            "dbus", calls / (time.time() - start)))
+    finally:
+        stop_daemon(daemon)
+        shutil.rmtree(tempDir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compares the incremental layout engine with a full re-layout of all windows
+after every change. Runs without a display.
+
+    python -m benchmarks.bench_layout [-w WINDOWS] [-r ROUNDS]
+"""
+
+from __future__ import absolute_import, print_function
+
+import argparse
+import timeit
+
+from ktm.layout import LayoutAnchor, LayoutDirection, LayoutEngine
+
+
+def make_engine(windows):
+    engine = LayoutEngine(
+        LayoutAnchor.SOUTH_EAST, LayoutDirection.VERTICAL, (0, 0, 0, 0),
+        (0, 0, 1920, 1080))
+    for id in range(windows):
+        engine.add(id, (300, 60 + id % 3))
+    engine.update()
+    return engine
+
+
+def churn(engine, windows, index, full):
+    """
+    Closes the window at index and opens a new one, like a burst of
+    notifications on a full screen does.
+    """
+    next_id = [windows]
+
+    def step():
+        engine.remove(engine._ids[index])
+        engine.add(next_id[0], (300, 60))
+        next_id[0] += 1
+        if full:
+            engine._invalidate()
+        engine.update()
+
+    return step
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-w", "--windows", type=int, default=50)
+    parser.add_argument("-r", "--rounds", type=int, default=20000)
+    args = parser.parse_args()
+
+    for name, index in [("newest", -1), ("middle", args.windows // 2),
+                        ("oldest", 0)]:
+        for full in (True, False):
+            engine = make_engine(args.windows)
+            seconds = timeit.timeit(
+                churn(engine, args.windows, index, full), number=args.rounds)
+            print("close {:6} {:11}: {:8.2f} us/change".format(
+                name, "full" if full else "incremental",
+                seconds / args.rounds * 1e6))
+
+
+if __name__ == '__main__':
+    main()
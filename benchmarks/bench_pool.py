@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compares the number of notification windows per second that can be shown
+and closed with and without the window pool. Needs a display.
+
+    python -m benchmarks.bench_pool [-c COUNT] [-p POOLSIZE]
+"""
+
+from __future__ import absolute_import, print_function
+
+import argparse
+import time
+
+from gi.repository import Gtk
+
+from ktm.icons import IconCache
+from ktm.pool import WindowPool
+from ktm.popup import Popup
+
+
+def run(count, pool_size):
+    pool = WindowPool(Popup, pool_size)
+    icons = IconCache()
+    visible = []
+    start = time.time()
+
+    for i in range(count):
+        win = pool.acquire()
+        win.set_contents(
+            u"Notification {}".format(i), u"<b>Body</b> of the notification",
+            icons.lookup(u"dialog-information"))
+        win.show_all()
+        visible.append(win)
+        # Keep a few windows on screen like the daemon does.
+        if len(visible) > 5:
+            pool.release(visible.pop(0))
+        while Gtk.events_pending():
+            Gtk.main_iteration()
+
+    for win in visible:
+        pool.release(win)
+    while Gtk.events_pending():
+        Gtk.main_iteration()
+
+    return count / (time.time() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-c", "--count", type=int, default=2000)
+    parser.add_argument("-p", "--pool-size", type=int, default=4)
+    args = parser.parse_args()
+
+    print("without pool: {:10.1f} notifications/s".format(run(args.count, 0)))
+    print("with pool:    {:10.1f} notifications/s".format(
+        run(args.count, args.pool_size)))
+
+
+if __name__ == '__main__':
+    main()
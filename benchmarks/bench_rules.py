@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Measures matching notifications against many rules with the combined
+matcher, compared to checking one regular expression per rule.
+
+    python -m benchmarks.bench_rules [-r RULES] [-n NOTIFICATIONS]
+"""
+
+from __future__ import absolute_import, print_function
+
+import argparse
+import random
+import re
+import time
+
+from ktm.notification import Notification
+from ktm.rules import RuleSet
+
+
+def make_rules(count, rng):
+    sections = []
+    for i in range(count):
+        kind = i % 4
+        if kind == 0:
+            condition = u"summary = alert {}".format(i)
+        elif kind == 1:
+            condition = u"body = build {} failed".format(i)
+        elif kind == 2:
+            condition = u"app_name = app{}\nurgency = critical".format(i)
+        else:
+            condition = u"hint.category = cat{}\nsummary = job".format(i)
+        sections.append(u"[rule{}]\n{}\naction = count\n".format(i, condition))
+    return u"\n".join(sections)
+
+
+def make_notifications(count, rules, rng):
+    notifications = []
+    for i in range(count):
+        n = rng.randrange(rules)
+        notifications.append(Notification(
+            u"app{}".format(n), u"", u"alert {} from the job".format(n),
+            u"the build {} failed after {} minutes ".format(n, i) * 4, [],
+            {u"urgency": 2, u"category": u"cat{}".format(n)}, -1))
+    return notifications
+
+
+def naive(ruleSet):
+    """
+    One regular expression and one check per condition and rule.
+    """
+    checks = []
+    for rule in ruleSet.rules:
+        conditions = []
+        for key in rule.keys:
+            if key[0] in ("summary", "body"):
+                conditions.append((key[0], re.compile(
+                    re.escape(key[1]), re.IGNORECASE)))
+            else:
+                conditions.append((key, None))
+        checks.append((rule, conditions))
+
+    def match(notification):
+        matched = []
+        for rule, conditions in checks:
+            for key, regex in conditions:
+                if regex is not None:
+                    if not regex.search(getattr(notification, key)):
+                        break
+                elif key[0] == "app_name":
+                    if notification.app_name.lower() != key[1]:
+                        break
+                elif key[0] == "urgency":
+                    if notification.urgency != key[1]:
+                        break
+                elif notification.hints.get(key[1]) != key[2]:
+                    break
+            else:
+                matched.append(rule.name)
+        return matched
+
+    return match
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-r", "--rules", type=int, default=1000)
+    parser.add_argument("-n", "--notifications", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    start = time.time()
+    ruleSet = RuleSet.from_string(make_rules(args.rules, rng))
+    print("compiling {} rules: {:.1f} ms".format(
+        args.rules, (time.time() - start) * 1000))
+
+    notifications = make_notifications(args.notifications, args.rules, rng)
+    for name, match in [("combined", ruleSet.match),
+                        ("one regex per rule", naive(ruleSet))]:
+        start = time.time()
+        for notification in notifications:
+            match(notification)
+        print("{:20} {:8.1f} us/notification".format(
+            name, (time.time() - start) / len(notifications) * 1e6))
+
+
+if __name__ == '__main__':
+    main()
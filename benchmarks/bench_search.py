@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Measures how long it takes to rebuild the search index from a history of
+many entries and to answer queries on it. Runs without a display.
+
+    python -m benchmarks.bench_search [-e ENTRIES]
+"""
+
+from __future__ import absolute_import, print_function
+
+import argparse
+import random
+import shutil
+import tempfile
+import time
+import timeit
+
+from ktm.history import History
+from ktm.notification import Notification
+from ktm.search import SearchIndex
+
+
+WORDS = (u"build deploy failed passed merge request review message mail "
+         u"meeting lunch calendar reminder battery update download code "
+         u"server alert disk backup friday monday invoice").split()
+WORDS += [u"word{}".format(i) for i in range(5000)]
+APPS = [u"mail", u"chat", u"ci", u"calendar", u"system"]
+
+
+def words(rng, count):
+    # Word frequencies roughly follow Zipf's law.
+    return u" ".join(
+        WORDS[min(int(rng.paretovariate(1.0)) - 1, len(WORDS) - 1)]
+        for x in range(count))
+
+
+def fill(history, entries):
+    rng = random.Random(42)
+    for i in range(entries):
+        summary = words(rng, 4)
+        body = words(rng, 12) + u" #{}".format(i)
+        history.append(i, Notification(
+            rng.choice(APPS), u"", summary, body, [], {}, -1))
+    history.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-e", "--entries", type=int, default=100000)
+    args = parser.parse_args()
+
+    path = tempfile.mkdtemp()
+    try:
+        history = History(path)
+        fill(history, args.entries)
+
+        start = time.time()
+        index = SearchIndex()
+        for entry in history.scan():
+            index.add(entry["seq"], entry["app_name"], entry["summary"],
+                      entry["body"])
+        print("rebuild of {} entries: {:.2f} s".format(
+            args.entries, time.time() - start))
+
+        for query in [u"2fa", u"build", u"deploy failed", u"mail invoice",
+                      u"word42 code", u"#{}".format(args.entries // 2)]:
+            number = 20
+            seconds = timeit.timeit(
+                lambda: index.search(query, 0, 20), number=number)
+            print("{:24} {:8.3f} ms".format(
+                repr(query), seconds / number * 1000))
+
+        history.shutdown()
+    finally:
+        shutil.rmtree(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Measures how long ktm takes from being started until it owns the
+notification bus name and until it shows the first notification, which is
+sent as soon as the name is owned, like a notification that caused D-Bus
+activation.
+
+Needs a session bus without another notification daemon and, for the Gtk
+renderer, a display, e.g.
+
+    dbus-run-session -- python -m benchmarks.bench_startup [-r RUNS]
+"""
+
+from __future__ import absolute_import, print_function
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from gi.repository import GLib, Gio
+
+from benchmarks.bench_transport import BUS_NAME, OBJECT_PATH, notify, \
+    start_daemon, stop_daemon
+
+
+KTM_INTERFACE = "com.github.skalanux.ktm"
+
+
+def startup_times(connection):
+    times, = connection.call_sync(
+        BUS_NAME, OBJECT_PATH, KTM_INTERFACE, "GetStartupTimes", None,
+        GLib.VariantType("(a{sd})"), Gio.DBusCallFlags.NONE, -1,
+        None).unpack()
+    return times
+
+
+def run(transport, renderer, connection):
+    historyDir = tempfile.mkdtemp()
+    start = time.time()
+    daemon = start_daemon(transport, historyDir, connection, renderer)
+    try:
+        owned = time.time() - start
+        notify(connection, "first", {})
+        replied = time.time() - start
+
+        deadline = time.time() + 30
+        times = startup_times(connection)
+        while "first_popup" not in times and time.time() < deadline:
+            time.sleep(0.01)
+            times = startup_times(connection)
+    finally:
+        stop_daemon(daemon)
+        shutil.rmtree(historyDir)
+
+    return owned, replied, times.get("name_owned", float("nan")), \
+        times.get("first_popup", float("nan"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-r", "--runs", type=int, default=5)
+    parser.add_argument("--renderer", choices=["gtk", "null"], default="gtk")
+    args = parser.parse_args()
+
+    if not os.environ.get("DBUS_SESSION_BUS_ADDRESS"):
+        parser.error("no session bus, run under dbus-run-session")
+
+    connection = Gio.bus_get_sync(Gio.BusType.SESSION, None)
+    print("times in ms: name owned and first Notify answered as seen by the "
+          "client, name owned and first popup as measured by ktm")
+    for transport in ("dbus", "gdbus"):
+        results = [run(transport, args.renderer, connection)
+                   for i in range(args.runs)]
+        best = [min(x) * 1000 for x in zip(*results)]
+        print("{:6} {:8.1f} {:8.1f} {:8.1f} {:8.1f}".format(
+            transport, *best))
+
+
+if __name__ == '__main__':
+    main()
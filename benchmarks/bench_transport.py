@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Measures the cost of Notify calls with the dbus-python and the GDBus
+transport: the round trip of a small notification and the throughput of
+notifications carrying raw image data.
+
+The daemon runs with the null renderer, so drawing doesn't count. Needs a
+session bus without another notification daemon, e.g.
+
+    dbus-run-session -- python -m benchmarks.bench_transport [-n CALLS]
+"""
+
+from __future__ import absolute_import, print_function
+
+import argparse
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+from gi.repository import GLib, Gio
+
+
+BUS_NAME = "org.freedesktop.Notifications"
+OBJECT_PATH = "/org/freedesktop/Notifications"
+
+
+def start_daemon(transport, historyDir, connection, renderer="null",
+                 options=()):
+    daemon = subprocess.Popen([
+        sys.executable, "-m", "ktm.ktm", "--renderer", renderer,
+        "--transport", transport, "--history-dir", historyDir,
+        "--rate-limit", "0", "--no-coalesce"] + list(options))
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        owned, = connection.call_sync(
+            "org.freedesktop.DBus", "/org/freedesktop/DBus",
+            "org.freedesktop.DBus", "NameHasOwner",
+            GLib.Variant("(s)", (BUS_NAME,)), GLib.VariantType("(b)"),
+            Gio.DBusCallFlags.NONE, -1, None).unpack()
+        if owned:
+            return daemon
+        time.sleep(0.05)
+    daemon.kill()
+    raise RuntimeError("ktm didn't claim {}.".format(BUS_NAME))
+
+
+def stop_daemon(daemon):
+    daemon.send_signal(signal.SIGINT)
+    try:
+        daemon.wait()
+    except KeyboardInterrupt:
+        daemon.kill()
+
+
+def notify(connection, summary, hints):
+    return connection.call_sync(
+        BUS_NAME, OBJECT_PATH, BUS_NAME, "Notify",
+        GLib.Variant("(susssasa{sv}i)", (
+            "bench", 0, "", summary, "body", [], hints, 1000)),
+        GLib.VariantType("(u)"), Gio.DBusCallFlags.NONE, -1, None)
+
+
+def image_hint(size):
+    rowstride = size * 4
+    data = bytes(bytearray(range(256))) * (rowstride * size // 256)
+    return GLib.Variant("(iiibiiay)", (size, size, rowstride, True, 8, 4,
+                                       data))
+
+
+def run(transport, calls, images, imageSize, connection):
+    historyDir = tempfile.mkdtemp()
+    daemon = start_daemon(transport, historyDir, connection)
+    try:
+        # Warm up, the first calls load modules.
+        for i in range(20):
+            notify(connection, "warm up {}".format(i), {})
+
+        start = time.time()
+        for i in range(calls):
+            notify(connection, "summary {}".format(i), {})
+        perCall = (time.time() - start) / calls * 1e6
+
+        hints = {"image-data": image_hint(imageSize)}
+        start = time.time()
+        for i in range(images):
+            notify(connection, "image {}".format(i), hints)
+        elapsed = time.time() - start
+        megabytes = images * imageSize * imageSize * 4 / float(1024 * 1024)
+    finally:
+        stop_daemon(daemon)
+        shutil.rmtree(historyDir)
+
+    print("{:6} {:8.1f} us/call {:8.1f} MiB/s with {}x{} images".format(
+        transport, perCall, megabytes / elapsed, imageSize, imageSize))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-n", "--calls", type=int, default=2000)
+    parser.add_argument("-i", "--images", type=int, default=200)
+    parser.add_argument("-s", "--image-size", type=int, default=256)
+    args = parser.parse_args()
+
+    if not os.environ.get("DBUS_SESSION_BUS_ADDRESS"):
+        parser.error("no session bus, run under dbus-run-session")
+
+    connection = Gio.bus_get_sync(Gio.BusType.SESSION, None)
+    for transport in ("dbus", "gdbus"):
+        run(transport, args.calls, args.images, args.image_size, connection)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+#   This file is part of ktm.
+#
+#   ktm is free software; you can redistribute it and/or modify it under the
+#   terms of the GNU General Public License as published by the Free Software
+#   Foundation; either version 3 of the License, or (at your option) any
+#   later version. See the LICENSE file for details.
+
+
+class AliasMap(object):
+    """
+    Maps the IDs of notifications merged into another one (aliases) to the ID
+    of the notification shown for all of them (the primary).
+
+    IDs that are no alias are their own primary.
+    """
+
+    def __init__(self):
+        # alias -> primary
+        self._primary = {}
+        # primary -> [alias, ...] in the order they were added
+        self._aliases = {}
+
+    def add(self, alias, primary):
+        """
+        Makes alias an alias of primary, or of primary's primary if primary is
+        an alias itself.
+
+        @returns: the primary alias was added to.
+        """
+        primary = self._primary.get(primary, primary)
+        if alias == primary:
+            raise ValueError("A notification can't be its own alias.")
+        self.remove(alias)
+        self._primary[alias] = primary
+        self._aliases.setdefault(primary, []).append(alias)
+        return primary
+
+    def remove(self, alias):
+        """
+        Detaches a single alias from its primary.
+
+        @returns: the primary alias was detached from or None.
+        """
+        primary = self._primary.pop(alias, None)
+        if primary is not None:
+            aliases = self._aliases[primary]
+            aliases.remove(alias)
+            if not aliases:
+                del self._aliases[primary]
+        return primary
+
+    def pop(self, primary):
+        """
+        Detaches all aliases from primary.
+
+        @returns: the list of aliases, oldest first.
+        """
+        aliases = self._aliases.pop(primary, [])
+        for alias in aliases:
+            del self._primary[alias]
+        return aliases
+
+    def primary(self, id):
+        return self._primary.get(id, id)
+
+    def __contains__(self, id):
+        return id in self._primary
+
+    def __len__(self):
+        return len(self._primary)
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+#   This file is part of ktm.
+#
+#   ktm is free software; you can redistribute it and/or modify it under the
+#   terms of the GNU General Public License as published by the Free Software
+#   Foundation; either version 3 of the License, or (at your option) any
+#   later version. See the LICENSE file for details.
+
+import collections
+
+
+class LRUCache(object):
+    """
+    A bounded mapping that evicts the least recently used entry when it is
+    full. Counts hits and misses of get().
+
+    Besides the number of entries, the cache can be bounded by the total
+    weight of its values, e.g. their size in bytes.
+    """
+
+    def __init__(self, max_size=128, max_weight=None, weigh=None):
+        """
+        @param max_size: the maximum number of entries.
+        @param max_weight: the maximum total weight of all values or None.
+        @param weigh: callable returning the weight of a value. Needed if
+                      max_weight is given.
+        """
+        self._data = collections.OrderedDict()
+        self._weights = {}
+        self.max_size = max_size
+        self.max_weight = max_weight
+        self._weigh = weigh
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        """
+        @returns: the value cached for key, default if there is none.
+        """
+        try:
+            value = self._data.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+
+        self._data[key] = value
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """
+        Caches value for key, evicting the least recently used entries if the
+        cache is full. The new entry itself is never evicted, even if it
+        weighs more than max_weight on its own.
+        """
+        self.pop(key)
+        self._data[key] = value
+        if self._weigh is not None:
+            weight = self._weigh(value)
+            self._weights[key] = weight
+            self.weight += weight
+
+        self.trim()
+
+    def trim(self):
+        """
+        Evicts least recently used entries until the cache is within its
+        bounds again. The most recently used entry is always kept.
+        """
+        while len(self._data) > 1 and (
+                len(self._data) > self.max_size or
+                (self.max_weight is not None and
+                 self.weight > self.max_weight)):
+            oldKey, oldValue = self._data.popitem(last=False)
+            self.weight -= self._weights.pop(oldKey, 0)
+
+    def pop(self, key, default=None):
+        self.weight -= self._weights.pop(key, 0)
+        return self._data.pop(key, default)
+
+    def clear(self):
+        self._data.clear()
+        self._weights.clear()
+        self.weight = 0
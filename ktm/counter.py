@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+#   This file is part of ktm.
+#
+#   ktm is free software; you can redistribute it and/or modify it under the
+#   terms of the GNU General Public License as published by the Free Software
+#   Foundation; either version 3 of the License, or (at your option) any
+#   later version. See the LICENSE file for details.
+
+import io
+import os
+import tempfile
+
+
+def write_atomic(path, text):
+    """
+    Writes text to path so that readers see either the old or the new
+    contents, never a partially written file.
+    """
+    fd, tmpPath = tempfile.mkstemp(
+        prefix=os.path.basename(path) + ".", dir=os.path.dirname(path) or ".")
+    try:
+        with io.open(fd, "w") as fp:
+            fp.write(text)
+        os.rename(tmpPath, path)
+    except:
+        os.unlink(tmpPath)
+        raise
+
+
+class UnreadCounter(object):
+    """
+    Counts unread notifications in memory. The value is written to a file
+    for status bars by save(), which only touches the disk if the value
+    changed since the last save.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.value = 0
+        self.dirty = True
+
+    def increment(self):
+        self.value += 1
+        self.dirty = True
+        return self.value
+
+    def reset(self):
+        self.value = 0
+        self.dirty = True
+
+    def save(self):
+        """
+        Writes the value to the counter file if it changed.
+
+        @returns: True if the file was written, False otherwise.
+        """
+        if not self.dirty:
+            return False
+        write_atomic(self.path, u"{}".format(self.value))
+        self.dirty = False
+        return True
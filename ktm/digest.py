@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+#   This file is part of ktm.
+#
+#   ktm is free software; you can redistribute it and/or modify it under the
+#   terms of the GNU General Public License as published by the Free Software
+#   Foundation; either version 3 of the License, or (at your option) any
+#   later version. See the LICENSE file for details.
+
+import collections
+from xml.sax.saxutils import escape
+
+
+class Digest(object):
+    """
+    Collects notifications that are shown together in a single summary
+    notification instead of one window each.
+    """
+
+    def __init__(self, threshold=50):
+        """
+        @param threshold: the number of notifications after which the digest
+                          should be shown without waiting any longer.
+        """
+        self.threshold = threshold
+        # id -> (app_name, summary), in the order of arrival
+        self._items = collections.OrderedDict()
+
+    def add(self, id, app_name, summary):
+        """
+        Adds a notification, or updates it in place if id was already added.
+
+        @returns: True if the digest reached its threshold.
+        """
+        self._items[id] = (app_name, summary)
+        return len(self._items) >= self.threshold
+
+    def remove(self, id):
+        """
+        @returns: True if id was in the digest.
+        """
+        return self._items.pop(id, None) is not None
+
+    def groups(self):
+        """
+        @returns: a list of (app_name, [summary, ...]) grouped by application,
+                  in the order of arrival.
+        """
+        groups = collections.OrderedDict()
+        for app_name, summary in self._items.values():
+            groups.setdefault(app_name, []).append(summary)
+        return list(groups.items())
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, id):
+        return id in self._items
+
+    def __iter__(self):
+        """
+        Iterates over the IDs in the order of arrival.
+        """
+        return iter(list(self._items))
+
+
+def format_digest(groups, lines=3):
+    """
+    Formats the contents of a digest as a notification.
+
+    @param groups: the groups returned by Digest.groups.
+    @param lines: the number of summaries listed per application.
+    @returns: the summary and the body (pango markup) of the notification.
+    """
+    count = sum(len(summaries) for app_name, summaries in groups)
+    summary = u"{} notification{}".format(count, u"" if count == 1 else u"s")
+
+    body = []
+    for app_name, summaries in groups:
+        body.append(u"<b>{}</b> ({})".format(
+            escape(app_name or u"Unknown"), len(summaries)))
+        for text in summaries[-lines:]:
+            body.append(u"  " + escape(text))
+        if len(summaries) > lines:
+            body.append(u"  … and {} earlier".format(
+                len(summaries) - lines))
+    return summary, u"\n".join(body)
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+#   This file is part of ktm.
+#
+#   ktm is free software; you can redistribute it and/or modify it under the
+#   terms of the GNU General Public License as published by the Free Software
+#   Foundation; either version 3 of the License, or (at your option) any
+#   later version. See the LICENSE file for details.
+
+"""
+Exports a NotificationDaemon with GDBus instead of dbus-python.
+
+The methods and signals are the ones declared with the dbus.service
+decorators on the daemon, so both transports offer the same interfaces.
+Arguments are read from GVariants directly instead of being wrapped in
+dbus-python types field by field, and image data is handed on as GLib.Bytes
+without copying it byte by byte.
+"""
+
+from __future__ import absolute_import
+
+import logging
+
+from gi.repository import GLib, Gio
+
+
+BUS_NAME = "org.freedesktop.Notifications"
+
+try:
+    _text_type = unicode
+except NameError:
+    _text_type = str
+
+
+def _text(value):
+    return value if isinstance(value, _text_type) else value.decode("utf-8")
+
+
+def _unpack(variant):
+    """
+    Turns a GVariant into the Python values the daemon expects: strings are
+    unicode, hints a dict and raw image data a tuple ending in GLib.Bytes.
+    """
+    type = variant.get_type_string()
+    if type in ("s", "o", "g"):
+        return _text(variant.get_string())
+    elif type == "as":
+        return [_text(value) for value in variant.get_strv()]
+    elif type == "v":
+        return _unpack(variant.get_variant())
+    elif type == "a{sv}":
+        hints = {}
+        for x in range(variant.n_children()):
+            entry = variant.get_child_value(x)
+            hints[_text(entry.get_child_value(0).get_string())] = \
+                _unpack(entry.get_child_value(1))
+        return hints
+    elif type == "(iiibiiay)":
+        return tuple(variant.get_child_value(x).unpack() for x in range(6)) + \
+            (variant.get_child_value(6).get_data_as_bytes(),)
+    elif type.startswith("(") or \
+            (type.startswith("a") and type[1] not in "y{"):
+        # Structs and arrays of them, e.g. the notifications of NotifyMany.
+        values = [_unpack(variant.get_child_value(x))
+                  for x in range(variant.n_children())]
+        return tuple(values) if type.startswith("(") else values
+    return variant.unpack()
+
+
+def _split_signature(signature):
+    """
+    @returns: the list of complete types in a D-Bus signature.
+    """
+    types = []
+    itemType = GLib.VariantType.new("(" + signature + ")").first()
+    while itemType is not None:
+        types.append(itemType.dup_string())
+        itemType = itemType.next()
+    return types
+
+
+def dbus_members(cls):
+    """
+    @returns: the (name, function) pairs of the methods and signals declared
+              on cls with the dbus.service decorators, sorted by name.
+    """
+    members = {}
+    for klass in reversed(cls.__mro__):
+        for name, value in vars(klass).items():
+            if getattr(value, "_dbus_is_method", False) or \
+                    getattr(value, "_dbus_is_signal", False):
+                members[name] = value
+    return sorted(members.items())
+
+
+def introspection_xml(cls):
+    """
+    @returns: the D-Bus introspection data for the methods and signals of cls.
+    """
+    interfaces = {}
+    for name, member in dbus_members(cls):
+        lines = interfaces.setdefault(member._dbus_interface, [])
+        if getattr(member, "_dbus_is_method", False):
+            lines.append(u'<method name="{}">'.format(name))
+            for argName, type in zip(member._dbus_args,
+                    _split_signature(member._dbus_in_signature)):
+                lines.append(u'<arg name="{}" type="{}" direction="in"/>'
+                    .format(argName, type))
+            for type in _split_signature(member._dbus_out_signature):
+                lines.append(u'<arg type="{}" direction="out"/>'.format(type))
+            lines.append(u'</method>')
+        else:
+            lines.append(u'<signal name="{}">'.format(name))
+            for argName, type in zip(member._dbus_args,
+                    _split_signature(member._dbus_signature)):
+                lines.append(u'<arg name="{}" type="{}"/>'
+                    .format(argName, type))
+            lines.append(u'</signal>')
+
+    xml = [u"<node>"]
+    for interface, lines in sorted(interfaces.items()):
+        xml.append(u'<interface name="{}">'.format(interface))
+        xml.extend(lines)
+        xml.append(u"</interface>")
+    xml.append(u"</node>")
+    return u"\n".join(xml)
+
+
+class GDBusTransport(object):
+    """
+    Exports a daemon created without object path on a GDBus connection and
+    claims the notification bus name for it.
+    """
+
+    def __init__(self, daemon, objectPath, connection=None):
+        """
+        @param daemon: the NotificationDaemon to export.
+        @param objectPath: the object path to export it at.
+        @param connection: the Gio.DBusConnection, the session bus by
+                           default.
+        """
+        self._daemon = daemon
+        self._objectPath = objectPath
+        self._connection = connection or \
+            Gio.bus_get_sync(Gio.BusType.SESSION, None)
+
+        # (interface, name) -> (bound method, out signature)
+        self._methods = {}
+        for name, member in dbus_members(type(daemon)):
+            if getattr(member, "_dbus_is_method", False):
+                self._methods[(member._dbus_interface, name)] = \
+                    (getattr(daemon, name), member._dbus_out_signature)
+            else:
+                self._wrap_signal(name, member)
+
+        node = Gio.DBusNodeInfo.new_for_xml(introspection_xml(type(daemon)))
+        self._registrations = [
+            self._connection.register_object(
+                objectPath, interface, self._method_call, None, None)
+            for interface in node.interfaces]
+        self._ownerID = Gio.bus_own_name_on_connection(
+            self._connection, BUS_NAME, Gio.BusNameOwnerFlags.NONE,
+            self._name_acquired, None)
+
+    def _name_acquired(self, connection, name):
+        self._daemon.name_acquired()
+
+    def _wrap_signal(self, name, member):
+        """
+        Makes the signal method name of the daemon emit the signal on the
+        GDBus connection. The dbus-python signal itself emits nothing for an
+        object that isn't exported, but still runs its body.
+        """
+        emit = getattr(self._daemon, name)
+        signature = u"(" + member._dbus_signature + u")"
+        interface = member._dbus_interface
+
+        def signal(*args):
+            emit(*args)
+            self._connection.emit_signal(None, self._objectPath,
+                interface, name, GLib.Variant(signature, args))
+        setattr(self._daemon, name, signal)
+
+    def _method_call(self, connection, sender, objectPath, interfaceName,
+                     methodName, parameters, invocation):
+        method, outSignature = self._methods[(interfaceName, methodName)]
+        args = [_unpack(parameters.get_child_value(x))
+                for x in range(parameters.n_children())]
+
+        try:
+            result = method(*args)
+        except Exception as e:
+            logging.exception("Error in {}.{}".format(
+                interfaceName, methodName))
+            # Named like the errors dbus-python sends.
+            invocation.return_dbus_error(
+                "org.freedesktop.DBus.Python." + type(e).__name__, str(e))
+            return
+
+        if not outSignature:
+            invocation.return_value(None)
+            return
+        if len(_split_signature(outSignature)) == 1:
+            result = (result,)
+        invocation.return_value(
+            GLib.Variant(u"(" + outSignature + u")", tuple(result)))
+
+    def close(self):
+        """
+        Releases the bus name and unexports the daemon.
+        """
+        Gio.bus_unown_name(self._ownerID)
+        for registration in self._registrations:
+            self._connection.unregister_object(registration)
+        self._registrations = []
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+#   This file is part of ktm.
+#
+#   ktm is free software; you can redistribute it and/or modify it under the
+#   terms of the GNU General Public License as published by the Free Software
+#   Foundation; either version 3 of the License, or (at your option) any
+#   later version. See the LICENSE file for details.
+
+from __future__ import absolute_import
+
+import gi
+gi.require_version('Gtk', '3.0')
+from gi.repository import Gdk
+
+from ktm.icons import IconCache
+from ktm.monitors import MonitorGeometry, POINTER
+from ktm.pool import WindowPool
+from ktm.popup import Popup, set_text_limits
+from ktm.render import Renderer
+
+
+class GtkRenderer(Renderer):
+    """
+    Shows every notification in a Popup window. Hidden windows are kept in a
+    WindowPool for reuse and icons are decoded through an IconCache.
+
+    The workareas of the monitors are cached and only queried again when
+    the screen reports a change.
+    """
+
+    def __init__(self):
+        Renderer.__init__(self)
+        self._windows = {}
+        # The last size of every window the daemon was told about.
+        self._sizes = {}
+        self._pool = WindowPool(self._new_popup)
+        self._icons = IconCache()
+        # Tickets of the icons being loaded for windows on screen.
+        self._iconLoads = {}
+
+        self._screen = Gdk.Screen.get_default()
+        self._monitors = MonitorGeometry()
+        self._update_monitors()
+        self._screen.connect("monitors-changed", self._screen_changed)
+        self._screen.connect("size-changed", self._screen_changed)
+        # The monitor the pointer was on when the first of the windows on
+        # screen was shown. The others follow it instead of jumping to
+        # wherever the pointer is when they appear.
+        self._pointerMonitor = None
+
+    def set_pool_size(self, pool_size):
+        self._pool.max_size = pool_size
+
+    def pool_size(self):
+        return self._pool.max_size
+
+    pool_size = property(pool_size, set_pool_size)
+
+    def set_max_icon_size(self, max_icon_size):
+        self._icons.max_image_size = max_icon_size
+
+    def max_icon_size(self):
+        return self._icons.max_image_size
+
+    max_icon_size = property(max_icon_size, set_max_icon_size)
+
+    def set_icon_memory_budget(self, icon_memory_budget):
+        self._icons.memory_budget = icon_memory_budget
+
+    def icon_memory_budget(self):
+        return self._icons.memory_budget
+
+    icon_memory_budget = property(icon_memory_budget, set_icon_memory_budget)
+
+    def area(self):
+        if self.monitor != POINTER:
+            return self._monitors.area(self.monitor)
+        if self._pointerMonitor is None:
+            screen, x, y = self._screen.get_display().get_default_seat() \
+                .get_pointer().get_position()
+            self._pointerMonitor = self._monitors.monitor_at(x, y)
+        return self._monitors.area(self._pointerMonitor)
+
+    def _update_monitors(self):
+        workareas = []
+        for x in range(self._screen.get_n_monitors()):
+            rect = self._screen.get_monitor_workarea(x)
+            workareas.append((rect.x, rect.y, rect.width, rect.height))
+        self._monitors.update(workareas, self._screen.get_primary_monitor())
+
+    def _screen_changed(self, screen):
+        self._update_monitors()
+        self._pointerMonitor = None
+        self.area_changed()
+
+    def show(self, id, summary, body, icon=None, count=1, earlier=()):
+        """
+        Fills the window for id, reusing the window already showing id or a
+        pooled one. A pooled window goes back to the pool if it can't be
+        filled, the daemon only hides windows it got a size for.
+        """
+        win = self._windows.get(id)
+        if win is not None:
+            return self._fill(id, win, summary, body, icon, count, earlier)
+
+        win = self._pool.acquire()
+        try:
+            size = self._fill(id, win, summary, body, icon, count, earlier)
+        except Exception:
+            self._cancel_icon_load(id)
+            self._sizes.pop(id, None)
+            self._pool.release(win)
+            raise
+        self._windows[id] = win
+        return size
+
+    def _fill(self, id, win, summary, body, icon, count, earlier):
+        win.notification_id = id
+
+        # A load for previous contents of the window is no longer needed.
+        self._cancel_icon_load(id)
+        pixbuf, ticket = self._icons.request(
+            icon, lambda pixbuf: self._icon_loaded(id, pixbuf))
+        if ticket is not None:
+            self._iconLoads[id] = ticket
+
+        win.set_contents(summary, body, pixbuf, count, earlier)
+
+        # The window's size has default values before showing it.
+        win.show_all()
+
+        self._sizes[id] = win.get_size()
+        return self._sizes[id]
+
+    def hide(self, id):
+        self._cancel_icon_load(id)
+        del self._sizes[id]
+        self._pool.release(self._windows.pop(id))
+        if not self._windows:
+            self._pointerMonitor = None
+
+    def move(self, id, x, y):
+        self._windows[id].move(x, y)
+
+    def set_text_limits(self, max_chars, max_lines):
+        set_text_limits(max_chars, max_lines)
+
+    def _new_popup(self):
+        win = Popup()
+        win.connect("button-press-event", self._window_clicked)
+        win.connect("size-allocate", self._window_allocated)
+        return win
+
+    def _window_clicked(self, widget, event):
+        self.clicked(widget.notification_id)
+
+    def _window_allocated(self, widget, allocation):
+        """
+        Reports windows that changed their size by themselves, e.g. when the
+        list of earlier notifications was expanded.
+        """
+        id = widget.notification_id
+        size = (allocation.width, allocation.height)
+        if id in self._sizes and self._sizes[id] != size:
+            self._sizes[id] = size
+            self.resized(id, size)
+
+    def _icon_loaded(self, id, pixbuf):
+        """
+        Replaces the placeholder in the window of id with the icon loaded for
+        it.
+        """
+        del self._iconLoads[id]
+        win = self._windows[id]
+        win.set_icon(pixbuf)
+        win.resize(1, 1)
+        self._sizes[id] = win.get_size()
+        self.resized(id, self._sizes[id])
+
+    def _cancel_icon_load(self, id):
+        ticket = self._iconLoads.pop(id, None)
+        if ticket is not None:
+            self._icons.cancel(ticket)
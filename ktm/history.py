@@ -0,0 +1,378 @@
+# -*- coding: utf-8 -*-
+#   This file is part of ktm.
+#
+#   ktm is free software; you can redistribute it and/or modify it under the
+#   terms of the GNU General Public License as published by the Free Software
+#   Foundation; either version 3 of the License, or (at your option) any
+#   later version. See the LICENSE file for details.
+
+import errno
+import io
+import json
+import logging
+import numbers
+import os
+import struct
+import threading
+import time
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+try:
+    text_type = unicode
+except NameError:
+    text_type = str
+
+
+# Close reason used for notifications that were replaced by a newer one. The
+# specification only defines the reasons 1 to 4.
+REASON_REPLACED = 5
+
+# One index record per entry: segment number, offset and length of the entry
+# in the segment, close reason (0 while open) and close time.
+_INDEX = struct.Struct("<IQIId")
+_INDEX_CLOSE = struct.Struct("<Id")
+_INDEX_CLOSE_OFFSET = 16
+
+
+def _hints_metadata(hints):
+    """
+    @returns: the hints that are plain numbers or strings. Image data and
+              other structures are left out.
+    """
+    metadata = {}
+    for key, value in hints.items():
+        if isinstance(value, numbers.Number):
+            metadata[text_type(key)] = value + 0
+        elif isinstance(value, text_type):
+            metadata[text_type(key)] = text_type(value)
+    return metadata
+
+
+class History(object):
+    """
+    Keeps every notification in an append-only log on disk.
+
+    Entries are numbered consecutively, starting with 0. They are written as
+    JSON lines to segment files of about segment_size bytes. A fixed-width
+    index file maps an entry number to its position in the log, so looking
+    up an entry or reading the last n entries doesn't depend on the size of
+    the history, and nothing but the next entry number is kept in memory.
+
+    append() and close() only queue the work; a writer thread writes it in
+    batches. Until then the queued entries and closes are kept in memory as
+    well, so reading never waits for the writer thread.
+
+    Entries are looked up by their number, not by notification ID: the IDs
+    start over with every session of the daemon.
+    """
+
+    def __init__(self, path, segment_size=4 * 1024 * 1024):
+        """
+        @param path: the directory the history is stored in. It is created
+                     if it doesn't exist. Like the files in it, it is only
+                     accessible to the user, notifications may contain
+                     private messages.
+        @param segment_size: the size in bytes after which a new segment is
+                             started.
+        """
+        self.path = path
+        self.segment_size = segment_size
+
+        try:
+            os.makedirs(path, 0o700)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+        self._indexPath = os.path.join(path, "index")
+        # Not opened for appending, closing an entry updates its record.
+        self._index = io.open(
+            os.open(self._indexPath, os.O_RDWR | os.O_CREAT, 0o600), "r+b")
+        self._index.seek(0, os.SEEK_END)
+        self._count = self._index.tell() // _INDEX.size
+        # Drop a partially written record of a crashed daemon.
+        self._index.truncate(self._count * _INDEX.size)
+
+        if self._count:
+            self._segment, offset, length = \
+                self._read_index(self._count - 1)[:3]
+            end = offset + length
+        else:
+            self._segment, end = 0, 0
+        self._trim_log(self._segment, end)
+        segment = self._segment + 1
+        while os.path.exists(self._segment_path(segment)):
+            self._trim_log(segment, 0)
+            segment += 1
+        self._log = self._open_segment(self._segment)
+
+        # Entries and closes queued but not written yet: {seq: entry} and
+        # {seq: (reason, closed)}, shared with the writer thread.
+        self._lock = threading.Lock()
+        self._unwritten = {}
+        self._unwrittenCloses = {}
+
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_batches)
+        self._writer.daemon = True
+        self._writer.start()
+
+    def __len__(self):
+        return self._count
+
+    def _segment_path(self, segment):
+        return os.path.join(self.path, "{:08d}.log".format(segment))
+
+    def _open_segment(self, segment):
+        """
+        @returns: the segment opened for appending.
+        """
+        return io.open(os.open(self._segment_path(segment),
+            os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600), "ab")
+
+    def _trim_log(self, segment, end):
+        """
+        Cuts off what a crashed daemon left in a segment after the last
+        indexed entry, which ends at end: entries without index record and a
+        partially written line. Close records are kept, the index has them.
+        """
+        path = self._segment_path(segment)
+        if not os.path.exists(path):
+            return
+        with io.open(path, "r+b") as fp:
+            fp.seek(end)
+            keep = end
+            for line in fp:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line.decode("utf-8"))
+                except ValueError:
+                    break
+                if "summary" in record:
+                    break
+                keep += len(line)
+            if keep < fp.seek(0, os.SEEK_END):
+                logging.warning("Dropping {} bytes of unindexed history at "
+                    "the end of {}.".format(fp.tell() - keep, path))
+                fp.truncate(keep)
+
+    def append(self, id, notification, created=None):
+        """
+        Adds a notification to the history.
+
+        @param id: the ID of the notification.
+        @param notification: the Notification.
+        @param created: the time the notification arrived, default: now.
+        @returns: the number of the new entry.
+        """
+        seq = self._count
+        self._count += 1
+        entry = {
+            "seq": seq,
+            "id": int(id),
+            "app_name": text_type(notification.app_name),
+            "summary": text_type(notification.summary),
+            "body": text_type(notification.body),
+            "hints": _hints_metadata(notification.hints),
+            "created": time.time() if created is None else created,
+        }
+        with self._lock:
+            self._unwritten[seq] = entry
+        self._queue.put(("append", seq, entry))
+        return seq
+
+    def close(self, seq, reason, closed=None):
+        """
+        Records that the notification of entry seq was closed.
+
+        @param seq: the number of the entry.
+        @param reason: the reason the notification was closed for.
+        @param closed: the time the notification was closed, default: now.
+        """
+        close = (int(reason), time.time() if closed is None else closed)
+        with self._lock:
+            self._unwrittenCloses[seq] = close
+        self._queue.put(("close", seq, close))
+
+    def flush(self):
+        """
+        Waits until everything queued so far has been written.
+        """
+        self._queue.join()
+
+    def shutdown(self):
+        """
+        Writes everything queued and stops the writer thread.
+        """
+        self._queue.put(None)
+        self._writer.join()
+        self._log.close()
+        self._index.close()
+
+    def _write_batches(self):
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < 512:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            try:
+                for item in batch:
+                    if item is None:
+                        return
+                    self._write(*item)
+                self._log.flush()
+                self._index.flush()
+            except (IOError, OSError):
+                logging.exception("Could not write the history.")
+            finally:
+                with self._lock:
+                    for item in batch:
+                        if item is None:
+                            continue
+                        op, seq, data = item
+                        unwritten = self._unwritten if op == "append" else \
+                            self._unwrittenCloses
+                        if unwritten.get(seq) is data:
+                            del unwritten[seq]
+                for item in batch:
+                    self._queue.task_done()
+
+    def _write(self, op, seq, data):
+        if op == "append":
+            line = (json.dumps(data, sort_keys=True) + "\n").encode("utf-8")
+            offset = self._log.tell()
+            if offset and offset + len(line) > self.segment_size:
+                self._log.close()
+                self._segment += 1
+                self._log = self._open_segment(self._segment)
+                offset = 0
+            self._log.write(line)
+            self._index.seek(seq * _INDEX.size)
+            self._index.write(
+                _INDEX.pack(self._segment, offset, len(line), 0, 0.0))
+        else:
+            reason, closed = data
+            # The log stays append-only, the close is recorded there as well
+            # so the index can be rebuilt from it.
+            line = json.dumps({"seq": seq, "reason": reason,
+                               "closed": closed}) + "\n"
+            self._log.write(line.encode("utf-8"))
+            self._index.seek(seq * _INDEX.size + _INDEX_CLOSE_OFFSET)
+            self._index.write(_INDEX_CLOSE.pack(reason, closed))
+
+    def _read_index(self, seq):
+        with io.open(self._indexPath, "rb") as fp:
+            fp.seek(seq * _INDEX.size)
+            return _INDEX.unpack(fp.read(_INDEX.size))
+
+    def _read_entries(self, seqs):
+        """
+        @returns: the entries for the numbers in seqs, which must exist.
+        """
+        # Taken before reading the files: whatever the writer thread removes
+        # from memory in the meantime is on disk by then.
+        with self._lock:
+            unwritten = dict((seq, self._unwritten[seq]) for seq in seqs
+                             if seq in self._unwritten)
+            closes = dict((seq, self._unwrittenCloses[seq]) for seq in seqs
+                          if seq in self._unwrittenCloses)
+
+        entries = []
+        index = None
+        logs = {}
+        try:
+            for seq in seqs:
+                if seq in unwritten:
+                    entry = dict(unwritten[seq])
+                    reason, closed = 0, 0.0
+                else:
+                    if index is None:
+                        index = io.open(self._indexPath, "rb")
+                    index.seek(seq * _INDEX.size)
+                    segment, offset, length, reason, closed = \
+                        _INDEX.unpack(index.read(_INDEX.size))
+                    if segment not in logs:
+                        logs[segment] = io.open(
+                            self._segment_path(segment), "rb")
+                    log = logs[segment]
+                    log.seek(offset)
+                    entry = json.loads(log.read(length).decode("utf-8"))
+                reason, closed = closes.get(seq, (reason, closed))
+                entry["reason"] = reason
+                entry["closed"] = closed if reason else None
+                entries.append(entry)
+        finally:
+            if index is not None:
+                index.close()
+            for log in logs.values():
+                log.close()
+
+        return entries
+
+    def get(self, seq):
+        """
+        @returns: the entry seq as a dict, or None if there is no such entry.
+        """
+        if not 0 <= seq < self._count:
+            return None
+        return self._read_entries([seq])[0]
+
+    def entries(self, seqs):
+        """
+        @returns: the entries for the numbers in seqs, skipping unknown ones.
+        """
+        return self._read_entries(
+            [seq for seq in seqs if 0 <= seq < self._count])
+
+    def scan(self, stop=None):
+        """
+        Reads the whole log in order, e.g. to rebuild an index.
+
+        @param stop: the entry number to stop at, default: the number of
+                     entries when scan is called.
+        @returns: an iterator over the entries, without close information.
+        """
+        stop = self._count if stop is None else stop
+        # The entries that are not written yet are the newest ones. Those
+        # written while the log is read are read twice, and skipped the
+        # second time.
+        with self._lock:
+            unwritten = sorted(self._unwritten.items())
+        next = 0
+
+        segment = 0
+        while os.path.exists(self._segment_path(segment)):
+            with io.open(self._segment_path(segment), "rb") as fp:
+                for line in fp:
+                    try:
+                        entry = json.loads(line.decode("utf-8"))
+                    except ValueError:
+                        # A line the writer thread is still writing. The
+                        # entries after it are written by now.
+                        continue
+                    if "summary" not in entry:
+                        continue
+                    if entry["seq"] >= stop:
+                        return
+                    next = entry["seq"] + 1
+                    yield entry
+            segment += 1
+
+        for seq, entry in unwritten:
+            if next <= seq < stop:
+                yield dict(entry)
+
+    def recent(self, count):
+        """
+        @returns: the last count entries, newest first.
+        """
+        first = max(0, self._count - count)
+        return self._read_entries(list(range(self._count - 1, first - 1, -1)))
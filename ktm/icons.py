@@ -0,0 +1,480 @@
+# -*- coding: utf-8 -*-
+#   This file is part of ktm.
+#
+#   ktm is free software; you can redistribute it and/or modify it under the
+#   terms of the GNU General Public License as published by the Free Software
+#   Foundation; either version 3 of the License, or (at your option) any
+#   later version. See the LICENSE file for details.
+
+from __future__ import absolute_import
+
+import hashlib
+import logging
+import os
+import stat
+import warnings
+
+try:
+    from urllib import url2pathname
+except ImportError:
+    from urllib.request import url2pathname
+
+import gi
+gi.require_version('Gtk', '3.0')
+from gi.repository import GLib, Gio, Gtk, GdkPixbuf
+
+from ktm.cache import LRUCache
+
+
+try:
+    text_type = unicode
+except NameError:
+    text_type = str
+
+_MISSING = object()
+
+# Theme icon shown while an icon file is loaded.
+PLACEHOLDER_ICON = "image-loading"
+
+
+class _FileLoad(object):
+    """
+    An icon file being loaded for IconCache.request, also its ticket.
+    """
+
+    def __init__(self, path, callback, shown):
+        self.path = path
+        self.callback = callback
+        # The key of the cached pixbuf shown until the file is checked.
+        self.shown = shown
+        # The key of the file being decoded.
+        self.key = None
+        self.scale = False
+        self.cancellable = Gio.Cancellable()
+        self.stream = None
+        self.timeout = None
+
+
+def _pixbuf_bytes(pixbuf):
+    if pixbuf is None:
+        return 0
+    return pixbuf.get_rowstride() * pixbuf.get_height()
+
+
+class IconCache(object):
+    """
+    Turns the icons sent with notifications into pixbufs.
+
+    Decoded pixbufs are kept in an LRU cache. Icon files are keyed by their
+    path, modification time and size, so a changed file is decoded again.
+    Theme icons are keyed by name and pixel size and are dropped when the
+    icon theme changes.
+
+    Images larger than max_image_size are scaled down while decoding. The
+    cached pixbufs never use more than memory_budget bytes; an image that
+    would not fit on its own is scaled down further.
+
+    request() checks and loads icon files asynchronously, so slow file
+    systems and large images don't block the main loop.
+    """
+
+    def __init__(self, max_size=64, icon_size=Gtk.IconSize.DND,
+                 max_image_size=128, memory_budget=32 * 1024 * 1024):
+        """
+        @param max_size: the maximum number of pixbufs to keep.
+        @param icon_size: the Gtk.IconSize to load theme icons with.
+        @param max_image_size: the maximum width and height of images in
+                               pixels.
+        @param memory_budget: the maximum number of bytes used by the pixels
+                              of cached pixbufs.
+        """
+        self._pixbufs = LRUCache(max_size, memory_budget, _pixbuf_bytes)
+        self._paths = LRUCache(max_size)
+        self.max_image_size = max_image_size
+
+        found, width, height = Gtk.icon_size_lookup(icon_size)
+        self._iconSize = max(width, height)
+
+        self._theme = Gtk.IconTheme.get_default()
+        self._theme.connect("changed", self._theme_changed)
+        self._placeholder = _MISSING
+
+        # The key every icon file had when it was last checked.
+        self._fileKeys = LRUCache(max_size)
+        # The _FileLoads running.
+        self._loads = set()
+        # Milliseconds after which loading a file is given up.
+        self.load_timeout = 5000
+
+    def set_max_image_size(self, max_image_size):
+        self._max_image_size = max_image_size
+        self._pixbufs.clear()
+
+    def max_image_size(self):
+        return self._max_image_size
+
+    max_image_size = property(max_image_size, set_max_image_size,
+        doc="Maximum width and height of images in pixels.")
+
+    def set_memory_budget(self, memory_budget):
+        self._pixbufs.max_weight = memory_budget
+        self._pixbufs.trim()
+
+    def memory_budget(self):
+        return self._pixbufs.max_weight
+
+    memory_budget = property(memory_budget, set_memory_budget,
+        doc="Maximum number of bytes used by cached pixbufs.")
+
+    @property
+    def hits(self):
+        return self._pixbufs.hits
+
+    @property
+    def misses(self):
+        return self._pixbufs.misses
+
+    @property
+    def placeholder(self):
+        """
+        The pixbuf shown while an icon is loaded, or None.
+        """
+        if self._placeholder is _MISSING:
+            self._placeholder = None
+            if self._theme.has_icon(PLACEHOLDER_ICON):
+                try:
+                    self._placeholder = self._theme.load_icon(
+                        PLACEHOLDER_ICON, self._iconSize,
+                        Gtk.IconLookupFlags.FORCE_SIZE)
+                except GLib.GError:
+                    pass
+        return self._placeholder
+
+    def _theme_changed(self, theme):
+        logging.debug("Icon theme changed, dropping {} cached icons."
+            .format(len(self._pixbufs)))
+        self._pixbufs.clear()
+        self._placeholder = _MISSING
+
+    def lookup(self, icon):
+        """
+        @param icon: an icon as returned by Notification.image.
+        @returns: a GdkPixbuf.Pixbuf or None.
+        """
+        if icon is None:
+            return None
+        if isinstance(icon, text_type):
+            return self._lookup_name(icon)
+        return self._load_data(icon)
+
+    def request(self, icon, callback):
+        """
+        Looks up an icon like lookup, but checks and loads icon files
+        asynchronously.
+
+        @param icon: an icon as returned by Notification.image.
+        @param callback: called with the loaded GdkPixbuf.Pixbuf or None,
+                         unless the returned pixbuf is already the icon.
+        @returns: a (pixbuf, ticket) tuple. If ticket is None, pixbuf is the
+                  icon and callback is never called. Otherwise pixbuf is the
+                  icon the file had when last checked, or the placeholder,
+                  and the ticket can be passed to cancel.
+        """
+        if not isinstance(icon, text_type):
+            return self.lookup(icon), None
+
+        path = self._path(icon)
+        if not os.path.isabs(path):
+            # Theme icons are looked up in the theme's index, not in the
+            # file system.
+            return self._lookup_theme_icon(icon), None
+
+        key = self._fileKeys.get(path)
+        pixbuf = _MISSING if key is None else self._pixbufs.get(key, _MISSING)
+        load = _FileLoad(path, callback, key if pixbuf is not _MISSING else None)
+        load.timeout = GLib.timeout_add(
+            self.load_timeout, self._load_timed_out, load)
+        self._loads.add(load)
+        Gio.File.new_for_path(path).query_info_async(
+            "standard::type,standard::size,time::modified",
+            Gio.FileQueryInfoFlags.NONE, GLib.PRIORITY_DEFAULT,
+            load.cancellable, self._file_checked, load)
+        return (self.placeholder if load.shown is None else pixbuf), load
+
+    def cancel(self, ticket):
+        """
+        Stops loading an icon requested with request. Its callback is not
+        called any more.
+        """
+        if ticket in self._loads:
+            self._end_load(ticket)
+            ticket.cancellable.cancel()
+
+    def _end_load(self, load):
+        self._loads.remove(load)
+        if load.timeout is not None:
+            GLib.source_remove(load.timeout)
+        if load.stream is not None:
+            load.stream.close_async(GLib.PRIORITY_LOW, None, None, None)
+            load.stream = None
+
+    def _file_checked(self, source, result, load):
+        try:
+            info = source.query_info_finish(result)
+        except GLib.GError as e:
+            self._load_failed(load, e)
+            return
+        if load not in self._loads:
+            return
+        if info.get_file_type() != Gio.FileType.REGULAR:
+            self._load_failed(load, "not a regular file")
+            return
+
+        key = ("file", load.path,
+               info.get_attribute_uint64("time::modified"), info.get_size())
+        self._fileKeys.put(load.path, key)
+        if key == load.shown:
+            # The window shows this file already.
+            self._end_load(load)
+            return
+        pixbuf = self._pixbufs.get(key, _MISSING)
+        if pixbuf is not _MISSING:
+            self._load_done(load, pixbuf)
+            return
+
+        load.key = key
+        GdkPixbuf.Pixbuf.get_file_info_async(
+            load.path, load.cancellable, self._file_info_ready, load)
+
+    def _file_info_ready(self, source, result, load):
+        try:
+            format, width, height = \
+                GdkPixbuf.Pixbuf.get_file_info_finish(result)
+        except GLib.GError as e:
+            self._load_failed(load, e)
+            return
+        if load not in self._loads:
+            return
+
+        load.scale = format is not None and \
+            max(width, height) > self.max_image_size
+        Gio.File.new_for_path(load.path).read_async(
+            GLib.PRIORITY_DEFAULT, load.cancellable, self._file_opened, load)
+
+    def _file_opened(self, source, result, load):
+        try:
+            stream = source.read_finish(result)
+        except GLib.GError as e:
+            self._load_failed(load, e)
+            return
+        if load not in self._loads:
+            stream.close_async(GLib.PRIORITY_LOW, None, None, None)
+            return
+
+        # Large images are scaled while decoding, so their full size pixels
+        # are never held in memory.
+        load.stream = stream
+        if load.scale:
+            size = self.max_image_size
+            GdkPixbuf.Pixbuf.new_from_stream_at_scale_async(
+                stream, size, size, True, load.cancellable,
+                self._file_decoded, load)
+        else:
+            GdkPixbuf.Pixbuf.new_from_stream_async(
+                stream, load.cancellable, self._file_decoded, load)
+
+    def _file_decoded(self, source, result, load):
+        try:
+            pixbuf = GdkPixbuf.Pixbuf.new_from_stream_finish(result)
+        except GLib.GError as e:
+            self._load_failed(load, e)
+            return
+        if load not in self._loads:
+            return
+        pixbuf = self._limit(pixbuf)
+        self._pixbufs.put(load.key, pixbuf)
+        self._load_done(load, pixbuf)
+
+    def _load_failed(self, load, error):
+        """
+        Ends a load that failed with error, unless it was cancelled or timed
+        out already.
+        """
+        if load not in self._loads:
+            return
+        warnings.warn("Could not load icon \"{}\": {}".format(
+            load.path, error))
+        if load.key is not None:
+            self._pixbufs.put(load.key, None)
+        self._load_done(load, None)
+
+    def _load_done(self, load, pixbuf):
+        self._end_load(load)
+        load.callback(pixbuf)
+
+    def _load_timed_out(self, load):
+        # Not cached, the file may load fine next time.
+        warnings.warn("Loading icon \"{}\" took more than {} ms, giving up."
+            .format(load.path, self.load_timeout))
+        load.timeout = None
+        self._end_load(load)
+        load.cancellable.cancel()
+        if load.shown is None:
+            load.callback(None)
+        return False
+
+    def _path(self, icon):
+        """
+        @returns: the path icon refers to, if it is a file.
+        """
+        path = self._paths.get(icon)
+        if path is None:
+            path = os.path.expanduser(url2pathname(icon))
+            self._paths.put(icon, path)
+        return path
+
+    def _key(self, icon):
+        """
+        @returns: the path icon refers to and the key of its pixbuf.
+        """
+        path = self._path(icon)
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+
+        if st is not None and stat.S_ISREG(st.st_mode):
+            return path, ("file", path, int(st.st_mtime), st.st_size)
+        return path, ("theme", icon, self._iconSize)
+
+    def _lookup_name(self, icon):
+        path, key = self._key(icon)
+        if key[0] != "file":
+            return self._lookup_theme_icon(icon)
+
+        pixbuf = self._pixbufs.get(key, _MISSING)
+        if pixbuf is _MISSING:
+            pixbuf = self._load_file(path)
+            self._pixbufs.put(key, pixbuf)
+        return pixbuf
+
+    def _lookup_theme_icon(self, name):
+        key = ("theme", name, self._iconSize)
+        pixbuf = self._pixbufs.get(key, _MISSING)
+        if pixbuf is _MISSING:
+            pixbuf = self._load_theme_icon(name)
+            self._pixbufs.put(key, pixbuf)
+        return pixbuf
+
+    def _limit(self, pixbuf):
+        """
+        Scales pixbuf down so it fits into max_image_size and memory_budget.
+
+        @returns: the scaled pixbuf, or None if no sensible size fits.
+        """
+        width, height = pixbuf.get_width(), pixbuf.get_height()
+        scale = min(1.0, float(self.max_image_size) / max(width, height))
+
+        size = _pixbuf_bytes(pixbuf) * scale * scale
+        if size > self.memory_budget:
+            scale *= (float(self.memory_budget) / size) ** 0.5
+
+        if scale >= 1.0:
+            return pixbuf
+
+        width, height = int(width * scale), int(height * scale)
+        if width < 1 or height < 1:
+            warnings.warn("Dropping image that doesn't fit into the icon "
+                          "memory budget.")
+            return None
+
+        return pixbuf.scale_simple(
+            width, height, GdkPixbuf.InterpType.BILINEAR)
+
+    def _load_file(self, path):
+        try:
+            # Large images are scaled while decoding, so their full size
+            # pixels are never held in memory.
+            format, width, height = GdkPixbuf.Pixbuf.get_file_info(path)
+            size = self.max_image_size
+            if format is not None and (width > size or height > size):
+                pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(
+                    path, size, size, True)
+            else:
+                pixbuf = GdkPixbuf.Pixbuf.new_from_file(path)
+        except GLib.GError as e:
+            warnings.warn("Could not load icon \"{}\": {}".format(path, e))
+            return None
+
+        return self._limit(pixbuf)
+
+    def _load_theme_icon(self, name):
+        # Note:
+        # See output of following script for available names:
+        # from gi.repository import Gtk
+        # print("\n".join(
+        #     Gtk.IconTheme.get_default().list_icons(None)))
+        if not self._theme.has_icon(name):
+            warnings.warn(
+                "\"{}\" seems to be neither a valid icon file nor "
+                "a name in a freedesktop.org-compliant icon theme "
+                "(or your theme doesn't have that name). Ignoring."
+                .format(name))
+            return None
+
+        try:
+            return self._theme.load_icon(
+                name, self._iconSize, Gtk.IconLookupFlags.FORCE_SIZE)
+        except GLib.GError as e:
+            warnings.warn("Could not load icon \"{}\": {}".format(name, e))
+            return None
+
+    def _load_data(self, icon):
+        # For image-data and icon_data, image should look like this:
+        #
+        # dbus.Struct(
+        #   (dbus.Int32,                   # width
+        #    dbus.Int32,                   # height
+        #    dbus.Int32,                   # rowstride
+        #    dbus.Boolean,                 # has alpha
+        #    dbus.Int32,                   # bits per sample
+        #    dbus.Int32,                   # channels
+        #    dbus.ByteArray)               # image data
+        # )
+        #
+        # Notify receives byte arrays as a single string, so the pixels are
+        # copied once into a GLib.Bytes and the pixbuf keeps a reference to
+        # it instead of copying again. GLib.Bytes are accepted as well.
+        width, height, rowstride, hasAlpha, bitsPerSample, channels, data = \
+            icon
+
+        if isinstance(data, GLib.Bytes):
+            gbytes = data
+            data = gbytes.get_data()
+        else:
+            if not isinstance(data, bytes):
+                data = bytes(bytearray(data))
+            gbytes = None
+
+        if len(data) < rowstride * (height - 1) + \
+                width * ((channels * bitsPerSample + 7) // 8):
+            warnings.warn("Ignoring image data that is too short for a "
+                          "{}x{} image.".format(width, height))
+            return None
+
+        # The same avatar or logo is sent over and over again, only decode
+        # it once.
+        key = ("data", hashlib.sha1(data).digest(), width, height, rowstride,
+               bool(hasAlpha), bitsPerSample)
+        pixbuf = self._pixbufs.get(key, _MISSING)
+        if pixbuf is _MISSING:
+            if gbytes is None:
+                gbytes = GLib.Bytes.new(data)
+            # data, colorspace, has_alpha, bits_per_sample, width, height,
+            # rowstride
+            pixbuf = self._limit(GdkPixbuf.Pixbuf.new_from_bytes(
+                gbytes, GdkPixbuf.Colorspace.RGB, hasAlpha, bitsPerSample,
+                width, height, rowstride))
+            self._pixbufs.put(key, pixbuf)
+
+        return pixbuf
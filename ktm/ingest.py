@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+#   This file is part of ktm.
+#
+#   ktm is free software; you can redistribute it and/or modify it under the
+#   terms of the GNU General Public License as published by the Free Software
+#   Foundation; either version 3 of the License, or (at your option) any
+#   later version. See the LICENSE file for details.
+
+"""
+The protocol of the notification socket.
+
+A client sends notifications as JSON objects with the members of the
+arguments of Notify, all of them optional, e.g.
+
+    {"app_name": "backup", "summary": "Done", "body": "42 files",
+     "hints": {"urgency": 0}, "expire_timeout": 3000}
+
+either one per line or each prefixed with its length in bytes as 32 bit
+unsigned big endian integer. The first byte of a connection decides which:
+"{" or whitespace means lines. Every notification is answered in the same
+framing and order with {"id": ID} or {"error": MESSAGE}, so a client may send
+any number of notifications before reading the answers.
+"""
+
+import copy
+import json
+import struct
+
+
+LINES = "lines"
+PREFIXED = "prefixed"
+
+_LENGTH = struct.Struct(">I")
+
+try:
+    _text_type = unicode
+    _int_types = (int, long)
+except NameError:
+    _text_type = str
+    _int_types = (int,)
+
+# name -> (types, default) of the members of a notification.
+_FIELDS = [
+    ("app_name", (_text_type,), u""),
+    ("replaces_id", _int_types, 0),
+    ("app_icon", (_text_type,), u""),
+    ("summary", (_text_type,), u""),
+    ("body", (_text_type,), u""),
+    ("actions", (list,), []),
+    ("hints", (dict,), {}),
+    ("expire_timeout", _int_types, -1),
+]
+
+
+class FrameError(ValueError):
+    """
+    Raised for data that can't be split into frames, after which the rest
+    of the connection can't be read either.
+    """
+    pass
+
+
+class FrameDecoder(object):
+    """
+    Splits the data received on a connection into frames, without copying
+    the data received so far for every frame.
+    """
+
+    def __init__(self, max_frame=1024 * 1024):
+        """
+        @param max_frame: the maximum size of a frame in bytes.
+        """
+        self.max_frame = max_frame
+        # LINES or PREFIXED once the first byte was received.
+        self.mode = None
+        self._buffer = bytearray()
+        # Start of the next frame and, for lines, the position up to which
+        # there is no newline.
+        self._start = self._scanned = 0
+
+    def __len__(self):
+        """
+        @returns: the number of bytes received but not returned as frame.
+        """
+        return len(self._buffer) - self._start
+
+    def feed(self, data):
+        self._buffer += data
+
+    def next_frame(self):
+        """
+        @returns: the next complete frame as bytes, None if it wasn't
+                  received completely yet.
+        @raise FrameError: if the frame is larger than max_frame.
+        """
+        if self.mode is None:
+            if not len(self):
+                return None
+            first = self._buffer[self._start:self._start + 1]
+            self.mode = LINES if first in bytearray(b"{ \t\r\n") \
+                else PREFIXED
+
+        if self.mode == LINES:
+            frame = self._next_line()
+        else:
+            frame = self._next_prefixed()
+
+        # Drop the frames returned so far once they make up most of the
+        # buffer.
+        if self._start > 65536 and self._start * 2 > len(self._buffer):
+            del self._buffer[:self._start]
+            self._scanned -= self._start
+            self._start = 0
+        return frame
+
+    def _next_line(self):
+        while True:
+            end = self._buffer.find(b"\n", self._scanned)
+            if end < 0:
+                self._scanned = len(self._buffer)
+                if len(self) > self.max_frame:
+                    raise FrameError("line longer than {} bytes".format(
+                        self.max_frame))
+                return None
+
+            frame = bytes(self._buffer[self._start:end])
+            self._start = self._scanned = end + 1
+            if len(frame) > self.max_frame:
+                raise FrameError("line longer than {} bytes".format(
+                    self.max_frame))
+            # Blank lines separate nothing.
+            if frame.strip():
+                return frame
+
+    def _next_prefixed(self):
+        if len(self) < _LENGTH.size:
+            return None
+        length, = _LENGTH.unpack_from(bytes(
+            self._buffer[self._start:self._start + _LENGTH.size]))
+        if length > self.max_frame:
+            raise FrameError("frame of {} bytes is longer than {} bytes"
+                .format(length, self.max_frame))
+        if len(self) < _LENGTH.size + length:
+            return None
+
+        start = self._start + _LENGTH.size
+        self._start = start + length
+        return bytes(self._buffer[start:self._start])
+
+
+def encode_frame(mode, message):
+    """
+    @param mode: LINES or PREFIXED.
+    @param message: a JSON serializable object.
+    @returns: message as frame of mode.
+    """
+    data = json.dumps(message, separators=(",", ":")).encode("utf-8")
+    if mode == LINES:
+        return data + b"\n"
+    return _LENGTH.pack(len(data)) + data
+
+
+def notify_args(frame):
+    """
+    Decodes a notification.
+
+    @param frame: a frame as returned by FrameDecoder.next_frame.
+    @returns: the arguments of Notify for it, app_name, replaces_id,
+              app_icon, summary, body, actions, hints and expire_timeout.
+    @raise ValueError: if the frame isn't a valid notification.
+    """
+    message = json.loads(frame.decode("utf-8"))
+    if not isinstance(message, dict):
+        raise ValueError("a notification must be a JSON object")
+
+    args = []
+    for name, types, default in _FIELDS:
+        value = message[name] if name in message else copy.copy(default)
+        if not isinstance(value, types) or isinstance(value, bool):
+            raise ValueError("invalid {}".format(name))
+        args.append(value)
+
+    if args[1] < 0:
+        raise ValueError("invalid replaces_id")
+    if not all(isinstance(x, _text_type) for x in args[5]):
+        raise ValueError("invalid actions")
+    for name in ("image-data", "icon_data"):
+        if name in args[6]:
+            raise ValueError("{} can't be sent as JSON, use image-path"
+                .format(name))
+    return tuple(args)
@@ -31,79 +31,77 @@
 
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
 import argparse
 import collections
 import itertools
-import io
 import logging
-import os.path
-import urllib
+import os
+import time
 import warnings
 
 import dbus.mainloop.glib
 import dbus.service
 import dbus
-import gi
-gi.require_version('Gtk', '3.0')
-from gi.repository import GLib, Gtk, Gdk, GdkPixbuf, Pango
+from gi.repository import GLib
+
+from ktm.aliases import AliasMap
+from ktm.counter import UnreadCounter
+from ktm.digest import Digest, format_digest
+from ktm.history import History, REASON_REPLACED
+from ktm.layout import LayoutAnchor, LayoutDirection, LayoutEngine
+from ktm.monitors import parse_monitor
+from ktm.notification import Notification
+from ktm.pending import PendingQueue
+from ktm.ratelimit import RateLimiter
+from ktm.render import RecordingRenderer, Renderer
+from ktm.rules import ConfigError, DEFAULT_RULES, RuleSet
+from ktm.search import SearchIndex
+from ktm.timers import DeadlineHeap
 
 
 UNREAD_FILE = "/tmp/unread_notifications"
 
+# Startup times are measured from the import of this module, as early as ktm
+# can take the time.
+STARTED = time.time()
 
-class LayoutAnchor(object):
-    NORTH_WEST, SOUTH_WEST, SOUTH_EAST, NORTH_EAST = range(4)
 
+def _now_ms():
+    """
+    @returns: the time of the monotonic clock in [ms].
+    """
+    return GLib.get_monotonic_time() // 1000
 
-class LayoutDirection(object):
-    VERTICAL, HORIZONTAL = range(2)
 
+def default_rules_file():
+    configHome = os.environ.get("XDG_CONFIG_HOME") or \
+        os.path.expanduser("~/.config")
+    return os.path.join(configHome, "ktm", "rules.conf")
 
-class Layout(object):
-    @staticmethod
-    def layout_north_west(margins, windows, direction):
-        base = (margins[3], margins[0])
 
-        for win in windows.itervalues():
-            win.move(base[0], base[1])
-            if direction == LayoutDirection.VERTICAL:
-                base = (base[0], base[1] + win.get_size()[1])
-            else:
-                base = (base[0] + win.get_size()[0], base[1])
+def default_history_dir():
+    dataHome = os.environ.get("XDG_DATA_HOME") or \
+        os.path.expanduser("~/.local/share")
+    return os.path.join(dataHome, "ktm", "history")
 
-    @staticmethod
-    def layout_south_west(margins, windows, direction):
-        base = (margins[3], Gdk.Screen.height() - margins[2])
 
-        for win in windows.itervalues():
-            win.move(base[0], base[1] - win.get_size()[1])
-            if direction == LayoutDirection.VERTICAL:
-                base = (base[0], base[1] - win.get_size()[1])
-            else:
-                base = (base[0] + win.get_size()[0], base[1])
+def default_socket_path():
+    runtimeDir = os.environ.get("XDG_RUNTIME_DIR") or "/tmp"
+    return os.path.join(runtimeDir, "ktm.sock")
 
-    @staticmethod
-    def layout_south_east(margins, windows, direction):
-        base = (Gdk.Screen.width() - margins[1],
-            Gdk.Screen.height() - margins[2])
-
-        for win in windows.itervalues():
-            win.move(base[0] - win.get_size()[0], base[1] - win.get_size()[1])
-            if direction == LayoutDirection.VERTICAL:
-                base = (base[0], base[1] - win.get_size()[1])
-            else:
-                base = (base[0] - win.get_size()[0], base[1])
 
-    @staticmethod
-    def layout_north_east(margins, windows, direction):
-        base = (Gdk.Screen.width() - margins[1], margins[0])
+# Notifications expiring at most this many [ms] after each other are closed
+# together.
+EXPIRY_SLACK = 10
 
-        for win in windows.itervalues():
-            win.move(base[0] - win.get_size()[0], base[1])
-            if direction == LayoutDirection.VERTICAL:
-                base = (base[0], base[1] + win.get_size()[1])
-            else:
-                base = (base[0] - win.get_size()[0], base[1])
+# Number of earlier summaries a group window lists.
+GROUP_PREVIEW = 5
+
+# Interface for the ktm specific methods and signals, exported on the same
+# object as org.freedesktop.Notifications.
+KTM_INTERFACE = "com.github.skalanux.ktm"
 
 
 class NotificationDaemon(dbus.service.Object):
@@ -114,20 +112,97 @@ class NotificationDaemon(dbus.service.Object):
     [1] http://developer.gnome.org/notification-spec/
     """
 
-    def __init__(self, objectPath):
-        bus_name = dbus.service.BusName(
-            "org.freedesktop.Notifications", dbus.SessionBus())
-        dbus.service.Object.__init__(self, bus_name, objectPath)
+    def __init__(self, objectPath, historyDir=None, renderer=None):
+        """
+        @param objectPath: the D-Bus object path to export the daemon at, or
+                           None to export it with another transport, see
+                           ktm.gdbus.
+        @param historyDir: the directory of the notification history.
+        @param renderer: the Renderer drawing the notifications. By default
+                         a GtkRenderer is loaded once the main loop runs.
+        """
+        # Claim the name before anything else, so notifications sent while
+        # ktm starts wait for it instead of going elsewhere.
+        self._startupTimes = {}
+        if objectPath is None:
+            dbus.service.Object.__init__(self)
+        else:
+            bus_name = dbus.service.BusName(
+                "org.freedesktop.Notifications", dbus.SessionBus())
+            self.name_acquired()
+            dbus.service.Object.__init__(self, bus_name, objectPath)
 
         self._lastID = 0
-        self._windows = collections.OrderedDict()
-        self._closeEvents = {}
+        # Notify calls are answered and queued until there is a renderer.
+        self._renderer = None
+        self._poolSize = Renderer.pool_size
+        self._maxIconSize = Renderer.max_icon_size
+        self._iconMemoryBudget = Renderer.icon_memory_budget
+        self._monitor = Renderer.monitor
+        # Notifications holding a slot on screen, in display order. Those
+        # that have already been rendered have a place in the layout.
+        self._notifications = collections.OrderedDict()
+        # Work for the next update: notifications to (re)render and windows
+        # to remove.
+        self._toShow = collections.OrderedDict()
+        self._toHide = []
+        self._updateSource = None
+        self._layout = LayoutEngine()
+        self._pending = PendingQueue()
+        # Expiry deadlines in [ms] of the monotonic clock, and the single
+        # timeout that fires at the earliest one.
+        self._expiry = DeadlineHeap()
+        self._expirySource = None
+        self._expiryDeadline = None
+        # IDs of repeated or grouped notifications merged into the one on
+        # screen, and the notification on screen for every content and group.
+        self._aliases = AliasMap()
+        self._byContent = {}
+        self._byGroup = {}
+        # The notifications still open in every window notifications were
+        # merged into, oldest first: {window ID: OrderedDict(ID: Notification)}.
+        # The window keeps the ID of its first notification even once that
+        # one is closed.
+        self._members = {}
+        self.coalesce = True
+        self.group_by_app = False
+        # Notifications waiting for the next digest.
+        self._digest = Digest()
+        self._digestMode = False
+        self._digestSource = None
+        # The digests shown or queued, {window ID: Digest}. Their
+        # notifications are aliases of the window ID.
+        self._digests = {}
+        self.digest_interval = 60
         self.max_expire_timeout = 10000
+        self._maxChars, self._maxLines = 2000, 20
+        self.max_visible = 10
+        self.render_budget = 8
         self.margins = [0 for x in range(4)]
         self.layoutAnchor = LayoutAnchor.NORTH_WEST
         self.layoutDirection = LayoutDirection.VERTICAL
+        self._history = History(historyDir or default_history_dir())
+        # History entry of every notification that is not closed yet.
+        self._historySeq = {}
+        self._search = SearchIndex()
+        self._searchRebuild = self._history.scan(len(self._history))
+        GLib.idle_add(self._rebuild_search_index, priority=GLib.PRIORITY_LOW)
+        self.rules = RuleSet.from_string(DEFAULT_RULES)
+        self._rateLimiter = RateLimiter(0)
+        self._collapsed = {}
+        self.rate_limit_action = "collapse"
+        self._counter = UnreadCounter(UNREAD_FILE)
+        self._counterSource = None
+        self.counter_save_interval = 250
         self.reset_counter_file()
 
+        if renderer is None:
+            # Gtk takes longer to load than everything else together, load
+            # it after the calls that arrived during startup were answered.
+            GLib.idle_add(self._load_renderer)
+        else:
+            self._set_renderer(renderer)
+
     def set_max_expire_timeout(self, max_expire_timeout):
         if max_expire_timeout < 1:
             warnings.warn("Ignoring max_expire_timeout value < 1.")
@@ -141,9 +216,194 @@ class NotificationDaemon(dbus.service.Object):
         doc="Maximum time for notifications to be shown in [ms]. "
             "Default: 10000.")
 
+    def set_max_visible(self, max_visible):
+        if max_visible < 1:
+            warnings.warn("Ignoring max_visible value < 1.")
+            return
+        self._max_visible = max_visible
+
+    def max_visible(self):
+        return self._max_visible
+
+    max_visible = property(max_visible, set_max_visible,
+        doc="Maximum number of notification windows shown at the same time. "
+            "Further notifications wait in a queue. Default: 10.")
+
+    def set_render_budget(self, render_budget):
+        if render_budget < 1:
+            warnings.warn("Ignoring render_budget value < 1.")
+            return
+        self._render_budget = render_budget
+
+    def render_budget(self):
+        return self._render_budget
+
+    render_budget = property(render_budget, set_render_budget,
+        doc="Time in [ms] spent rendering notifications before the main loop "
+            "gets control back. Default: 8.")
+
+    def set_pool_size(self, pool_size):
+        if pool_size < 0:
+            warnings.warn("Ignoring pool_size value < 0.")
+            return
+        self._poolSize = pool_size
+        if self._renderer is not None:
+            self._renderer.pool_size = pool_size
+
+    def pool_size(self):
+        return self._poolSize
+
+    pool_size = property(pool_size, set_pool_size,
+        doc="Number of hidden notification windows kept for reuse. "
+            "Default: 4.")
+
+    def set_max_icon_size(self, max_icon_size):
+        if max_icon_size < 1:
+            warnings.warn("Ignoring max_icon_size value < 1.")
+            return
+        self._maxIconSize = max_icon_size
+        if self._renderer is not None:
+            self._renderer.max_icon_size = max_icon_size
+
+    def max_icon_size(self):
+        return self._maxIconSize
+
+    max_icon_size = property(max_icon_size, set_max_icon_size,
+        doc="Maximum width and height of notification images in pixels. "
+            "Larger images are scaled down while decoding. Default: 128.")
+
+    def set_icon_memory_budget(self, icon_memory_budget):
+        if icon_memory_budget < 1:
+            warnings.warn("Ignoring icon_memory_budget value < 1.")
+            return
+        self._iconMemoryBudget = icon_memory_budget
+        if self._renderer is not None:
+            self._renderer.icon_memory_budget = icon_memory_budget
+
+    def icon_memory_budget(self):
+        return self._iconMemoryBudget
+
+    icon_memory_budget = property(icon_memory_budget,
+        set_icon_memory_budget,
+        doc="Maximum number of bytes used by cached images. Default: 32 MiB.")
+
+    def set_rate_limit(self, rate_limit):
+        if rate_limit < 0:
+            warnings.warn("Ignoring rate_limit value < 0.")
+            return
+        self._rateLimiter.rate = rate_limit
+
+    def rate_limit(self):
+        return self._rateLimiter.rate
+
+    rate_limit = property(rate_limit, set_rate_limit,
+        doc="Notifications per second an application may send in the long "
+            "run, 0 disables the limit. Default: 0.")
+
+    def set_rate_burst(self, rate_burst):
+        if rate_burst < 1:
+            warnings.warn("Ignoring rate_burst value < 1.")
+            return
+        self._rateLimiter.burst = rate_burst
+
+    def rate_burst(self):
+        return self._rateLimiter.burst
+
+    rate_burst = property(rate_burst, set_rate_burst,
+        doc="Notifications an application may send at once. Default: 10.")
+
+    def set_rate_limit_action(self, rate_limit_action):
+        if rate_limit_action not in ["drop", "collapse", "history"]:
+            warnings.warn("Ignoring invalid rate_limit_action setting.")
+            return
+        self._rateLimitAction = rate_limit_action
+
+    def rate_limit_action(self):
+        return self._rateLimitAction
+
+    rate_limit_action = property(rate_limit_action, set_rate_limit_action,
+        doc="What happens to notifications over the rate limit: drop them, "
+            "only record them in the history, or record them and show one "
+            "\"N more from X\" notification (collapse). Default: collapse.")
+
+    def set_digest_mode(self, digest_mode):
+        digest_mode = bool(digest_mode)
+        if digest_mode == self._digestMode:
+            return
+        self._digestMode = digest_mode
+        logging.info("Digest mode {}.".format(
+            "enabled" if digest_mode else "disabled"))
+        if not digest_mode:
+            # Don't keep the collected notifications back any longer.
+            self._show_digest()
+
+    def digest_mode(self):
+        return self._digestMode
+
+    digest_mode = property(digest_mode, set_digest_mode,
+        doc="Whether notifications are shown in a periodic digest instead of "
+            "a window each. Default: False.")
+
+    def set_digest_interval(self, digest_interval):
+        if digest_interval < 1:
+            warnings.warn("Ignoring digest_interval value < 1.")
+            return
+        self._digestInterval = digest_interval
+
+    def digest_interval(self):
+        return self._digestInterval
+
+    digest_interval = property(digest_interval, set_digest_interval,
+        doc="Seconds between the first notification of a digest and showing "
+            "the digest. Default: 60.")
+
+    def set_digest_threshold(self, digest_threshold):
+        if digest_threshold < 1:
+            warnings.warn("Ignoring digest_threshold value < 1.")
+            return
+        self._digest.threshold = digest_threshold
+
+    def digest_threshold(self):
+        return self._digest.threshold
+
+    digest_threshold = property(digest_threshold, set_digest_threshold,
+        doc="Number of notifications after which a digest is shown without "
+            "waiting for digest_interval. Default: 50.")
+
+    def set_max_chars(self, max_chars):
+        if max_chars < 1:
+            warnings.warn("Ignoring max_chars value < 1.")
+            return
+        self._maxChars = max_chars
+        if self._renderer is not None:
+            self._renderer.set_text_limits(self._maxChars, self._maxLines)
+
+    def max_chars(self):
+        return self._maxChars
+
+    max_chars = property(max_chars, set_max_chars,
+        doc="Maximum number of characters shown of a summary or body, the "
+            "rest is cut before it is laid out. Default: 2000.")
+
+    def set_max_lines(self, max_lines):
+        if max_lines < 1:
+            warnings.warn("Ignoring max_lines value < 1.")
+            return
+        self._maxLines = max_lines
+        if self._renderer is not None:
+            self._renderer.set_text_limits(self._maxChars, self._maxLines)
+
+    def max_lines(self):
+        return self._maxLines
+
+    max_lines = property(max_lines, set_max_lines,
+        doc="Maximum number of lines shown of a summary or body. "
+            "Default: 20.")
+
     def set_margins(self, margins):
         try:
             newMargins = [int(x) for x in itertools.islice(margins, 4)]
+            self._layout.margins = newMargins
             self._margins = newMargins
         except ValueError:
             warnings.warn(
@@ -160,25 +420,38 @@ class NotificationDaemon(dbus.service.Object):
         return self._margins
 
     margins = property(margins, set_margins,
-        doc="Margins for top, right, bottom and left side of the screen.")
+        doc="Margins for top, right, bottom and left side of the monitor.")
 
-    def set_layout_anchor(self, layoutAnchor):
+    def set_monitor(self, monitor):
         try:
-            self._layoutAnchorFunc = \
-                {
-                    LayoutAnchor.NORTH_WEST: Layout.layout_north_west,
-                    LayoutAnchor.SOUTH_WEST: Layout.layout_south_west,
-                    LayoutAnchor.SOUTH_EAST: Layout.layout_south_east,
-                    LayoutAnchor.NORTH_EAST: Layout.layout_north_east,
-                }[layoutAnchor]
-        except KeyError:
+            monitor = parse_monitor(monitor)
+        except ValueError:
+            warnings.warn("Ignoring invalid monitor setting.")
+            return
+        self._monitor = monitor
+        if self._renderer is not None:
+            self._renderer.monitor = monitor
+            self._update_layout()
+
+    def monitor(self):
+        return self._monitor
+
+    monitor = property(monitor, set_monitor,
+        doc="Monitor the notification windows are shown on: \"primary\", "
+            "\"pointer\" (the one with the mouse pointer) or an index. "
+            "Default: \"primary\".")
+
+    def set_layout_anchor(self, layoutAnchor):
+        if layoutAnchor not in \
+            [LayoutAnchor.NORTH_WEST, LayoutAnchor.SOUTH_WEST,
+             LayoutAnchor.SOUTH_EAST, LayoutAnchor.NORTH_EAST]:
             warnings.warn("Ignoring invalid layoutAnchor setting.")
             return
 
-        self._layoutAnchor = layoutAnchor
+        self._layout.anchor = layoutAnchor
 
     def layout_anchor(self):
-        return self._layoutAnchor
+        return self._layout.anchor
 
     layoutAnchor = property(layout_anchor, set_layout_anchor,
         doc="Layout origin for the notification windows.")
@@ -189,219 +462,741 @@ class NotificationDaemon(dbus.service.Object):
             warnings.warn("Ignoring invalid layoutDirection setting.")
             return
 
-        self._layoutDirection = layoutDirection
+        self._layout.direction = layoutDirection
 
     def layout_direction(self):
-        return self._layoutDirection
+        return self._layout.direction
 
     layoutDirection = property(layout_direction, set_layout_direction,
         doc="Layout direction for the notification windows.")
 
     def _update_layout(self):
         """
-        Recalculates the layout of all notification windows.
+        Moves the notification windows whose position changed since the last
+        update.
         """
-        self._layoutAnchorFunc(
-            self.margins, self._windows, self.layoutDirection)
+        self._layout.area = self._renderer.area()
+        for id, x, y in self._layout.update():
+            self._renderer.move(id, x, y)
+
+    def _set_renderer(self, renderer):
+        renderer.clicked = self._window_clicked
+        renderer.resized = self._window_resized
+        renderer.area_changed = self._update_layout
+        renderer.monitor = self._monitor
+        renderer.pool_size = self._poolSize
+        renderer.max_icon_size = self._maxIconSize
+        renderer.icon_memory_budget = self._iconMemoryBudget
+        renderer.set_text_limits(self._maxChars, self._maxLines)
+        self._renderer = renderer
+        if self._toShow:
+            self._schedule_update()
+
+    def _load_renderer(self):
+        """
+        Loads the Gtk renderer.
 
-    def matches_rules(self, summary, body):
-        return True
+        @returns: False
+        """
+        start = time.time()
+        from ktm.gtkrender import GtkRenderer
+        self._set_renderer(GtkRenderer())
+        logging.info("Loaded Gtk in {:.0f} ms, {} notifications waiting."
+            .format((time.time() - start) * 1000, len(self._toShow)))
+        return False
+
+    def name_acquired(self):
+        """
+        Called by the transport once the bus name is owned.
+        """
+        self._startupTimes["name_owned"] = time.time() - STARTED
+        logging.info("Owning org.freedesktop.Notifications {:.0f} ms after "
+            "start.".format(self._startupTimes["name_owned"] * 1000))
 
-    def reset_counter_file(self):
+    def _schedule_update(self):
+        """
+        Makes sure _update runs once the main loop is idle. Any number of
+        changes before that are handled by a single update. Nothing happens
+        without a renderer, setting one schedules the update.
+        """
+        if self._updateSource is None and self._renderer is not None:
+            # Higher than the redraw priority, so new windows are drawn in
+            # the same frame, but lower than incoming D-Bus calls.
+            self._updateSource = GLib.idle_add(
+                self._update, priority=GLib.PRIORITY_HIGH_IDLE)
+
+    def _update(self):
+        """
+        Hides closed windows, renders new and replaced notifications and
+        updates the layout once for all of them.
+
+        Rendering stops after render_budget milliseconds. The remaining
+        notifications are rendered by another update once the renderer had a
+        chance to draw.
+
+        @returns: False
+        """
+        deadline = GLib.get_monotonic_time() + self.render_budget * 1000
+
+        for id in self._toHide:
+            self._renderer.hide(id)
+        self._toHide = []
+
+        while self._toShow:
+            id, x = self._toShow.popitem(last=False)
+            self._render_notification(id, self._notifications[id])
+            if GLib.get_monotonic_time() >= deadline:
+                break
+
+        self._update_layout()
+
+        if self._toShow or self._toHide:
+            logging.debug("Render budget exceeded, {} notifications left."
+                .format(len(self._toShow)))
+            self._updateSource = GLib.idle_add(
+                self._update, priority=GLib.PRIORITY_DEFAULT_IDLE)
+        else:
+            self._updateSource = None
+        return False
+
+    def load_rules(self, path):
+        """
+        Replaces the rules with the ones from the file at path. The current
+        rules are kept if the file can't be read or parsed.
+        """
         try:
-            fp = io.open(UNREAD_FILE, "w")
-            fp.write(u"0")
-            fp.close()
-        except:
-            pass
+            self.rules = RuleSet.from_file(path)
+        except (IOError, OSError, ConfigError) as e:
+            warnings.warn("Ignoring rules file {}: {}".format(path, e))
 
-    def get_counter_value(self):
+    def _save_counter(self):
+        self._counterSource = None
         try:
-            fp = io.open(UNREAD_FILE, "r")
-            unread_messages = int(fp.readline())
-            fp.close()
-        except:
-            unread_messages = 0
+            self._counter.save()
+        except (IOError, OSError):
+            logging.exception("Could not write {}.".format(UNREAD_FILE))
+        return False
 
-        return unread_messages
+    def _counter_changed(self):
+        """
+        Emits UnreadCountChanged and writes the counter file at most once per
+        counter_save_interval.
+        """
+        self.UnreadCountChanged(self._counter.value)
+        if self._counterSource is None:
+            self._counterSource = GLib.timeout_add(
+                self.counter_save_interval, self._save_counter)
+
+    def reset_counter_file(self):
+        self._counter.reset()
+        self._counter_changed()
+
+    def get_counter_value(self):
+        return self._counter.value
 
     def increase_counter_file(self):
-        try:
-            unread = self.get_counter_value()
-            fp = io.open(UNREAD_FILE, "w")
-            fp.write(unicode(unread+1))
-            fp.close()
-        except:
-            pass
+        self._counter.increment()
+        self._counter_changed()
 
-    def _create_win(self, summary, body, icon=None):
-        win = Gtk.Window(type=Gtk.WindowType.POPUP)
-
-        frame = Gtk.Frame()
-        win.add(frame)
-
-        hBox = Gtk.HBox()
-        frame.add(hBox)
-
-        logging.debug("type of icon: {}".format(str(type(icon))))
-
-        iconWidget = None
-
-        if not icon is None:
-            if isinstance(icon, unicode):
-                icon_path = os.path.expanduser(urllib.url2pathname(icon))
-                if os.path.isfile(icon_path):
-                    iconWidget = Gtk.Image()
-                    iconWidget.set_from_file(icon_path)
-                else:
-                    # Note:
-                    # See output of following script for available names:
-                    # from gi.repository import Gtk
-                    # print("\n".join(
-                    #     Gtk.IconTheme.get_default().list_icons(None)))
-                    theme = Gtk.IconTheme.get_default()
-                    if theme.has_icon(icon):
-                        iconWidget = Gtk.Image()
-                        iconWidget.set_from_icon_name(icon, Gtk.IconSize.DND)
-                    else:
-                        warnings.warn(
-                            "\"{}\" seems to be neither a valid icon file nor "
-                            "a name in a freedesktop.org-compliant icon theme "
-                            "(or your theme doesn't have that name). Ignoring."
-                            .format(icon))
+    def shutdown(self):
+        """
+        Writes out everything that is still kept in memory only.
+        """
+        if self._counterSource is not None:
+            GLib.source_remove(self._counterSource)
+        self._save_counter()
+        self._history.shutdown()
 
+    def _window_resized(self, id, size):
+        """
+        Callback of the renderer when the window of id changed its size by
+        itself.
+        """
+        if id in self._layout:
+            self._layout.resize(id, size)
+            self._schedule_update()
+
+    def _render_notification(self, id, notification):
+        """
+        Creates the window for a notification and arms its close event. The
+        caller is responsible for updating the layout afterwards.
+
+        @param id: the ID of the notification.
+        @param notification: the Notification to show.
+        """
+        try:
+            count, earlier = 1, ()
+            members = self._members.get(id)
+            if members is not None:
+                count, earlier = len(members), self._earlier(members)
+            size = self._renderer.show(id,
+                notification.summary, notification.body, notification.image,
+                count, earlier)
+            if id in self._layout:
+                self._layout.resize(id, size)
             else:
-                # For image-data and icon_data, image should look like this:
-                #
-                # dbus.Struct(
-                #   (dbus.Int32,                   # width
-                #    dbus.Int32,                   # height
-                #    dbus.Int32,                   # rowstride
-                #    dbus.Boolean,                 # has alpha
-                #    dbus.Int32,                   # bits per sample
-                #    dbus.Int32,                   # channels
-                #    dbus.Array([dbus.Byte, ...])) # image data
-                # )
-
-                # data, colorspace, has_alpha, bits_per_sample, width, height,
-                # rowstride, destroy_fn, destroy_fn_data
-                # FIXME: Do I need to free the image via a function callback?
-                pixbuf = GdkPixbuf.Pixbuf.new_from_data(
-                    bytearray(icon[6]), GdkPixbuf.Colorspace.RGB, icon[3],
-                    icon[4], icon[0], icon[1], icon[2],
-                    lambda x, y: None, None)
-
-                iconWidget = Gtk.Image()
-                iconWidget.set_from_pixbuf(pixbuf)
-
-        if not iconWidget is None:
-            hBox.pack_start(iconWidget, False, False, 0)
-
-        vBox = Gtk.VBox()
-        hBox.pack_start(vBox, False, False, 0)
-
-
-        def set_label_contents(l, s):
-            try:
-                # Parameters: markup_text, length, accel_marker
-                # Return: (success, attr_list, text, accel_char)
-                parse_result = Pango.parse_markup(s, -1, u"\x00")
-                l.set_text(parse_result[2])
-                l.set_attributes(parse_result[1])
-            except GLib.GError:
-                logging.exception("Invalid pango markup.")
-                l.set_text(s)
-
-
-        if self.matches_rules(summary, body):
-            # Temporary rule, this should be match from a config file
-            summary_text = summary.__str__()
-            if summary_text.find('New message')!='-1':
-                self.increase_counter_file()
+                self._layout.add(id, size)
 
-        summaryLabel = Gtk.Label()
-        set_label_contents(summaryLabel, summary)
-        vBox.pack_start(summaryLabel, False, False, 0)
+            if "first_popup" not in self._startupTimes:
+                self._startupTimes["first_popup"] = time.time() - STARTED
+                logging.info("Showing the first notification {:.0f} ms after "
+                    "start.".format(self._startupTimes["first_popup"] * 1000))
 
-        separator = Gtk.HSeparator()
-        vBox.pack_start(separator, False, False, 0)
+            expire_timeout = notification.expire_timeout
+            if 0 != expire_timeout:
+                timeout = \
+                    self.max_expire_timeout if expire_timeout < 0 else \
+                    min(expire_timeout, self.max_expire_timeout)
 
-        bodyLabel = Gtk.Label()
-        set_label_contents(bodyLabel, body)
-        vBox.pack_start(bodyLabel, False, False, 0)
+                logging.debug("Will close notification {} after {} ms."
+                    .format(id, timeout))
 
-        # The window's size has default values before showing it.
-        win.show_all()
+                self._expiry.schedule(id, _now_ms() + timeout)
+                self._arm_expiry()
 
-        return win
+        except Exception as e:
+            logging.exception("Exception occured during window creation.")
+            # Give the slot to the next notification.
+            self._close_window(id, 4)
 
-    def _notification_expired(self, id):
+    def _show_notification(self, id, notification):
         """
-        Callback called when a notification expired.
+        Gives a notification a slot on screen, or updates the notification
+        already holding it. The window is rendered by the next update.
 
         @param id: the ID of the notification.
+        @param notification: the Notification to show.
+        """
+        previous = self._notifications.get(id)
+        if previous is not None:
+            self._unregister(id, previous)
+        self._byContent[notification.content_key] = id
+        group = self._group_key(notification)
+        if group is not None:
+            self._byGroup.setdefault(group, id)
+        self._notifications[id] = notification
+        self._toShow[id] = True
+        self._schedule_update()
+
+    def _show_pending(self):
+        """
+        Shows queued notifications until all free slots are taken.
+        """
+        while self._pending and len(self._notifications) < self.max_visible:
+            id, notification = self._pending.pop()
+            self._show_notification(id, notification)
+
+    def _arm_expiry(self):
+        """
+        Points the expiry timeout at the earliest deadline.
+        """
+        deadline = self._expiry.next_deadline()
+        if self._expirySource is not None:
+            if deadline is not None and self._expiryDeadline <= deadline:
+                # Firing early is harmless, it just arms the timeout again.
+                return
+            GLib.source_remove(self._expirySource)
+            self._expirySource = None
+
+        if deadline is not None:
+            self._expiryDeadline = deadline
+            self._expirySource = GLib.timeout_add(
+                max(0, deadline - _now_ms()), self._notifications_expired)
+
+    def _notifications_expired(self):
+        """
+        Callback of the expiry timeout, closes every notification that
+        expired by now.
+
         @returns: False
         """
-        self._close_notification(id, 1)
+        self._expirySource = None
+        # Deadlines within a few ms are closed together, saving a wake-up.
+        for id in self._expiry.pop_expired(_now_ms() + EXPIRY_SLACK):
+            self._close_window(id, 1)
+        self._arm_expiry()
         return False  # Don't repeat timeout
 
-    def _window_clicked(self, widget, event, id):
-        self._close_notification(id, 2)
+    def _window_clicked(self, id):
+        self._close_window(id, 2)
 
     def _remove_close_event(self, id):
         """
         Removes the close event belonging to the notification with ID id.
+        The expiry timeout is left alone, it only fires needlessly if id had
+        the earliest deadline.
 
         @param id: the ID of the notification whose close event is to be
                    removed.
         @return: True if a close event was removed, False otherwise.
         """
-        if id not in self._closeEvents:
+        return self._expiry.cancel(id)
+
+    def _remove_window(self, id):
+        """
+        Removes the notification with ID id from the screen. Its window is
+        removed by the next update.
+
+        @param id: the ID of the notification whose window is to be removed.
+        @return: True if the notification was on screen, False otherwise.
+        """
+        if id not in self._notifications:
             return False
 
-        closeEvent = self._closeEvents.pop(id)
-        GLib.source_remove(closeEvent)
+        self._unregister(id, self._notifications.pop(id))
+        self._toShow.pop(id, None)
+        if id in self._layout:
+            self._layout.remove(id)
+            self._toHide.append(id)
+
+        self._schedule_update()
         return True
 
-    def _remove_window(self, id, removeFromDict=True):
+    def _group_key(self, notification):
+        """
+        @returns: the key of the group the notification is shown in or None.
         """
-        Removes the window belonging to the notification with ID id.
+        if notification.group is not None:
+            return (u"group", notification.group)
+        elif self.group_by_app and notification.app_name:
+            return (u"app", notification.app_name)
+        return None
 
-        @param id: the ID of the notification whose window is to be removed.
-        @param removeFromDict: if True, id will be erased from self._windows
-        @return: True if a window was removed, False otherwise.
+    def _unregister(self, id, notification):
         """
-        if id not in self._windows:
-            return False
+        Stops merging notifications into the one with ID id, which showed
+        notification until now.
+        """
+        if self._byContent.get(notification.content_key) == id:
+            del self._byContent[notification.content_key]
+        group = self._group_key(notification)
+        if group is not None and self._byGroup.get(group) == id:
+            del self._byGroup[group]
+
+    def _record_notification(self, id, notification):
+        """
+        Adds a notification to the history. An entry for the notification it
+        replaces is marked as replaced.
+        """
+        seq = self._historySeq.get(id)
+        if seq is not None:
+            self._history.close(seq, REASON_REPLACED)
+        seq = self._history.append(id, notification)
+        self._historySeq[id] = seq
+        self._search.add(
+            seq, notification.app_name, notification.summary,
+            notification.body)
+
+    def _rebuild_search_index(self):
+        """
+        Indexes the history of earlier sessions, a chunk at a time.
 
-        win = self._windows[id]
-        win.hide()
-        win.destroy()
+        @returns: True while there are entries left.
+        """
+        indexed = 0
+        for entry in itertools.islice(self._searchRebuild, 1000):
+            self._search.add(
+                entry["seq"], entry["app_name"], entry["summary"],
+                entry["body"])
+            indexed += 1
+        if indexed == 1000:
+            return True
 
-        if removeFromDict:
-            del self._windows[id]
+        logging.info("Indexed {} history entries.".format(self._search.count))
+        self._searchRebuild = None
+        return False
 
-        return True
+    def _notification_closed(self, id, reason):
+        """
+        Records the close in the history and emits NotificationClosed.
+        """
+        seq = self._historySeq.pop(id, None)
+        if seq is not None:
+            self._history.close(seq, reason)
+        self.NotificationClosed(id, reason)
+
+    def _notify(self, notification, replaces_id=0, internal=False):
+        """
+        Accepts a notification: applies the rules and the rate limit, records
+        it in the history and shows or queues it.
+
+        @param notification: the Notification.
+        @param replaces_id: the ID of the notification to replace or 0.
+        @param internal: True for notifications created by the daemon itself,
+                         which bypass the rules and the rate limit.
+        @returns: the ID of the notification.
+        """
+        replacesOpen = 0 != replaces_id and self._is_open(replaces_id)
+        if 0 != replaces_id and not replacesOpen and \
+                replaces_id in self._notifications:
+            # A closed notification whose window still shows the ones merged
+            # into it, the window can't be taken over.
+            replaces_id = 0
+
+        if not internal:
+            rules = self.rules.match(notification)
+            if rules.timeout is not None:
+                notification.expire_timeout = rules.timeout
+            notification.priority = rules.priority
+
+            if rules.suppress or rules.history_only:
+                # Such notifications never change what is on screen.
+                if replacesOpen:
+                    if rules.history_only:
+                        self._record_notification(replaces_id, notification)
+                    return replaces_id
+                self._lastID += 1
+                if rules.history_only:
+                    self._record_notification(self._lastID, notification)
+                self._drop_notification(self._lastID)
+                return self._lastID
+
+            if 0 != replaces_id and replaces_id in self._digest:
+                self._record_notification(replaces_id, notification)
+                self._digest.add(replaces_id,
+                    notification.app_name, notification.summary)
+                return replaces_id
+
+            window = self._aliases.primary(replaces_id)
+            if replacesOpen and window != replaces_id and \
+                    window in self._digests:
+                # The digest lists the new summary instead of the old one.
+                self._record_notification(replaces_id, notification)
+                digest = self._digests[window]
+                digest.add(replaces_id,
+                    notification.app_name, notification.summary)
+                self._update_window(window, self._digest_notification(digest))
+                return replaces_id
+
+            if self.digest_mode and not replacesOpen:
+                if rules.count:
+                    self.increase_counter_file()
+                return self._add_to_digest(notification)
+
+            if 0 == replaces_id:
+                primary = None
+                if self.coalesce:
+                    primary = self._byContent.get(notification.content_key)
+                if primary is None:
+                    group = self._group_key(notification)
+                    if group is not None:
+                        primary = self._byGroup.get(group)
+                if primary is not None:
+                    return self._coalesce(primary, notification)
+
+            # Replacing an open notification costs no more than showing it
+            # once, however often it happens, so that isn't limited.
+            if not replacesOpen and \
+                    not self._rateLimiter.allow(notification.app_name):
+                return self._throttle(notification)
+
+            if rules.count:
+                self.increase_counter_file()
+
+        if 0 != replaces_id and replaces_id in self._pending:
+            self._record_notification(replaces_id, notification)
+            self._pending.push(
+                replaces_id, notification, notification.level)
+            return replaces_id
+
+        notificationID = 0
+
+        if 0 != replaces_id:
+            # We can't use _close_notification here because
+            # a) the NotificationClosed signal must not be emitted
+            # b) we must not remove replaces_id from _notifications or the
+            #    order of the notifications on screen would be changed
+            # The window of replaces_id is filled with the new contents by
+            # _create_win. If replaces_id was merged into another
+            # notification, that one shows the new contents.
+            self._remove_close_event(self._aliases.primary(replaces_id))
+            notificationID = replaces_id
+        else:
+            self._lastID += 1
+            notificationID = self._lastID
+
+        # Notify has to reply quickly, don't encode large bodies for nothing.
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug("summary: \"{}\", body: \"{}\"".format(
+                unicode(notification.summary).encode(
+                    "ascii", errors="backslashreplace"),
+                unicode(notification.body).encode(
+                    "ascii", errors="backslashreplace")))
+            logging.debug("Notification ID: {}".format(notificationID))
+
+        if not internal:
+            self._record_notification(notificationID, notification)
+        shownID = self._aliases.primary(notificationID)
+        members = self._members.get(shownID)
+        if members is not None and notificationID in members:
+            # The window keeps showing the newest of its notifications.
+            members[notificationID] = notification
+            notification = self._newest(members)
+
+        if shownID not in self._notifications and \
+                len(self._notifications) >= self.max_visible:
+            logging.debug("Queueing notification {}, {} already pending."
+                .format(notificationID, len(self._pending)))
+            self._pending.push(
+                notificationID, notification, notification.level)
+            return notificationID
+
+        self._show_notification(shownID, notification)
+
+        return notificationID
+
+    def _coalesce(self, primary, notification):
+        """
+        Merges a repeat of the notification primary, or a later notification
+        of its group, into it: the new notification gets its own ID, which
+        becomes an alias of primary, and primary's window shows it along with
+        the number of merged notifications and expires later.
+
+        @returns: the ID of the new notification.
+        """
+        self._lastID += 1
+        id = self._lastID
+        self._aliases.add(id, primary)
+        members = self._members.get(primary)
+        if members is None:
+            members = self._members[primary] = collections.OrderedDict(
+                [(primary, self._notifications[primary])])
+        members[id] = notification
+        logging.debug("Merging notification {} into {}.".format(id, primary))
+
+        self._record_notification(id, notification)
+        self._remove_close_event(primary)
+        self._show_notification(primary, notification)
+        return id
+
+    def _add_to_digest(self, notification):
+        """
+        Records a notification and keeps it for the next digest.
+
+        @returns: the ID of the notification.
+        """
+        self._lastID += 1
+        id = self._lastID
+        self._record_notification(id, notification)
+
+        if self._digest.add(id, notification.app_name, notification.summary):
+            self._show_digest()
+        elif self._digestSource is None:
+            self._digestSource = GLib.timeout_add_seconds(
+                self.digest_interval, self._show_digest)
+        return id
+
+    def _show_digest(self):
+        """
+        Shows the collected notifications in a single notification. They stay
+        open until it is closed.
+
+        @returns: False
+        """
+        if self._digestSource is not None:
+            GLib.source_remove(self._digestSource)
+            self._digestSource = None
+
+        if self._digest:
+            digest, self._digest = self._digest, Digest(self._digest.threshold)
+            digestID = self._notify(self._digest_notification(digest), 0, True)
+            self._digests[digestID] = digest
+            for id in digest:
+                self._aliases.add(id, digestID)
+        return False
+
+    @staticmethod
+    def _digest_notification(digest):
+        """
+        @returns: the Notification listing the contents of digest.
+        """
+        summary, body = format_digest(digest.groups())
+        return Notification(u"ktm", u"", summary, body, [], {}, -1)
+
+    def _update_window(self, id, notification):
+        """
+        Shows new contents in the window of id, on screen or queued.
+        """
+        if id in self._notifications:
+            self._show_notification(id, notification)
+        else:
+            self._pending.push(id, notification, notification.level)
 
-    def _close_notification(self, id, reason):
+    def _throttle(self, notification):
+        """
+        Handles a notification over the rate limit of its application
+        according to rate_limit_action.
+
+        @returns: the ID given to the notification.
+        """
+        self._lastID += 1
+        id = self._lastID
+        logging.debug("Throttling notification {} of \"{}\"."
+            .format(id, notification.app_name))
+
+        if self.rate_limit_action != "drop":
+            self._record_notification(id, notification)
+        if self.rate_limit_action == "collapse":
+            collapsed = self._collapsed.get(notification.app_name)
+            if collapsed is None:
+                if len(self._collapsed) >= RateLimiter.MAX_BUCKETS:
+                    self._forget_collapsed()
+                collapsed = self._collapsed[notification.app_name] = \
+                    [0, 0, 0, None]
+            collapsed[0] += 1
+            if collapsed[3] is None:
+                collapsed[3] = GLib.timeout_add(
+                    1000, self._show_collapsed, notification.app_name)
+
+        self._drop_notification(id)
+        return id
+
+    def _show_collapsed(self, app_name):
+        """
+        Shows or updates the "N more from X" notification for app_name.
+
+        @returns: False
+        """
+        # [throttled since the last update, ID of the summary notification,
+        #  count it shows, timeout source]
+        collapsed = self._collapsed[app_name]
+        count, summaryID, shown = collapsed[0], collapsed[1], collapsed[2]
+        if not self._is_open(summaryID):
+            summaryID, shown = 0, 0
+
+        collapsed[0] = 0
+        collapsed[2] = shown + count
+        collapsed[3] = None
+        collapsed[1] = self._notify(Notification(
+            app_name, u"", u"{} more from {}".format(collapsed[2], app_name),
+            u"", [], {}, -1), summaryID, True)
+        return False
+
+    def _forget_collapsed(self):
+        """
+        Forgets the applications whose "N more from X" notification is
+        closed and not about to be shown again.
+        """
+        for app_name, collapsed in list(self._collapsed.items()):
+            if collapsed[3] is None and not self._is_open(collapsed[1]):
+                del self._collapsed[app_name]
+
+    def _is_open(self, id):
+        window = self._aliases.primary(id)
+        members = self._members.get(window)
+        if members is not None:
+            return id in members
+        return window in self._notifications or window in self._pending or \
+            window in self._digest
+
+    @staticmethod
+    def _newest(members):
+        return next(reversed(members.values()))
+
+    @staticmethod
+    def _earlier(members):
+        """
+        @returns: the summaries of the notifications of a window before the
+                  newest one, without repeats in a row, for the group list.
+        """
+        summaries = []
+        for notification in members.values():
+            if not summaries or summaries[-1] != notification.summary:
+                summaries.append(notification.summary)
+        return summaries[-GROUP_PREVIEW - 1:-1]
+
+    def _drop_notification(self, id):
+        """
+        Closes a notification that is never shown. NotificationClosed is
+        emitted after Notify returned the ID to the client.
+        """
+        def closed():
+            self._notification_closed(id, 4)
+            return False
+        GLib.idle_add(closed)
+
+    def _close_notification(self, id, reason, show_pending=True):
         """
         Closes a notification and emits NotificationClosed if the notification
-        exists.
+        exists. A notification merged into a window with others is only
+        removed from it, the window shows the remaining ones.
 
         @param id: the ID of the notification.
         @param reason: the reason for closing the notification.
+        @param show_pending: whether a queued notification takes the place of
+                             the closed one right away.
         @returns: True if a notification with this id existed, False otherwise.
         """
+        window = self._aliases.primary(id)
+        members = self._members.get(window)
+        digest = self._digests.get(window)
+        if members is not None and id in members and len(members) > 1:
+            del members[id]
+            self._aliases.remove(id)
+            self._notification_closed(id, reason)
+            self._show_notification(window, self._newest(members))
+            return True
+        elif digest is not None and id in digest and len(digest) > 1:
+            digest.remove(id)
+            self._aliases.remove(id)
+            self._notification_closed(id, reason)
+            self._update_window(window, self._digest_notification(digest))
+            return True
+        elif members is None or id in members:
+            if self._close_window(window, reason, show_pending):
+                return True
+
+        warnings.warn("Attempt to close non-existent notification {}"
+            .format(id))
+        return False
+
+    def _close_window(self, id, reason, show_pending=True, emit=True):
+        """
+        Closes a window, or a queued notification, along with all
+        notifications merged into it.
+
+        @param id: the ID of the window.
+        @param reason: the reason for closing the notifications.
+        @param show_pending: whether a queued notification takes the place of
+                             the closed one right away.
+        @param emit: whether to emit NotificationClosed.
+        @returns: the IDs of the notifications closed, in ascending order.
+        """
         self._remove_close_event(id)
 
         if self._remove_window(id):
-            self._update_layout()
-            self.NotificationClosed(id, reason)
-            return True
-        else:
-            warnings.warn("Attempt to close non-existent notification {}"
-                .format(id))
-            return False
+            if show_pending:
+                self._show_pending()
+        elif self._pending.remove(id) is None and \
+                not self._digest.remove(id):
+            return []
+
+        self._digests.pop(id, None)
+        members = self._members.pop(id, None)
+        closed = self._aliases.pop(id)
+        if members is None or id in members:
+            closed.append(id)
+        closed.sort()
+        if emit:
+            for closedID in closed:
+                self._notification_closed(closedID, reason)
+        return closed
+
+    def _close_notifications(self, ids, reason):
+        """
+        Closes the notifications in ids as one batch: NotificationClosed is
+        emitted in the order of ids and queued notifications only take the
+        free places once all of them are closed. The windows are removed by
+        a single update.
+
+        @returns: the number of notifications that existed.
+        """
+        closed = 0
+        for id in ids:
+            if self._close_notification(id, reason, show_pending=False):
+                closed += 1
+        self._show_pending()
+        return closed
 
     @dbus.service.method(
         dbus_interface="org.freedesktop.Notifications",
@@ -419,8 +1214,9 @@ class NotificationDaemon(dbus.service.Object):
 
     @dbus.service.method(
         dbus_interface="org.freedesktop.Notifications",
-        in_signature="susssava{sv}i",
-        out_signature="u")
+        in_signature="susssasa{sv}i",
+        out_signature="u",
+        byte_arrays=True)
     def Notify(
         self, app_name, replaces_id, app_icon, summary,
         body, actions, hints, expire_timeout):
@@ -436,72 +1232,9 @@ class NotificationDaemon(dbus.service.Object):
 
         @returns: unsigned int
         """
-        notificationID = 0
-
-        if 0 != replaces_id:
-            # We can't use _close_notification here because
-            # a) the NotificationClosed signal must not be emitted
-            # b) we must not remove replaces_id from _windows or the order of
-            #    the values in the dict would be changed
-            # c) that would cause _update_layout to be called twice
-            self._remove_close_event(replaces_id)
-            self._remove_window(replaces_id, False)
-            notificationID = replaces_id
-        else:
-            self._lastID += 1
-            notificationID = self._lastID
-
-        logging.debug("summary: \"{}\", body: \"{}\"".format(
-            unicode(summary).encode("ascii", errors="backslashreplace"),
-            unicode(body).encode("ascii", errors="backslashreplace")))
-        logging.debug("Notification ID: {}".format(notificationID))
-
-        try:
-            # Priorities for icon sources:
-            #
-            # 1. image-data: hint. raw image data structure of signature
-            #                (iiibiiay)
-            # 2. image-path: hint. either an URI (file://...) or a name in a
-            #                freedesktop.org-compliant icon theme
-            # 3. app_icon:   parameter. same as image-path
-            # 4. icon_data:  hint. same as image-data
-
-            image = None
-
-            if "image-data" in hints:
-                image = hints["image-data"]
-            elif "image-path" in hints:
-                image = hints["image-path"]
-            elif app_icon != "":
-                image = app_icon
-            elif "icon_data" in hints:
-                image = hints["icon_data"]
-
-            win = self._create_win(summary, body, image)
-            win.add_events(Gdk.EventMask.BUTTON_PRESS_MASK)
-            win.connect(
-                "button-press-event", self._window_clicked, notificationID)
-            self._windows[notificationID] = win
-            self._update_layout()
-
-            if 0 != expire_timeout:
-                timeout = \
-                    (self.max_expire_timeout if expire_timeout < 0 else \
-                    min(expire_timeout, self.max_expire_timeout)) / 1000
-
-                logging.debug("Will close notification {} after {} seconds."
-                    .format(notificationID, timeout))
-
-                self._closeEvents[notificationID] = \
-                    GLib.timeout_add_seconds(
-                        timeout,
-                        self._notification_expired,
-                        notificationID)
-
-        except Exception as e:
-            logging.exception("Exception occured during window creation.")
-
-        return notificationID
+        notification = Notification(
+            app_name, app_icon, summary, body, actions, hints, expire_timeout)
+        return self._notify(notification, replaces_id)
 
     @dbus.service.method(
         dbus_interface="org.freedesktop.Notifications",
@@ -557,6 +1290,177 @@ class NotificationDaemon(dbus.service.Object):
         """
         pass
 
+    # ktm extensions
+
+    @dbus.service.method(
+        dbus_interface=KTM_INTERFACE,
+        in_signature="",
+        out_signature="u")
+    def GetUnreadCount(self):
+        """
+        @returns: the number of unread notifications.
+        """
+        return self._counter.value
+
+    @dbus.service.method(
+        dbus_interface=KTM_INTERFACE,
+        in_signature="",
+        out_signature="")
+    def ResetUnreadCount(self):
+        self.reset_counter_file()
+
+    @staticmethod
+    def _history_struct(entry):
+        return (entry["seq"], entry["id"], entry["app_name"],
+                entry["summary"], entry["body"], entry["created"],
+                entry["closed"] or 0.0, entry["reason"])
+
+    @dbus.service.method(
+        dbus_interface=KTM_INTERFACE,
+        in_signature="u",
+        out_signature="a(uusssddu)")
+    def GetHistory(self, count):
+        """
+        @param count: unsigned int, the number of entries to return.
+        @returns: the last count history entries, newest first. Each entry
+                  holds the entry number, the notification ID, app_name,
+                  summary, body, the time it arrived, the time it was closed
+                  and the close reason. Open notifications have a close time
+                  and reason of 0.
+        """
+        return [self._history_struct(entry)
+                for entry in self._history.recent(count)]
+
+    @dbus.service.method(
+        dbus_interface=KTM_INTERFACE,
+        in_signature="au",
+        out_signature="a(uusssddu)")
+    def GetHistoryEntries(self, seqs):
+        """
+        @param seqs: array of unsigned int, history entry numbers.
+        @returns: the history entries seqs, see GetHistory. Unknown entry
+                  numbers are skipped.
+        """
+        return [self._history_struct(entry)
+                for entry in self._history.entries(seqs)]
+
+    @dbus.service.method(
+        dbus_interface=KTM_INTERFACE,
+        in_signature="suu",
+        out_signature="au")
+    def Search(self, query, offset, limit):
+        """
+        Searches summary, body and app_name of the history.
+
+        @param query: string, the words to look for.
+        @param offset: unsigned int, the number of matches to skip.
+        @param limit: unsigned int, the maximum number of matches to return.
+        @returns: history entry numbers for GetHistoryEntries, best matches
+                  first.
+        """
+        return self._search.search(query, offset, limit)
+
+    @dbus.service.method(
+        dbus_interface=KTM_INTERFACE,
+        in_signature="",
+        out_signature="a{su}")
+    def GetThrottleStats(self):
+        """
+        @returns: the number of notifications throttled per application.
+        """
+        return self._rateLimiter.throttled
+
+    @dbus.service.method(
+        dbus_interface=KTM_INTERFACE,
+        in_signature="b",
+        out_signature="")
+    def SetDigestMode(self, enabled):
+        """
+        Turns digest mode on or off. Turning it off shows the notifications
+        collected so far at once.
+        """
+        self.digest_mode = enabled
+
+    @dbus.service.method(
+        dbus_interface=KTM_INTERFACE,
+        in_signature="",
+        out_signature="b")
+    def GetDigestMode(self):
+        return self.digest_mode
+
+    @dbus.service.method(
+        dbus_interface=KTM_INTERFACE,
+        in_signature="",
+        out_signature="a{sd}")
+    def GetStartupTimes(self):
+        """
+        @returns: the seconds from the start of ktm until the bus name was
+                  owned (name_owned) and until the first notification was
+                  shown (first_popup), as far as that happened yet.
+        """
+        return self._startupTimes
+
+    @dbus.service.method(
+        dbus_interface=KTM_INTERFACE,
+        in_signature="a(susssasa{sv}i)",
+        out_signature="au",
+        byte_arrays=True)
+    def NotifyMany(self, notifications):
+        """
+        Sends several notifications with a single call. They are handled like
+        as many Notify calls, but shown by a single update.
+
+        @param notifications: array of the arguments of Notify.
+        @returns: the IDs of the notifications, in the same order.
+        """
+        ids = []
+        for (app_name, replaces_id, app_icon, summary, body, actions, hints,
+             expire_timeout) in notifications:
+            notification = Notification(app_name, app_icon, summary, body,
+                                        actions, hints, expire_timeout)
+            ids.append(self._notify(notification, replaces_id))
+        return ids
+
+    @dbus.service.method(
+        dbus_interface=KTM_INTERFACE,
+        in_signature="au",
+        out_signature="")
+    def CloseMany(self, ids):
+        """
+        Closes several notifications with a single call, emitting
+        NotificationClosed in the order of ids.
+        """
+        self._close_notifications(ids, 3)
+
+    @dbus.service.method(
+        dbus_interface=KTM_INTERFACE,
+        in_signature="",
+        out_signature="")
+    def CloseAll(self):
+        """
+        Closes all notifications, the ones on screen as well as the queued
+        ones and the ones waiting for the digest, emitting NotificationClosed
+        in the order of their IDs.
+        """
+        windows = set(self._notifications)
+        windows.update(self._pending)
+        windows.update(self._digest)
+        closed = []
+        for id in windows:
+            closed.extend(self._close_window(id, 3, show_pending=False,
+                                             emit=False))
+        for id in sorted(closed):
+            self._notification_closed(id, 3)
+
+    @dbus.service.signal(
+        dbus_interface=KTM_INTERFACE,
+        signature="u")
+    def UnreadCountChanged(self, count):
+        """
+        @param count: unsigned int, the new number of unread notifications.
+        """
+        pass
+
 
 def create_argument_parser():
     parser = argparse.ArgumentParser(
@@ -584,7 +1488,16 @@ def create_argument_parser():
         default="0,0,0,0",
         type=lambda value: [int(x) for x in value.split(",")],
         help="set screen margins for top, right, bottom and left side of the"
-               " screen in pixels")
+               " monitor in pixels")
+
+    parser.add_argument(
+        "--monitor",
+        dest="monitor",
+        default="primary",
+        type=parse_monitor,
+        help="set the monitor notifications are shown on: primary, pointer"
+               " (the one with the mouse pointer when a notification appears)"
+               " or the index of a monitor")
 
     parser.add_argument(
         "-a", "--layout-anchor",
@@ -602,6 +1515,153 @@ def create_argument_parser():
         choices=["VERTICAL", "HORIZONTAL"],
         help="set the direction for the notifications")
 
+    parser.add_argument(
+        "-p", "--pool-size",
+        dest="poolSize",
+        default=4,
+        type=int,
+        help="set the number of hidden notification windows kept for reuse,"
+               " 0 disables reusing windows")
+
+    parser.add_argument(
+        "-s", "--max-icon-size",
+        dest="maxIconSize",
+        default=128,
+        type=int,
+        help="set the maximum width and height of notification images in"
+               " pixels, larger images are scaled down")
+
+    parser.add_argument(
+        "--icon-memory",
+        dest="iconMemory",
+        default=32,
+        type=int,
+        help="set the maximum memory used by cached notification images in"
+               " MiB")
+
+    parser.add_argument(
+        "-r", "--rules",
+        dest="rules",
+        default=default_rules_file(),
+        help="set the file rules for notifications are read from")
+
+    parser.add_argument(
+        "--history-dir",
+        dest="historyDir",
+        default=default_history_dir(),
+        help="set the directory the notification history is stored in")
+
+    parser.add_argument(
+        "--rate-limit",
+        dest="rateLimit",
+        default=0.0,
+        type=float,
+        help="set the number of notifications per second an application may"
+               " send in the long run, 0 disables the limit")
+
+    parser.add_argument(
+        "--rate-burst",
+        dest="rateBurst",
+        default=10,
+        type=int,
+        help="set the number of notifications an application may send at"
+               " once")
+
+    parser.add_argument(
+        "--rate-limit-action",
+        dest="rateLimitAction",
+        default="collapse",
+        type=lambda value: value.lower(),
+        choices=["drop", "collapse", "history"],
+        help="set what happens to notifications over the rate limit")
+
+    parser.add_argument(
+        "--no-coalesce",
+        dest="coalesce",
+        action="store_false",
+        help="show repeats of a notification on screen in windows of their"
+               " own instead of counting them in its window")
+
+    parser.add_argument(
+        "-g", "--group-by-app",
+        dest="groupByApp",
+        action="store_true",
+        help="show the notifications of an application in a single window;"
+               " notifications with an x-ktm-group hint are always grouped")
+
+    parser.add_argument(
+        "--digest",
+        dest="digest",
+        action="store_true",
+        help="start in digest mode: show the notifications that arrived"
+               " during an interval in a single notification")
+
+    parser.add_argument(
+        "--digest-interval",
+        dest="digestInterval",
+        default=60,
+        type=int,
+        help="set the number of seconds notifications are collected for a"
+               " digest")
+
+    parser.add_argument(
+        "--digest-threshold",
+        dest="digestThreshold",
+        default=50,
+        type=int,
+        help="set the number of notifications after which a digest is shown"
+               " right away")
+
+    parser.add_argument(
+        "--max-chars",
+        dest="maxChars",
+        default=2000,
+        type=int,
+        help="set the maximum number of characters shown of a summary or"
+               " body")
+
+    parser.add_argument(
+        "--max-lines",
+        dest="maxLines",
+        default=20,
+        type=int,
+        help="set the maximum number of lines shown of a summary or body")
+
+    parser.add_argument(
+        "--renderer",
+        dest="renderer",
+        default="gtk",
+        type=lambda value: value.lower(),
+        choices=["gtk", "null"],
+        help="set how notifications are drawn; null draws nothing and needs"
+               " no display")
+
+    parser.add_argument(
+        "--transport",
+        dest="transport",
+        default="dbus",
+        type=lambda value: value.lower(),
+        choices=["dbus", "gdbus"],
+        help="set the D-Bus implementation the daemon is exported with:"
+               " dbus-python or GDBus")
+
+    parser.add_argument(
+        "--socket",
+        dest="socket",
+        nargs="?",
+        const=default_socket_path(),
+        default=None,
+        help="also accept notifications as JSON on a Unix domain socket, at"
+               " SOCKET or at " + default_socket_path())
+
+    parser.add_argument(
+        "-n", "--max-visible",
+        dest="maxVisible",
+        default=10,
+        type=int,
+        help="set the maximum number of notifications shown at once, further"
+               " notifications are queued")
+
     return parser
 
 
@@ -612,20 +1672,55 @@ def main():
 
     logging.basicConfig(level=getattr(logging, args.loglevel))
 
-    dbus.mainloop.glib.DBusGMainLoop(set_as_default=True)
-
     loop = GLib.MainLoop()
 
-    notDaemon = NotificationDaemon("/org/freedesktop/Notifications")
+    # The Gtk renderer is the default, None lets the daemon create it.
+    renderer = RecordingRenderer() if args.renderer == "null" else None
+
+    if args.transport == "gdbus":
+        from ktm.gdbus import GDBusTransport
+        notDaemon = NotificationDaemon(None, args.historyDir, renderer)
+        transport = GDBusTransport(
+            notDaemon, "/org/freedesktop/Notifications")
+    else:
+        dbus.mainloop.glib.DBusGMainLoop(set_as_default=True)
+        notDaemon = NotificationDaemon(
+            "/org/freedesktop/Notifications", args.historyDir, renderer)
     notDaemon.max_expire_timeout = args.expireTimeout
     notDaemon.margins = args.margins
+    notDaemon.monitor = args.monitor
     notDaemon.layoutAnchor = getattr(LayoutAnchor, args.layoutAnchor)
     notDaemon.layoutDirection = getattr(LayoutDirection, args.layoutDirection)
+    notDaemon.max_visible = args.maxVisible
+    notDaemon.rate_limit = args.rateLimit
+    notDaemon.rate_burst = args.rateBurst
+    notDaemon.rate_limit_action = args.rateLimitAction
+    notDaemon.coalesce = args.coalesce
+    notDaemon.group_by_app = args.groupByApp
+    notDaemon.max_chars = args.maxChars
+    notDaemon.max_lines = args.maxLines
+    notDaemon.digest_interval = args.digestInterval
+    notDaemon.digest_threshold = args.digestThreshold
+    notDaemon.digest_mode = args.digest
+    if os.path.exists(args.rules):
+        notDaemon.load_rules(args.rules)
+    notDaemon.pool_size = args.poolSize
+    notDaemon.max_icon_size = args.maxIconSize
+    notDaemon.icon_memory_budget = args.iconMemory * 1024 * 1024
+
+    server = None
+    if args.socket is not None:
+        from ktm.unixsocket import UnixSocketServer
+        server = UnixSocketServer(notDaemon, args.socket)
 
     try:
         loop.run()
     except KeyboardInterrupt:
         logging.info("Exiting.")
+    finally:
+        if server is not None:
+            server.close()
+        notDaemon.shutdown()
 
 
 if __name__ == '__main__':
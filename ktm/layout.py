@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+#   This file is part of ktm.
+#
+#   ktm is free software; you can redistribute it and/or modify it under the
+#   terms of the GNU General Public License as published by the Free Software
+#   Foundation; either version 3 of the License, or (at your option) any
+#   later version. See the LICENSE file for details.
+
+
+class LayoutAnchor(object):
+    NORTH_WEST, SOUTH_WEST, SOUTH_EAST, NORTH_EAST = range(4)
+
+
+class LayoutDirection(object):
+    VERTICAL, HORIZONTAL = range(2)
+
+
+class LayoutEngine(object):
+    """
+    Computes the positions of the notification windows without touching any
+    window.
+
+    Windows are stacked from the anchor in the order they were added. The
+    engine caches the size of every window and the offset at which it starts,
+    so after a change only the windows from the changed one on are recomputed:
+    adding or removing the newest window is O(1), removing the k-th newest is
+    O(k).
+    """
+
+    def __init__(self, anchor=LayoutAnchor.NORTH_WEST,
+                 direction=LayoutDirection.VERTICAL, margins=(0, 0, 0, 0),
+                 area=(0, 0, 0, 0)):
+        """
+        @param anchor: a LayoutAnchor value.
+        @param direction: a LayoutDirection value.
+        @param margins: top, right, bottom and left margin.
+        @param area: x, y, width and height of the area to place windows in.
+        """
+        self._ids = []
+        self._index = {}
+        self._sizes = []
+        self._offsets = []
+        self._positions = {}
+        # Index of the first window whose position may have changed.
+        self._dirty = 0
+        self._anchor = anchor
+        self._direction = direction
+        self._margins = tuple(margins)
+        self._area = tuple(area)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, id):
+        return id in self._index
+
+    def _invalidate(self, index=0):
+        self._dirty = min(self._dirty, index)
+
+    def set_anchor(self, anchor):
+        if anchor != self._anchor:
+            self._anchor = anchor
+            self._invalidate()
+
+    def anchor(self):
+        return self._anchor
+
+    anchor = property(anchor, set_anchor,
+        doc="Layout origin for the windows.")
+
+    def set_direction(self, direction):
+        if direction != self._direction:
+            self._direction = direction
+            self._invalidate()
+
+    def direction(self):
+        return self._direction
+
+    direction = property(direction, set_direction,
+        doc="Direction in which windows are stacked.")
+
+    def set_margins(self, margins):
+        margins = tuple(margins)
+        if margins != self._margins:
+            self._margins = margins
+            self._invalidate()
+
+    def margins(self):
+        return self._margins
+
+    margins = property(margins, set_margins,
+        doc="Margins for top, right, bottom and left side of the area.")
+
+    def set_area(self, area):
+        area = tuple(area)
+        if area != self._area:
+            self._area = area
+            self._invalidate()
+
+    def area(self):
+        return self._area
+
+    area = property(area, set_area,
+        doc="x, y, width and height of the area the windows are placed in.")
+
+    def add(self, id, size):
+        """
+        Adds a window after all other windows.
+
+        @param id: the ID of the notification shown in the window.
+        @param size: the (width, height) of the window.
+        """
+        self._index[id] = len(self._ids)
+        self._ids.append(id)
+        self._sizes.append(tuple(size))
+        self._offsets.append(0)
+        self._invalidate(len(self._ids) - 1)
+
+    def remove(self, id):
+        """
+        Removes the window of id.
+
+        @param id: the ID of the notification shown in the window.
+        """
+        index = self._index.pop(id)
+        del self._ids[index]
+        del self._sizes[index]
+        del self._offsets[index]
+        self._positions.pop(id, None)
+
+        for i in range(index, len(self._ids)):
+            self._index[self._ids[i]] = i
+
+        self._invalidate(index)
+
+    def resize(self, id, size):
+        """
+        Updates the cached size of the window of id.
+
+        @param id: the ID of the notification shown in the window.
+        @param size: the new (width, height) of the window.
+        """
+        index = self._index[id]
+        size = tuple(size)
+        if self._sizes[index] != size:
+            self._sizes[index] = size
+            self._invalidate(index)
+
+    def position(self, id):
+        """
+        @returns: the (x, y) position of the window of id as of the last
+                  update.
+        """
+        return self._positions[id]
+
+    def _place(self, offset, size):
+        top, right, bottom, left = self._margins
+        x, y, width, height = self._area
+        w, h = size
+        vertical = self._direction == LayoutDirection.VERTICAL
+        anchor = self._anchor
+
+        if anchor in (LayoutAnchor.NORTH_WEST, LayoutAnchor.SOUTH_WEST):
+            px = x + left + (0 if vertical else offset)
+        else:
+            px = x + width - right - w - (0 if vertical else offset)
+
+        if anchor in (LayoutAnchor.NORTH_WEST, LayoutAnchor.NORTH_EAST):
+            py = y + top + (offset if vertical else 0)
+        else:
+            py = y + height - bottom - h - (offset if vertical else 0)
+
+        return px, py
+
+    def update(self):
+        """
+        Recomputes the positions of all windows that may have moved since the
+        last update.
+
+        @returns: a list of (id, x, y) tuples for the windows that have to be
+                  moved.
+        """
+        start = self._dirty
+        count = len(self._ids)
+        self._dirty = count
+        if start >= count:
+            return []
+
+        extent = 1 if self._direction == LayoutDirection.VERTICAL else 0
+        if start == 0:
+            offset = 0
+        else:
+            offset = self._offsets[start - 1] + self._sizes[start - 1][extent]
+
+        moves = []
+        for i in range(start, count):
+            id = self._ids[i]
+            size = self._sizes[i]
+            self._offsets[i] = offset
+            position = self._place(offset, size)
+            if self._positions.get(id) != position:
+                self._positions[id] = position
+                moves.append((id,) + position)
+            offset += size[extent]
+
+        return moves
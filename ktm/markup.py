@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+#   This file is part of ktm.
+#
+#   ktm is free software; you can redistribute it and/or modify it under the
+#   terms of the GNU General Public License as published by the Free Software
+#   Foundation; either version 3 of the License, or (at your option) any
+#   later version. See the LICENSE file for details.
+
+import re
+from xml.sax.saxutils import unescape
+
+
+# A tag, or the start of one cut off at the end of the text.
+_MARKUP = re.compile(r"<[^>]*(?:>|$)")
+_ENTITIES = {"&quot;": "\"", "&apos;": "'"}
+
+ELLIPSIS = u"…"
+
+
+def strip_markup(markup):
+    """
+    @returns: the text of pango markup without tags and with the entities
+              replaced.
+    """
+    return unescape(_MARKUP.sub(u"", markup), _ENTITIES)
+
+
+def truncate(text, max_chars, max_lines):
+    """
+    Shortens text to at most max_chars characters and max_lines lines. An
+    ellipsis marks where text was cut.
+
+    @param max_chars: the maximum number of characters or None.
+    @param max_lines: the maximum number of lines or None.
+    """
+    truncated = False
+    if max_chars is not None and len(text) > max_chars:
+        text = text[:max_chars]
+        truncated = True
+    if max_lines is not None:
+        # Only look for as many line breaks as needed.
+        end = -1
+        for x in range(max_lines):
+            end = text.find(u"\n", end + 1)
+            if end < 0:
+                break
+        else:
+            if text[end + 1:]:
+                text = text[:end]
+                truncated = True
+    return text + ELLIPSIS if truncated else text
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+#   This file is part of ktm.
+#
+#   ktm is free software; you can redistribute it and/or modify it under the
+#   terms of the GNU General Public License as published by the Free Software
+#   Foundation; either version 3 of the License, or (at your option) any
+#   later version. See the LICENSE file for details.
+
+PRIMARY = "primary"
+POINTER = "pointer"
+
+
+def parse_monitor(value):
+    """
+    Parses the monitor notifications are shown on.
+
+    @param value: "primary", "pointer" or the index of a monitor.
+    @returns: PRIMARY, POINTER or the index as int.
+    @raises ValueError: if value is neither.
+    """
+    if isinstance(value, int):
+        index = value
+    else:
+        value = value.strip().lower()
+        if value in (PRIMARY, POINTER):
+            return value
+        index = int(value)
+    if index < 0:
+        raise ValueError("monitor index must not be negative")
+    return index
+
+
+class MonitorGeometry(object):
+    """
+    The workareas of all monitors, kept until they are replaced by update.
+    Looking up the area notifications are placed in doesn't ask the display
+    server anything.
+    """
+
+    def __init__(self, workareas=(), primary=0):
+        """
+        @param workareas: the (x, y, width, height) of every monitor's
+                          workarea, in the order of the monitor indices.
+        @param primary: the index of the primary monitor.
+        """
+        self.update(workareas, primary)
+
+    def __len__(self):
+        return len(self._workareas)
+
+    def update(self, workareas, primary=0):
+        self._workareas = [tuple(x) for x in workareas]
+        self._primary = primary if 0 <= primary < len(self._workareas) else 0
+
+    @property
+    def primary(self):
+        return self._primary
+
+    def monitor_at(self, x, y):
+        """
+        @returns: the index of the monitor whose workarea contains the point
+                  (x, y), the primary monitor if there is none.
+        """
+        for index, (left, top, width, height) in enumerate(self._workareas):
+            if left <= x < left + width and top <= y < top + height:
+                return index
+        return self._primary
+
+    def area(self, monitor):
+        """
+        @param monitor: the index of a monitor or PRIMARY. Indices of
+                        monitors that don't exist (anymore) mean the primary
+                        monitor.
+        @returns: the (x, y, width, height) of the monitor's workarea,
+                  (0, 0, 0, 0) without any monitors.
+        """
+        if not self._workareas:
+            return (0, 0, 0, 0)
+        if monitor == PRIMARY or not 0 <= monitor < len(self._workareas):
+            monitor = self._primary
+        return self._workareas[monitor]
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+#   This file is part of ktm.
+#
+#   ktm is free software; you can redistribute it and/or modify it under the
+#   terms of the GNU General Public License as published by the Free Software
+#   Foundation; either version 3 of the License, or (at your option) any
+#   later version. See the LICENSE file for details.
+
+
+class Urgency(object):
+    LOW, NORMAL, CRITICAL = range(3)
+
+
+class Notification(object):
+    """
+    Everything a client sent along with a Notify call, kept around until the
+    notification can be shown.
+    """
+
+    __slots__ = ("app_name", "app_icon", "summary", "body", "actions",
+                 "hints", "expire_timeout", "priority")
+
+    def __init__(self, app_name, app_icon, summary, body, actions, hints,
+                 expire_timeout):
+        self.app_name = app_name
+        self.app_icon = app_icon
+        self.summary = summary
+        self.body = body
+        self.actions = actions
+        self.hints = hints
+        self.expire_timeout = expire_timeout
+        # Queue priority set by a rule, overrides the urgency if not None.
+        self.priority = None
+
+    @property
+    def urgency(self):
+        """
+        The urgency hint of the notification, clamped to the values defined
+        by the specification. Defaults to Urgency.NORMAL.
+        """
+        try:
+            urgency = int(self.hints.get("urgency", Urgency.NORMAL))
+        except (TypeError, ValueError):
+            return Urgency.NORMAL
+        return max(Urgency.LOW, min(urgency, Urgency.CRITICAL))
+
+    @property
+    def level(self):
+        """
+        The level the notification is queued with: its priority if a rule
+        set one, its urgency otherwise.
+        """
+        return self.urgency if self.priority is None else self.priority
+
+    @property
+    def group(self):
+        """
+        The group the sender put the notification in with the x-ktm-group
+        hint, or None.
+        """
+        return self.hints.get("x-ktm-group") or None
+
+    @property
+    def content_key(self):
+        """
+        Equal for notifications that look the same, used to merge repeats.
+        """
+        return (self.app_name, self.app_icon, self.summary, self.body,
+                tuple(self.actions))
+
+    @property
+    def image(self):
+        """
+        The image to show next to the notification, or None.
+
+        Priorities for icon sources:
+
+        1. image-data: hint. raw image data structure of signature
+                       (iiibiiay)
+        2. image-path: hint. either an URI (file://...) or a name in a
+                       freedesktop.org-compliant icon theme
+        3. app_icon:   parameter. same as image-path
+        4. icon_data:  hint. same as image-data
+        """
+        if "image-data" in self.hints:
+            return self.hints["image-data"]
+        elif "image-path" in self.hints:
+            return self.hints["image-path"]
+        elif self.app_icon != "":
+            return self.app_icon
+        elif "icon_data" in self.hints:
+            return self.hints["icon_data"]
+        return None
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+#   This file is part of ktm.
+#
+#   ktm is free software; you can redistribute it and/or modify it under the
+#   terms of the GNU General Public License as published by the Free Software
+#   Foundation; either version 3 of the License, or (at your option) any
+#   later version. See the LICENSE file for details.
+
+import collections
+
+
+class PendingQueue(object):
+    """
+    Holds notifications that are waiting for a free slot on screen.
+
+    There is one FIFO per urgency level and higher levels are always served
+    first. Entries are removed lazily, so removing and replacing an entry are
+    O(1) just like pushing and popping.
+    """
+
+    def __init__(self, levels=3):
+        self._fifos = [collections.deque() for x in range(levels)]
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, id):
+        return id in self._entries
+
+    def __iter__(self):
+        """
+        Iterates over the queued IDs in no particular order.
+        """
+        return iter(list(self._entries))
+
+    def push(self, id, item, level):
+        """
+        Queues item under id. If id is already queued with the same level the
+        item is replaced in place and keeps its position, otherwise it goes to
+        the end of the FIFO for level.
+
+        @param id: the ID of the notification.
+        @param item: the payload to keep for id.
+        @param level: the urgency level, 0 being the lowest.
+        """
+        level = max(0, min(level, len(self._fifos) - 1))
+        entry = self._entries.get(id)
+
+        if entry is not None:
+            if entry[1] == level:
+                entry[2] = item
+                return
+            self.remove(id)
+
+        # An entry is [id, level, item, alive].
+        entry = [id, level, item, True]
+        self._entries[id] = entry
+        self._fifos[level].append(entry)
+
+    def remove(self, id):
+        """
+        Removes id from the queue.
+
+        @param id: the ID of the notification.
+        @returns: the item that was queued for id or None.
+        """
+        entry = self._entries.pop(id, None)
+        if entry is None:
+            return None
+        entry[3] = False
+        return entry[2]
+
+    def pop(self):
+        """
+        Removes the next entry to be shown.
+
+        @returns: an (id, item) tuple.
+        @raise KeyError: if the queue is empty.
+        """
+        for fifo in reversed(self._fifos):
+            while fifo:
+                entry = fifo.popleft()
+                if entry[3]:
+                    del self._entries[entry[0]]
+                    return entry[0], entry[2]
+        raise KeyError("pop from an empty PendingQueue")
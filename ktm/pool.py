@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+#   This file is part of ktm.
+#
+#   ktm is free software; you can redistribute it and/or modify it under the
+#   terms of the GNU General Public License as published by the Free Software
+#   Foundation; either version 3 of the License, or (at your option) any
+#   later version. See the LICENSE file for details.
+
+
+class WindowPool(object):
+    """
+    Keeps hidden notification windows around so they can be reused instead
+    of building and destroying a widget tree for every notification.
+
+    Pooled objects need hide(), reset() and destroy() methods.
+    """
+
+    def __init__(self, factory, max_size=4):
+        """
+        @param factory: callable returning a new window.
+        @param max_size: the high-water mark, i.e. the maximum number of
+                         idle windows to keep. 0 disables pooling.
+        """
+        self._factory = factory
+        self._free = []
+        self.created = 0
+        self.reused = 0
+        self.max_size = max_size
+
+    def set_max_size(self, max_size):
+        self._max_size = max(0, max_size)
+        while len(self._free) > self._max_size:
+            self._free.pop().destroy()
+
+    def max_size(self):
+        return self._max_size
+
+    max_size = property(max_size, set_max_size,
+        doc="Maximum number of idle windows kept for reuse.")
+
+    def __len__(self):
+        return len(self._free)
+
+    def acquire(self):
+        """
+        @returns: an idle window if there is one, a new one otherwise.
+        """
+        if self._free:
+            self.reused += 1
+            return self._free.pop()
+
+        self.created += 1
+        return self._factory()
+
+    def release(self, win):
+        """
+        Hides win and keeps it for reuse, or destroys it if the pool is full.
+
+        @param win: a window previously returned by acquire.
+        """
+        win.hide()
+        if len(self._free) < self._max_size:
+            win.reset()
+            self._free.append(win)
+        else:
+            win.destroy()
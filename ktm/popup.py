@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+#   This file is part of ktm.
+#
+#   ktm is free software; you can redistribute it and/or modify it under the
+#   terms of the GNU General Public License as published by the Free Software
+#   Foundation; either version 3 of the License, or (at your option) any
+#   later version. See the LICENSE file for details.
+
+from __future__ import absolute_import
+
+import logging
+
+import gi
+gi.require_version('Gtk', '3.0')
+from gi.repository import GLib, Gtk, Gdk, Pango
+
+from ktm.cache import LRUCache
+from ktm.markup import strip_markup, truncate
+
+
+# Texts of labels are cut to this many characters and lines before Pango
+# lays them out. Set with set_text_limits.
+_maxChars = 2000
+_maxLines = 20
+
+# markup -> (text, attributes) for recently shown summaries and bodies. Invalid
+# markup is cached as well, so it is reported only once.
+_parsed = LRUCache(max_size=256)
+
+
+def set_text_limits(max_chars, max_lines):
+    """
+    @param max_chars: the maximum number of characters of a label.
+    @param max_lines: the maximum number of lines of a label.
+    """
+    global _maxChars, _maxLines
+    _maxChars, _maxLines = max_chars, max_lines
+    _parsed.clear()
+
+
+def parse_markup(markup):
+    """
+    Parses pango markup, cut to the text limits.
+
+    @returns: the text and the Pango.AttrList to show, the attribute list is
+              None for invalid markup.
+    """
+    result = _parsed.get(markup)
+    if result is not None:
+        return result
+
+    if len(markup) > 4 * _maxChars:
+        # Most of it would be cut anyway, don't parse megabytes of markup on
+        # the main loop. It isn't cached either, the key alone would keep the
+        # megabytes alive.
+        return truncate(
+            strip_markup(markup[:4 * _maxChars]), _maxChars, _maxLines), None
+
+    try:
+        # Parameters: markup_text, length, accel_marker
+        # Return: (success, attr_list, text, accel_char)
+        parse_result = Pango.parse_markup(markup, -1, u"\x00")
+        result = truncate(parse_result[2], _maxChars, _maxLines), \
+            parse_result[1]
+    except GLib.GError as e:
+        logging.warning("Invalid pango markup: {}".format(e.message))
+        result = truncate(markup, _maxChars, _maxLines), None
+
+    _parsed.put(markup, result)
+    return result
+
+
+def set_label_contents(label, markup):
+    text, attributes = parse_markup(markup)
+    label.set_text(text)
+    label.set_attributes(attributes)
+
+
+class Popup(Gtk.Window):
+    """
+    A notification window. The widget tree is built once, showing a different
+    notification only changes the label texts, their attributes and the icon.
+    """
+
+    def __init__(self):
+        Gtk.Window.__init__(self, type=Gtk.WindowType.POPUP)
+        self.add_events(Gdk.EventMask.BUTTON_PRESS_MASK)
+
+        # ID of the notification currently shown in this window.
+        self.notification_id = None
+
+        frame = Gtk.Frame()
+        self.add(frame)
+
+        hBox = Gtk.HBox()
+        frame.add(hBox)
+
+        self._iconWidget = Gtk.Image()
+        self._iconWidget.set_no_show_all(True)
+        hBox.pack_start(self._iconWidget, False, False, 0)
+
+        vBox = Gtk.VBox()
+        hBox.pack_start(vBox, False, False, 0)
+
+        self._summaryLabel = Gtk.Label()
+        vBox.pack_start(self._summaryLabel, False, False, 0)
+
+        separator = Gtk.HSeparator()
+        vBox.pack_start(separator, False, False, 0)
+
+        self._bodyLabel = Gtk.Label()
+        vBox.pack_start(self._bodyLabel, False, False, 0)
+
+        # Lists the summaries of earlier notifications of a group.
+        self._earlierLabel = Gtk.Label()
+        self._earlierLabel.set_alignment(0, 0)
+        self._earlierExpander = Gtk.Expander()
+        self._earlierExpander.add(self._earlierLabel)
+        self._earlierExpander.set_no_show_all(True)
+        self._earlierExpander.connect(
+            "notify::expanded", self._earlier_toggled)
+        vBox.pack_start(self._earlierExpander, False, False, 0)
+
+        # Shows how many identical notifications the window stands for.
+        self._countLabel = Gtk.Label()
+        self._countLabel.set_no_show_all(True)
+        hBox.pack_end(self._countLabel, False, False, 0)
+
+    def set_contents(self, summary, body, pixbuf=None, count=1, earlier=()):
+        set_label_contents(self._summaryLabel, summary)
+        set_label_contents(self._bodyLabel, body)
+        self.set_icon(pixbuf)
+        self.set_count(count)
+        self.set_earlier(earlier)
+        # Let the window shrink if the previous contents were larger.
+        self.resize(1, 1)
+
+    def set_icon(self, pixbuf):
+        """
+        @param pixbuf: the GdkPixbuf.Pixbuf to show next to the text or None.
+        """
+        if pixbuf is None:
+            self._iconWidget.clear()
+            self._iconWidget.hide()
+        else:
+            self._iconWidget.set_from_pixbuf(pixbuf)
+            self._iconWidget.show()
+
+    def set_count(self, count):
+        """
+        @param count: the number of notifications the window stands for, the
+                      badge is hidden for 1.
+        """
+        if count > 1:
+            self._countLabel.set_text(u"\u00d7{}".format(count))
+            self._countLabel.show()
+        else:
+            self._countLabel.set_text(u"")
+            self._countLabel.hide()
+
+    def set_earlier(self, summaries):
+        """
+        @param summaries: the summaries of earlier notifications of the group
+                          shown in the window, oldest first. The expander
+                          listing them is hidden if there are none.
+        """
+        if summaries:
+            self._earlierLabel.set_text(u"\n".join(reversed(summaries)))
+            self._earlierLabel.show()
+            self._earlierExpander.set_label(
+                u"{} earlier".format(len(summaries)))
+            self._earlierExpander.show()
+        else:
+            self._earlierLabel.set_text(u"")
+            self._earlierExpander.set_expanded(False)
+            self._earlierExpander.hide()
+
+    def _earlier_toggled(self, expander, pspec):
+        # Let the window shrink again once the list is collapsed.
+        self.resize(1, 1)
+
+    def reset(self):
+        """
+        Drops the contents of the window before it goes back to the pool.
+        """
+        self.notification_id = None
+        self._summaryLabel.set_text(u"")
+        self._summaryLabel.set_attributes(None)
+        self._bodyLabel.set_text(u"")
+        self._bodyLabel.set_attributes(None)
+        self._iconWidget.clear()
+        self._iconWidget.hide()
+        self.set_count(1)
+        self.set_earlier(())
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+#   This file is part of ktm.
+#
+#   ktm is free software; you can redistribute it and/or modify it under the
+#   terms of the GNU General Public License as published by the Free Software
+#   Foundation; either version 3 of the License, or (at your option) any
+#   later version. See the LICENSE file for details.
+
+import collections
+import time
+
+
+_clock = getattr(time, "monotonic", time.time)
+
+
+class RateLimiter(object):
+    """
+    Limits the notifications of every application with a token bucket.
+
+    Each application may send burst notifications at once and then rate
+    notifications per second. Counts how many notifications of the
+    applications throttled most recently were throttled.
+
+    Applications choose their names themselves, so at most MAX_BUCKETS
+    buckets and counters are kept.
+    """
+
+    # Buckets of applications that are back to a full bucket are forgotten
+    # once there are more than this many, then the least recently used ones.
+    MAX_BUCKETS = 256
+
+    def __init__(self, rate=5.0, burst=10, clock=_clock):
+        """
+        @param rate: the number of notifications per second an application
+                     may send in the long run. 0 disables the limit.
+        @param burst: the number of notifications an application may send at
+                      once.
+        @param clock: callable returning the current time in seconds.
+        """
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        # app_name -> [tokens, time of last update], least recently used
+        # first
+        self._buckets = collections.OrderedDict()
+        # app_name -> number of throttled notifications, least recently
+        # throttled first
+        self.throttled = collections.OrderedDict()
+
+    def allow(self, app_name):
+        """
+        Takes a token from the bucket of app_name.
+
+        @returns: True if the notification may be shown, False if it is
+                  over the limit.
+        """
+        if self.rate <= 0:
+            return True
+
+        now = self._clock()
+        bucket = self._buckets.pop(app_name, None)
+        if bucket is None:
+            if len(self._buckets) >= self.MAX_BUCKETS:
+                self._forget_full(now)
+            while len(self._buckets) >= self.MAX_BUCKETS:
+                self._buckets.popitem(last=False)
+            bucket = [float(self.burst), now]
+        else:
+            bucket[0] = min(float(self.burst),
+                            bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        self._buckets[app_name] = bucket
+
+        if bucket[0] >= 1.0:
+            bucket[0] -= 1.0
+            return True
+
+        self.throttled[app_name] = self.throttled.pop(app_name, 0) + 1
+        if len(self.throttled) > self.MAX_BUCKETS:
+            self.throttled.popitem(last=False)
+        return False
+
+    def _forget_full(self, now):
+        for app_name, (tokens, last) in list(self._buckets.items()):
+            if tokens + (now - last) * self.rate >= self.burst:
+                del self._buckets[app_name]
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+#   This file is part of ktm.
+#
+#   ktm is free software; you can redistribute it and/or modify it under the
+#   terms of the GNU General Public License as published by the Free Software
+#   Foundation; either version 3 of the License, or (at your option) any
+#   later version. See the LICENSE file for details.
+
+from __future__ import absolute_import
+
+import collections
+
+from ktm.monitors import PRIMARY
+
+
+class Renderer(object):
+    """
+    Draws the notifications the daemon shows. The daemon decides what is on
+    screen, where and for how long; a renderer only turns that into windows
+    identified by notification ID.
+
+    The daemon sets clicked to a callable taking the ID of a notification the
+    user clicked, and resized to a callable taking the ID and the new
+    (width, height) of a window that changed its size by itself, e.g. once
+    its icon was loaded. area_changed is set to a callable without
+    arguments, to call when the result of area changed, e.g. because a
+    monitor was added.
+    """
+
+    # Settings of renderers that keep windows and icons around, renderers
+    # without either just keep the values.
+    pool_size = 4
+    max_icon_size = 128
+    icon_memory_budget = 32 * 1024 * 1024
+    # The monitor notifications are shown on, see ktm.monitors.parse_monitor.
+    monitor = PRIMARY
+
+    def __init__(self):
+        self.clicked = None
+        self.resized = None
+        self.area_changed = None
+
+    def area(self):
+        """
+        Called for every layout update, so it should be cheap.
+
+        @returns: the (x, y, width, height) notifications are placed in.
+        """
+        raise NotImplementedError
+
+    def show(self, id, summary, body, icon=None, count=1, earlier=()):
+        """
+        Shows a notification in the window for id, creating the window if id
+        has none yet.
+
+        @param icon: an icon as returned by Notification.image.
+        @param count: the number of notifications merged into id.
+        @param earlier: the summaries of earlier notifications of a group.
+        @returns: the (width, height) of the window.
+        """
+        raise NotImplementedError
+
+    def hide(self, id):
+        """
+        Removes the window for id.
+        """
+        raise NotImplementedError
+
+    def move(self, id, x, y):
+        raise NotImplementedError
+
+    def set_text_limits(self, max_chars, max_lines):
+        """
+        @param max_chars: the maximum number of characters shown of a summary
+                          or body.
+        @param max_lines: the maximum number of lines shown of a summary or
+                          body.
+        """
+        pass
+
+
+class RecordingRenderer(Renderer):
+    """
+    A renderer that draws nothing, for running without a display and for
+    measuring everything but drawing. It keeps what would be on screen and
+    counts the calls it gets.
+    """
+
+    def __init__(self, size=(300, 60), area=(0, 0, 1920, 1080), events=0):
+        """
+        @param size: the (width, height) of every window.
+        @param area: the (x, y, width, height) notifications are placed in.
+        @param events: the number of calls to keep in events, 0 keeps none.
+        """
+        Renderer.__init__(self)
+        self.size = size
+        self._area = area
+        # id -> [summary, body, icon, count, earlier, (x, y)]
+        self.windows = {}
+        self.events = collections.deque(maxlen=events)
+        self.shown = self.hidden = self.moved = 0
+
+    def _record(self, *event):
+        if self.events.maxlen:
+            self.events.append(event)
+
+    def area(self):
+        return self._area
+
+    def show(self, id, summary, body, icon=None, count=1, earlier=()):
+        self.shown += 1
+        self._record("show", id, summary, body)
+        window = self.windows.get(id)
+        position = None if window is None else window[5]
+        self.windows[id] = [summary, body, icon, count, tuple(earlier),
+                            position]
+        return self.size
+
+    def hide(self, id):
+        self.hidden += 1
+        self._record("hide", id)
+        del self.windows[id]
+
+    def move(self, id, x, y):
+        self.moved += 1
+        self._record("move", id, x, y)
+        self.windows[id][5] = (x, y)
+
+    def click(self, id):
+        """
+        Acts as if the user clicked the window for id.
+        """
+        self.clicked(id)
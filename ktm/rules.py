@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+#   This file is part of ktm.
+#
+#   ktm is free software; you can redistribute it and/or modify it under the
+#   terms of the GNU General Public License as published by the Free Software
+#   Foundation; either version 3 of the License, or (at your option) any
+#   later version. See the LICENSE file for details.
+
+"""
+Rules decide what happens to a notification before it is shown. They are
+read from an ini file, one section per rule:
+
+    [chat]
+    summary = New message
+    action = count
+
+    [ci]
+    app_name = jenkins
+    urgency = 0
+    action = timeout, priority
+    timeout = 3000
+    priority = low
+
+Conditions, all of which have to match:
+
+    app_name          the application name, ignoring case
+    summary, body     text contained in the summary or body, ignoring case
+    urgency           the urgency hint, 0-2 or low, normal, critical
+    hint.NAME         the value of the hint NAME
+    app_name_regex,
+    summary_regex,
+    body_regex        a regular expression searched in the field
+
+Actions, several can be given separated by commas:
+
+    suppress          drop the notification
+    count             count the notification as unread
+    timeout           use the timeout option as expire timeout in [ms]
+    history           only record the notification in the history
+    priority          queue with the priority option instead of the urgency
+
+All rules matching a notification apply, in the order of the file.
+"""
+
+import io
+import numbers
+import re
+import warnings
+
+try:
+    from ConfigParser import RawConfigParser, Error as ConfigError
+except ImportError:
+    from configparser import RawConfigParser, Error as ConfigError
+
+try:
+    text_type = unicode
+except NameError:
+    text_type = str
+
+
+ACTIONS = ("suppress", "count", "timeout", "history", "priority")
+
+_LEVELS = {"low": 0, "normal": 1, "critical": 2}
+
+# Notifications containing "New message" count as unread, unless a rules file
+# says otherwise.
+DEFAULT_RULES = u"""
+[new-message]
+summary = New message
+action = count
+"""
+
+
+def _level(value):
+    value = value.strip().lower()
+    if value in _LEVELS:
+        return _LEVELS[value]
+    level = int(value)
+    if not 0 <= level <= 2:
+        raise ValueError("level out of range: {}".format(level))
+    return level
+
+
+class Rule(object):
+
+    def __init__(self, name, index):
+        self.name = name
+        self.index = index
+        # Conditions looked up in the combined matcher, see RuleSet.
+        self.keys = []
+        # (field, compiled regex) pairs checked one by one.
+        self.regexes = []
+        self.actions = set()
+        self.timeout = None
+        self.priority = None
+
+
+class RuleResult(object):
+    """
+    What the matching rules decided for a notification.
+    """
+
+    def __init__(self):
+        self.rules = []
+        self.suppress = False
+        self.count = False
+        self.history_only = False
+        self.timeout = None
+        self.priority = None
+
+    def apply(self, rule):
+        self.rules.append(rule.name)
+        actions = rule.actions
+        if "suppress" in actions:
+            self.suppress = True
+        if "count" in actions:
+            self.count = True
+        if "history" in actions:
+            self.history_only = True
+        if "timeout" in actions:
+            self.timeout = rule.timeout
+        if "priority" in actions:
+            self.priority = rule.priority
+
+
+def _trie_pattern(words):
+    """
+    Builds a regular expression matching any of words. Words sharing a prefix
+    share a branch, so the expression doesn't get slower with every word the
+    way a plain alternation does. Longer words are preferred.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = None
+
+    def build(node):
+        branches = [re.escape(char) + build(child)
+                    for char, child in sorted(node.items()) if char != ""]
+        if not branches:
+            return ""
+        if len(branches) == 1 and "" not in node:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")" + ("?" if "" in node else "")
+
+    return build(trie)
+
+
+class _SubstringMatcher(object):
+    """
+    Finds all of a set of words that occur in a text in a single pass.
+    """
+
+    def __init__(self, words):
+        self._words = sorted(set(words))
+        # At every position, the lookahead captures the longest word starting
+        # there. Shorter words contained in it are added from _implied.
+        self._regex = re.compile(
+            u"(?=(" + _trie_pattern(self._words) + u"))", re.UNICODE)
+        self._implied = {}
+
+    def _words_in(self, word):
+        implied = self._implied.get(word)
+        if implied is None:
+            implied = self._implied[word] = \
+                [other for other in self._words if other in word]
+        return implied
+
+    def find(self, text):
+        found = set()
+        for match in self._regex.finditer(text):
+            word = match.group(1)
+            if word and word not in found:
+                found.update(self._words_in(word))
+        return found
+
+
+class RuleSet(object):
+    """
+    A list of rules compiled into one matcher.
+
+    Conditions on app_name, urgency and hints are dictionary lookups, and the
+    summary and body conditions of all rules are found with one regular
+    expression per field. A rule matches if all of its conditions were found;
+    only rules using regular expressions need to be checked on their own.
+    """
+
+    def __init__(self, rules=()):
+        self.rules = list(rules)
+        self._compile()
+
+    @classmethod
+    def from_string(cls, text):
+        """
+        @raise ConfigError: if text isn't a valid ini file, e.g. because an
+                            option comes before the first section header or
+                            is given twice.
+        """
+        parser = RawConfigParser()
+        # Keep the case of hint names.
+        parser.optionxform = str
+        if hasattr(parser, "read_string"):
+            parser.read_string(text_type(text))
+        else:
+            parser.readfp(io.StringIO(text_type(text)))
+        return cls(cls._parse(parser))
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        @raise IOError: if path can't be read.
+        @raise ConfigError: if the file isn't a valid ini file.
+        """
+        with io.open(path, encoding="utf-8") as fp:
+            return cls.from_string(fp.read())
+
+    @staticmethod
+    def _parse(parser):
+        rules = []
+        for name in parser.sections():
+            rule = Rule(name, len(rules))
+            try:
+                for option, value in parser.items(name):
+                    RuleSet._parse_option(rule, option, value)
+                if "timeout" in rule.actions and rule.timeout is None:
+                    raise ValueError("action timeout needs a timeout option")
+                if "priority" in rule.actions and rule.priority is None:
+                    raise ValueError("action priority needs a priority option")
+            except (ValueError, re.error) as e:
+                warnings.warn("Ignoring rule \"{}\": {}".format(name, e))
+                continue
+            rules.append(rule)
+        return rules
+
+    @staticmethod
+    def _parse_option(rule, option, value):
+        if option in ("app_name", "summary", "body"):
+            rule.keys.append((option, value.lower()))
+        elif option == "urgency":
+            rule.keys.append(("urgency", _level(value)))
+        elif option.startswith("hint."):
+            rule.keys.append(("hint", option[5:], value))
+        elif option in ("app_name_regex", "summary_regex", "body_regex"):
+            rule.regexes.append(
+                (option[:-6], re.compile(value, re.UNICODE)))
+        elif option == "action":
+            for action in value.split(","):
+                action = action.strip().lower()
+                if action not in ACTIONS:
+                    raise ValueError("unknown action: {}".format(action))
+                rule.actions.add(action)
+        elif option == "timeout":
+            rule.timeout = int(value)
+        elif option == "priority":
+            rule.priority = _level(value)
+        else:
+            raise ValueError("unknown option: {}".format(option))
+
+    def _compile(self):
+        self._postings = {}
+        self._unconditional = []
+        words = {"summary": [], "body": []}
+
+        for rule in self.rules:
+            if not rule.keys:
+                self._unconditional.append(rule)
+            for key in rule.keys:
+                self._postings.setdefault(key, []).append(rule)
+                if key[0] in words:
+                    words[key[0]].append(key[1])
+
+        self._matchers = dict(
+            (field, _SubstringMatcher(fieldWords))
+            for field, fieldWords in words.items() if fieldWords)
+
+    def _candidates(self, notification):
+        keys = [("app_name", notification.app_name.lower()),
+                ("urgency", notification.urgency)]
+        keys.extend(("hint", name, text_type(value))
+                    for name, value in notification.hints.items()
+                    if isinstance(value, (text_type, numbers.Number)))
+        for field, matcher in self._matchers.items():
+            text = getattr(notification, field).lower()
+            keys.extend((field, word) for word in matcher.find(text))
+
+        found = {}
+        for key in keys:
+            for rule in self._postings.get(key, ()):
+                found[rule] = found.get(rule, 0) + 1
+
+        candidates = [rule for rule, count in found.items()
+                      if count == len(rule.keys)]
+        candidates.extend(self._unconditional)
+        return candidates
+
+    def match(self, notification):
+        """
+        @param notification: the Notification to check.
+        @returns: a RuleResult with the actions of all matching rules.
+        """
+        result = RuleResult()
+        if not self.rules:
+            return result
+
+        candidates = sorted(self._candidates(notification),
+                            key=lambda rule: rule.index)
+        for rule in candidates:
+            if all(regex.search(getattr(notification, field))
+                   for field, regex in rule.regexes):
+                result.apply(rule)
+        return result
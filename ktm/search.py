@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+#   This file is part of ktm.
+#
+#   ktm is free software; you can redistribute it and/or modify it under the
+#   terms of the GNU General Public License as published by the Free Software
+#   Foundation; either version 3 of the License, or (at your option) any
+#   later version. See the LICENSE file for details.
+
+import array
+import bisect
+import heapq
+import re
+
+
+_MARKUP = re.compile(r"<[^>]*>")
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+# Matches in the summary count more than matches in the application name,
+# which count more than matches in the body.
+SUMMARY_WEIGHT, APP_NAME_WEIGHT, BODY_WEIGHT = 3, 2, 1
+
+_MAX_WEIGHT = 0xffff
+
+
+def tokenize(text):
+    """
+    @returns: the lower case words of text, ignoring pango markup tags.
+    """
+    return _TOKEN.findall(_MARKUP.sub(u" ", text).lower())
+
+
+class SearchIndex(object):
+    """
+    An inverted index over the history entries.
+
+    For every word, the index keeps the numbers of the entries containing it
+    in ascending order, along with a weight, and the same numbers split up by
+    weight. A query walks the entries of each of its words in turn, from the
+    highest weight down and, within a weight, from newest to oldest, and
+    scores them by bisection in the others. It stops as soon as no entry left
+    can make it into the requested page of results, so it usually looks at
+    few more entries than it returns instead of every match.
+    """
+
+    def __init__(self):
+        # word -> (array of entry numbers, array of weights,
+        #          {weight: array of entry numbers})
+        self._postings = {}
+        self.count = 0
+
+    def add(self, seq, app_name, summary, body):
+        """
+        Indexes the history entry seq. Entries are usually added in
+        ascending order, but don't have to be.
+        """
+        weights = {}
+        for text, weight in ((summary, SUMMARY_WEIGHT),
+                             (app_name, APP_NAME_WEIGHT),
+                             (body, BODY_WEIGHT)):
+            for token in tokenize(text):
+                weights[token] = weights.get(token, 0) + weight
+
+        for token, weight in weights.items():
+            self._insert(token, seq, min(weight, _MAX_WEIGHT))
+        self.count += 1
+
+    def _insert(self, token, seq, weight):
+        posting = self._postings.get(token)
+        if posting is None:
+            posting = self._postings[token] = (array.array("I"),
+                                               array.array("H"), {})
+        seqs, weights, byWeight = posting
+
+        if not seqs or seqs[-1] < seq:
+            seqs.append(seq)
+            weights.append(weight)
+            byWeight.setdefault(weight, array.array("I")).append(seq)
+            return
+
+        i = bisect.bisect_left(seqs, seq)
+        if i < len(seqs) and seqs[i] == seq:
+            bucket = byWeight[weights[i]]
+            del bucket[bisect.bisect_left(bucket, seq)]
+            if not bucket:
+                del byWeight[weights[i]]
+            weights[i] = weight
+        else:
+            seqs.insert(i, seq)
+            weights.insert(i, weight)
+        bucket = byWeight.setdefault(weight, array.array("I"))
+        bucket.insert(bisect.bisect_left(bucket, seq), seq)
+
+    def search(self, query, offset=0, limit=20):
+        """
+        Finds the entries containing all words of query.
+
+        @returns: the entry numbers of the matches, best matches first and
+                  newer before older ones among equally good matches. Only
+                  limit matches starting at offset are returned.
+        """
+        tokens = set(tokenize(query))
+        wanted = offset + limit
+        if not tokens or limit <= 0:
+            return []
+
+        postings = []
+        for token in tokens:
+            posting = self._postings.get(token)
+            if posting is None:
+                return []
+            postings.append(posting)
+        walks = [_descending(byWeight) for x, y, byWeight in postings]
+        # The (weight, seq) each walk got to.
+        frontier = [None] * len(postings)
+
+        # The best (score, seq) found so far, the worst at best[0].
+        best = []
+        seen = set()
+        while True:
+            for i, walk in enumerate(walks):
+                frontier[i] = next(walk, None)
+                if frontier[i] is None:
+                    # Every match contains this word, so all were seen.
+                    break
+                weight, seq = frontier[i]
+                if seq in seen:
+                    continue
+                seen.add(seq)
+
+                score = 0
+                for seqs, weights, x in postings:
+                    j = bisect.bisect_left(seqs, seq)
+                    if j == len(seqs) or seqs[j] != seq:
+                        break
+                    score += weights[j]
+                else:
+                    if len(best) < wanted:
+                        heapq.heappush(best, (score, seq))
+                    elif (score, seq) > best[0]:
+                        heapq.heapreplace(best, (score, seq))
+            else:
+                # An entry not seen yet is behind the frontier of every walk:
+                # it scores at most the sum of their weights and, if it
+                # scores that much, is older than all of them.
+                if len(best) == wanted and best[0] > (
+                        sum(weight for weight, seq in frontier),
+                        min(seq for weight, seq in frontier)):
+                    break
+                continue
+            break
+
+        best.sort(reverse=True)
+        return [seq for score, seq in best[offset:]]
+
+
+def _descending(byWeight):
+    """
+    @returns: an iterator over the (weight, seq) of a word's entries, highest
+              weight first and newest first within a weight.
+    """
+    for weight in sorted(byWeight, reverse=True):
+        for seq in reversed(byWeight[weight]):
+            yield weight, seq
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+#   This file is part of ktm.
+#
+#   ktm is free software; you can redistribute it and/or modify it under the
+#   terms of the GNU General Public License as published by the Free Software
+#   Foundation; either version 3 of the License, or (at your option) any
+#   later version. See the LICENSE file for details.
+
+import heapq
+import itertools
+
+
+class DeadlineHeap(object):
+    """
+    Holds a deadline for every notification that expires, so a single timer
+    pointing at the earliest deadline is enough for all of them.
+
+    Scheduling, cancelling and popping are O(log n). Entries are cancelled
+    lazily and the heap is rebuilt once most of it consists of cancelled
+    entries.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._entries = {}
+        # Keeps entries with equal deadlines in the order they were added.
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, id):
+        return id in self._entries
+
+    def schedule(self, id, deadline):
+        """
+        Sets the deadline of id, replacing the one it had.
+
+        @param id: the ID of the notification.
+        @param deadline: the time the notification expires at.
+        """
+        self.cancel(id)
+        # An entry is [deadline, counter, id, alive].
+        entry = [deadline, next(self._counter), id, True]
+        self._entries[id] = entry
+        heapq.heappush(self._heap, entry)
+
+    def cancel(self, id):
+        """
+        @returns: True if id had a deadline.
+        """
+        entry = self._entries.pop(id, None)
+        if entry is None:
+            return False
+        entry[3] = False
+        if len(self._heap) > 64 and len(self._heap) > 2 * len(self._entries):
+            self._heap = [entry for entry in self._heap if entry[3]]
+            heapq.heapify(self._heap)
+        return True
+
+    def next_deadline(self):
+        """
+        @returns: the earliest deadline or None if there is none.
+        """
+        heap = self._heap
+        while heap and not heap[0][3]:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def pop_expired(self, now):
+        """
+        Removes all entries whose deadline is not later than now.
+
+        @returns: their IDs, earliest deadline first.
+        """
+        expired = []
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            entry = heapq.heappop(heap)
+            if entry[3]:
+                del self._entries[entry[2]]
+                expired.append(entry[2])
+        return expired
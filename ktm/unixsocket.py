@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+#   This file is part of ktm.
+#
+#   ktm is free software; you can redistribute it and/or modify it under the
+#   terms of the GNU General Public License as published by the Free Software
+#   Foundation; either version 3 of the License, or (at your option) any
+#   later version. See the LICENSE file for details.
+
+from __future__ import absolute_import
+
+import errno
+import logging
+import os
+import socket
+import stat
+
+from gi.repository import GLib
+
+from ktm.ingest import encode_frame, FrameDecoder, FrameError, notify_args
+
+
+class UnixSocketServer(object):
+    """
+    Accepts notifications on a Unix domain socket, in the protocol described
+    in ktm.ingest. They are passed to the Notify method of the daemon, so they
+    go through the same rules, queue and history as the ones sent via D-Bus.
+    """
+
+    def __init__(self, daemon, path):
+        """
+        @param daemon: the NotificationDaemon to pass notifications to.
+        @param path: the path of the socket. A socket left there by a
+                     previous run is replaced.
+        """
+        self._daemon = daemon
+        self._path = path
+        self._connections = set()
+
+        try:
+            if stat.S_ISSOCK(os.stat(path).st_mode):
+                os.unlink(path)
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # Only the user may send notifications.
+        oldMask = os.umask(0o177)
+        try:
+            self._socket.bind(path)
+        finally:
+            os.umask(oldMask)
+        self._socket.listen(16)
+        self._socket.setblocking(False)
+        self._source = GLib.io_add_watch(
+            self._socket.fileno(), GLib.PRIORITY_DEFAULT, GLib.IO_IN,
+            self._accept)
+
+    def _accept(self, fd, condition):
+        try:
+            connection, address = self._socket.accept()
+        except socket.error as e:
+            if e.errno not in (errno.EAGAIN, errno.EWOULDBLOCK):
+                logging.warning("Accepting a connection failed: {}".format(e))
+            return True
+        self._connections.add(_Connection(self, self._daemon, connection))
+        return True
+
+    def _closed(self, connection):
+        self._connections.discard(connection)
+
+    def close(self):
+        """
+        Closes the socket and all connections.
+        """
+        for connection in list(self._connections):
+            connection.close()
+        GLib.source_remove(self._source)
+        self._socket.close()
+        try:
+            os.unlink(self._path)
+        except OSError:
+            pass
+
+
+class _Connection(object):
+    """
+    A client connection. Notifications are handled in batches from idle
+    callbacks. While the client sends faster than they are handled, or
+    doesn't read the answers, the connection isn't read from, so the client
+    blocks once the socket buffers are full.
+    """
+
+    # The maximum number of bytes read at once.
+    READ_SIZE = 65536
+    # The maximum number of notifications handled by one idle callback.
+    BATCH = 256
+    # Reading pauses while more than this many bytes of notifications wait
+    # to be handled or of answers wait to be sent.
+    MAX_BUFFERED = 256 * 1024
+
+    def __init__(self, server, daemon, sock):
+        self._server = server
+        self._daemon = daemon
+        self._socket = sock
+        self._socket.setblocking(False)
+        self._decoder = FrameDecoder()
+        self._output = bytearray()
+        self._eof = False
+        # The connection is closed once the answers are sent.
+        self._closing = False
+        self._watch = None
+        self._condition = 0
+        self._processSource = None
+        self._update_watch()
+
+    def _update_watch(self):
+        """
+        Watches for what the connection is waiting for.
+        """
+        condition = 0
+        if not self._eof and not self._closing and \
+                len(self._decoder) <= self.MAX_BUFFERED and \
+                len(self._output) <= self.MAX_BUFFERED:
+            condition |= GLib.IO_IN
+        if self._output:
+            condition |= GLib.IO_OUT
+
+        if condition == self._condition:
+            return
+        if self._watch is not None:
+            GLib.source_remove(self._watch)
+            self._watch = None
+        self._condition = condition
+        if condition:
+            self._watch = GLib.io_add_watch(
+                self._socket.fileno(), GLib.PRIORITY_DEFAULT,
+                condition | GLib.IO_HUP | GLib.IO_ERR, self._ready)
+
+    def _ready(self, fd, condition):
+        watch = self._watch
+        if condition & (GLib.IO_OUT | GLib.IO_HUP | GLib.IO_ERR):
+            if not self._write():
+                return False
+        if condition & (GLib.IO_IN | GLib.IO_HUP):
+            self._read()
+        elif self._decoder and not self._closing:
+            # Notifications left over when the answers piled up.
+            self._schedule_process()
+
+        if not self._output and (self._closing or
+                                 self._eof and self._processSource is None):
+            self.close()
+            return False
+        self._update_watch()
+        # _update_watch replaced this watch if the condition changed.
+        return self._watch == watch
+
+    def _read(self):
+        try:
+            data = self._socket.recv(self.READ_SIZE)
+        except socket.error as e:
+            if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                return
+            data = b""
+        if not data:
+            self._eof = True
+        else:
+            self._decoder.feed(data)
+        self._schedule_process()
+
+    def _write(self):
+        """
+        @returns: False if the client went away.
+        """
+        try:
+            sent = self._socket.send(self._output)
+        except socket.error as e:
+            if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                return True
+            self.close()
+            return False
+        del self._output[:sent]
+        return True
+
+    def _schedule_process(self):
+        if self._processSource is None:
+            self._processSource = GLib.idle_add(self._process)
+
+    def _process(self):
+        """
+        Passes a batch of notifications to the daemon and queues their
+        answers.
+
+        @returns: True if there are more notifications to handle.
+        """
+        for x in range(self.BATCH):
+            if len(self._output) > self.MAX_BUFFERED:
+                # Handle more once the client read some answers.
+                break
+            try:
+                frame = self._decoder.next_frame()
+            except FrameError as e:
+                self._answer({"error": str(e)})
+                self._closing = True
+                break
+            if frame is None:
+                break
+
+            try:
+                id = self._daemon.Notify(*notify_args(frame))
+            except ValueError as e:
+                self._answer({"error": str(e)})
+            except Exception as e:
+                logging.exception("Error handling a notification")
+                self._answer({"error": str(e)})
+            else:
+                self._answer({"id": id})
+        else:
+            self._update_watch()
+            return True
+
+        self._processSource = None
+        if self._eof and not self._output:
+            self.close()
+        else:
+            self._update_watch()
+        return False
+
+    def _answer(self, message):
+        self._output += encode_frame(self._decoder.mode, message)
+
+    def close(self):
+        if self._watch is not None:
+            GLib.source_remove(self._watch)
+            self._watch = None
+        if self._processSource is not None:
+            GLib.source_remove(self._processSource)
+            self._processSource = None
+        self._socket.close()
+        self._server._closed(self)
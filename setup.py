@@ -9,6 +9,7 @@ try:
     from setuptools import setup
 except ImportError:
     from distutils.core import setup
+from distutils.command.install_data import install_data
 
 import ktm
 
@@ -32,6 +33,32 @@ test_requirements = [
     # TODO: put package test requirements here
 ]
 
+SERVICE_FILE = 'data/org.freedesktop.Notifications.service'
+
+
+class install_service(install_data):
+    """
+    Installs the data files and points the Exec line of the D-Bus service
+    file at the installed ktm script.
+    """
+
+    def run(self):
+        install_data.run(self)
+        install = self.get_finalized_command('install')
+        scripts = install.install_scripts
+        if install.root and scripts.startswith(install.root):
+            # Packages are built in root, but run from where it is unpacked.
+            scripts = os.sep + os.path.relpath(scripts, install.root)
+        for path in self.get_outputs():
+            if path.endswith('.service'):
+                with open(path) as f:
+                    lines = f.read().splitlines()
+                with open(path, 'w') as f:
+                    for line in lines:
+                        if line.startswith('Exec='):
+                            line = 'Exec=' + os.path.join(scripts, 'ktm')
+                        f.write(line + '\n')
+
 setup(
     name='ktm',
     version=version,
@@ -46,6 +73,11 @@ setup(
     package_dir={'ktm':
                  'ktm'},
     include_package_data=True,
+    entry_points={
+        'console_scripts': ['ktm = ktm.ktm:main'],
+    },
+    data_files=[('share/dbus-1/services', [SERVICE_FILE])],
+    cmdclass={'install_data': install_service},
     install_requires=requirements,
     license="GPLv3+",
     zip_safe=False,
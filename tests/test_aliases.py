@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_aliases
+----------------------------------
+
+Tests for `ktm.aliases` module.
+"""
+
+import unittest
+
+from ktm.aliases import AliasMap
+
+
+class TestAliasMap(unittest.TestCase):
+
+    def setUp(self):
+        self.aliases = AliasMap()
+
+    def test_unknown_id_is_own_primary(self):
+        self.assertEqual(self.aliases.primary(7), 7)
+        self.assertNotIn(7, self.aliases)
+        self.assertEqual(self.aliases.pop(7), [])
+
+    def test_add(self):
+        self.aliases.add(2, 1)
+        self.aliases.add(3, 1)
+        self.assertEqual(self.aliases.primary(2), 1)
+        self.assertEqual(self.aliases.primary(3), 1)
+        self.assertIn(2, self.aliases)
+        self.assertNotIn(1, self.aliases)
+        self.assertEqual(len(self.aliases), 2)
+        self.assertEqual(self.aliases.pop(1), [2, 3])
+
+    def test_add_to_alias_uses_its_primary(self):
+        self.aliases.add(2, 1)
+        self.assertEqual(self.aliases.add(3, 2), 1)
+        self.assertEqual(self.aliases.primary(3), 1)
+        self.assertEqual(self.aliases.pop(1), [2, 3])
+
+    def test_add_self_raises(self):
+        self.assertRaises(ValueError, self.aliases.add, 1, 1)
+        self.aliases.add(2, 1)
+        self.assertRaises(ValueError, self.aliases.add, 1, 2)
+
+    def test_add_moves_alias(self):
+        self.aliases.add(3, 1)
+        self.aliases.add(3, 2)
+        self.assertEqual(self.aliases.primary(3), 2)
+        self.assertEqual(self.aliases.pop(1), [])
+        self.assertEqual(self.aliases.pop(2), [3])
+
+    def test_remove(self):
+        self.aliases.add(2, 1)
+        self.aliases.add(3, 1)
+        self.assertEqual(self.aliases.remove(2), 1)
+        self.assertIsNone(self.aliases.remove(2))
+        self.assertEqual(self.aliases.primary(2), 2)
+        self.assertEqual(self.aliases.remove(3), 1)
+        self.assertEqual(len(self.aliases), 0)
+        self.assertEqual(self.aliases.pop(1), [])
+
+    def test_pop(self):
+        self.aliases.add(2, 1)
+        self.aliases.add(3, 1)
+        self.aliases.add(5, 4)
+        self.assertEqual(self.aliases.pop(1), [2, 3])
+        self.assertEqual(self.aliases.pop(1), [])
+        self.assertEqual(self.aliases.primary(2), 2)
+        self.assertEqual(self.aliases.primary(5), 4)
+        self.assertEqual(len(self.aliases), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_cache
+----------------------------------
+
+Tests for `ktm.cache` module.
+"""
+
+import unittest
+
+from ktm.cache import LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = LRUCache(2)
+
+    def test_evicts_least_recently_used(self):
+        self.cache.put("a", 1)
+        self.cache.put("b", 2)
+        self.assertEqual(self.cache.get("a"), 1)
+        self.cache.put("c", 3)
+        self.assertIn("a", self.cache)
+        self.assertNotIn("b", self.cache)
+        self.assertEqual(len(self.cache), 2)
+
+    def test_counts_hits_and_misses(self):
+        self.cache.put("a", 1)
+        self.cache.get("a")
+        self.cache.get("b")
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_cached_none_is_a_hit(self):
+        missing = object()
+        self.cache.put("a", None)
+        self.assertIsNone(self.cache.get("a", missing))
+        self.assertIs(self.cache.get("b", missing), missing)
+
+    def test_weight_bound(self):
+        cache = LRUCache(10, max_weight=10, weigh=len)
+        cache.put("a", "xxxx")
+        cache.put("b", "xxxx")
+        cache.put("c", "xxxx")
+        self.assertNotIn("a", cache)
+        self.assertEqual(cache.weight, 8)
+        cache.pop("b")
+        self.assertEqual(cache.weight, 4)
+
+    def test_oversized_entry_is_kept_alone(self):
+        cache = LRUCache(10, max_weight=10, weigh=len)
+        cache.put("a", "xx")
+        cache.put("b", "x" * 20)
+        self.assertEqual(list(cache._data), ["b"])
+        self.assertEqual(cache.weight, 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_counter
+----------------------------------
+
+Tests for `ktm.counter` module.
+"""
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from ktm.counter import UnreadCounter
+
+
+class TestUnreadCounter(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "unread_notifications")
+        self.counter = UnreadCounter(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def read(self):
+        with io.open(self.path) as fp:
+            return fp.read()
+
+    def test_saves_only_when_changed(self):
+        self.assertTrue(self.counter.save())
+        self.assertEqual(self.read(), u"0")
+        self.assertFalse(self.counter.save())
+        self.counter.increment()
+        self.counter.increment()
+        self.assertTrue(self.counter.save())
+        self.assertEqual(self.read(), u"2")
+
+    def test_no_temporary_files_left(self):
+        self.counter.save()
+        self.counter.increment()
+        self.counter.save()
+        self.assertEqual(os.listdir(self.dir), ["unread_notifications"])
+
+
+if __name__ == '__main__':
+    unittest.main()
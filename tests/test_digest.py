@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_digest
+----------------------------------
+
+Tests for `ktm.digest` module.
+"""
+
+import unittest
+
+from ktm.digest import Digest, format_digest
+
+
+class TestDigest(unittest.TestCase):
+
+    def setUp(self):
+        self.digest = Digest(threshold=3)
+
+    def test_groups_by_app(self):
+        self.assertEqual(self.digest.groups(), [])
+        self.digest.add(1, "mail", "a")
+        self.digest.add(2, "ci", "b")
+        self.digest.add(4, "mail", "c")
+        self.assertEqual(self.digest.groups(),
+                         [("mail", ["a", "c"]), ("ci", ["b"])])
+        self.assertEqual(len(self.digest), 3)
+
+    def test_threshold(self):
+        self.assertFalse(self.digest.add(1, "mail", "a"))
+        self.assertFalse(self.digest.add(2, "mail", "b"))
+        self.assertTrue(self.digest.add(3, "mail", "c"))
+
+    def test_add_replaces_in_place(self):
+        self.digest.add(1, "mail", "a")
+        self.digest.add(2, "mail", "b")
+        self.assertFalse(self.digest.add(1, "mail", "a2"))
+        self.assertEqual(list(self.digest), [1, 2])
+        self.assertEqual(self.digest.groups(), [("mail", ["a2", "b"])])
+
+    def test_remove(self):
+        self.digest.add(1, "mail", "a")
+        self.assertIn(1, self.digest)
+        self.assertTrue(self.digest.remove(1))
+        self.assertFalse(self.digest.remove(1))
+        self.assertNotIn(1, self.digest)
+
+    def test_iter(self):
+        self.digest.add(4, "mail", "a")
+        self.digest.add(2, "ci", "b")
+        self.assertEqual(list(self.digest), [4, 2])
+
+
+class TestFormatDigest(unittest.TestCase):
+
+    def test_format(self):
+        summary, body = format_digest(
+            [("mail", ["a", "b", "c <x>"]), ("", ["d"])], lines=2)
+        self.assertEqual(summary, u"4 notifications")
+        self.assertEqual(body.split(u"\n"), [
+            u"<b>mail</b> (3)",
+            u"  b",
+            u"  c &lt;x&gt;",
+            u"  … and 1 earlier",
+            u"<b>Unknown</b> (1)",
+            u"  d"])
+
+    def test_single(self):
+        self.assertEqual(format_digest([("ci", ["done"])])[0],
+                         u"1 notification")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_gdbus
+----------------------------------
+
+Tests for `ktm.gdbus` module.
+"""
+
+import unittest
+
+try:
+    from gi.repository import GLib, Gio
+    from ktm.gdbus import _unpack, introspection_xml
+    HAVE_GI = True
+except ImportError:
+    HAVE_GI = False
+
+try:
+    from ktm.ktm import NotificationDaemon, KTM_INTERFACE
+    HAVE_DBUS = HAVE_GI and \
+        hasattr(NotificationDaemon.Notify, "_dbus_is_method")
+except ImportError:
+    HAVE_DBUS = False
+
+
+NOTIFY = u"(susssasa{sv}i)"
+
+ARGS = (u"app", 3, u"icon", u"summary", u"body", [u"default", u"Open"],
+        {u"urgency": GLib.Variant(u"y", 2),
+         u"category": GLib.Variant(u"s", u"im"),
+         u"image-data": GLib.Variant(u"(iiibiiay)",
+             (1, 2, 4, True, 8, 4, b"\x01\x02\x03\x04\x05\x06\x07\x08"))},
+        5000) if HAVE_GI else None
+
+
+def unpack_args(variant):
+    return [_unpack(variant.get_child_value(x))
+            for x in range(variant.n_children())]
+
+
+@unittest.skipUnless(HAVE_GI, "needs PyGObject")
+class TestUnpack(unittest.TestCase):
+
+    def check_notify(self, args):
+        appName, replacesId, icon, summary, body, actions, hints, timeout = \
+            args
+        self.assertEqual(appName, u"app")
+        self.assertEqual(replacesId, 3)
+        self.assertEqual((icon, summary, body), (u"icon", u"summary", u"body"))
+        self.assertEqual(actions, [u"default", u"Open"])
+        self.assertEqual(timeout, 5000)
+        self.assertEqual(hints[u"urgency"], 2)
+        self.assertEqual(hints[u"category"], u"im")
+
+        image = hints[u"image-data"]
+        self.assertEqual(image[:6], (1, 2, 4, True, 8, 4))
+        self.assertIsInstance(image[6], GLib.Bytes)
+        self.assertEqual(image[6].get_data(),
+                         b"\x01\x02\x03\x04\x05\x06\x07\x08")
+
+    def test_notify(self):
+        self.check_notify(unpack_args(GLib.Variant(NOTIFY, ARGS)))
+
+    def test_notify_many(self):
+        args = unpack_args(
+            GLib.Variant(u"(a" + NOTIFY + u")", ([ARGS, ARGS],)))
+        self.assertEqual(len(args), 1)
+        self.assertEqual(len(args[0]), 2)
+        for notification in args[0]:
+            self.check_notify(list(notification))
+
+    def test_strings_are_text(self):
+        summary = _unpack(GLib.Variant(u"s", u"caf\xe9"))
+        self.assertEqual(summary, u"caf\xe9")
+        self.assertIsInstance(summary, type(u""))
+
+
+@unittest.skipUnless(HAVE_DBUS, "needs PyGObject and dbus-python")
+class TestIntrospection(unittest.TestCase):
+
+    def setUp(self):
+        self.node = Gio.DBusNodeInfo.new_for_xml(
+            introspection_xml(NotificationDaemon))
+
+    def signature(self, args):
+        return u"".join(arg.signature for arg in args)
+
+    def test_notify(self):
+        interface = self.node.lookup_interface(
+            u"org.freedesktop.Notifications")
+        method = interface.lookup_method(u"Notify")
+        self.assertEqual(self.signature(method.in_args), u"susssasa{sv}i")
+        self.assertEqual(self.signature(method.out_args), u"u")
+        self.assertIsNotNone(
+            interface.lookup_signal(u"NotificationClosed"))
+
+    def test_notify_many(self):
+        interface = self.node.lookup_interface(KTM_INTERFACE)
+        method = interface.lookup_method(u"NotifyMany")
+        self.assertEqual(self.signature(method.in_args),
+                         u"a(susssasa{sv}i)")
+        self.assertEqual(self.signature(method.out_args), u"au")
+
+
+if __name__ == '__main__':
+    unittest.main()
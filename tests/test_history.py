@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_history
+----------------------------------
+
+Tests for `ktm.history` module.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from ktm.history import History, REASON_REPLACED
+from ktm.notification import Notification
+
+
+def make_notification(summary, app_name=u"app"):
+    return Notification(
+        app_name, u"", summary, u"body", [],
+        {u"urgency": 1, u"category": u"im", u"image-data": (1, 1)}, -1)
+
+
+class TestHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.history = History(self.dir, segment_size=200)
+
+    def tearDown(self):
+        self.history.shutdown()
+        shutil.rmtree(self.dir)
+
+    def test_append_and_get(self):
+        seq = self.history.append(7, make_notification(u"hello"), 100.0)
+        self.assertEqual(seq, 0)
+        entry = self.history.get(seq)
+        self.assertEqual(entry["id"], 7)
+        self.assertEqual(entry["summary"], u"hello")
+        self.assertEqual(entry["created"], 100.0)
+        self.assertEqual(entry["hints"], {u"urgency": 1, u"category": u"im"})
+        self.assertIsNone(entry["closed"])
+        self.assertIsNone(self.history.get(1))
+
+    def test_close(self):
+        seq = self.history.append(1, make_notification(u"hello"))
+        self.history.close(seq, REASON_REPLACED, 200.0)
+        entry = self.history.get(seq)
+        self.assertEqual((entry["reason"], entry["closed"]),
+                         (REASON_REPLACED, 200.0))
+
+    def test_segments_and_recent(self):
+        for i in range(20):
+            self.history.append(i, make_notification(u"n{}".format(i)))
+        self.history.flush()
+        self.assertTrue(len([name for name in os.listdir(self.dir)
+                             if name.endswith(".log")]) > 1)
+        self.assertEqual([e["summary"] for e in self.history.recent(3)],
+                         [u"n19", u"n18", u"n17"])
+        self.assertEqual([e["seq"] for e in self.history.entries([5, 2, 99])],
+                         [5, 2])
+
+    def test_scan(self):
+        for i in range(10):
+            self.history.append(i, make_notification(u"n{}".format(i)))
+            self.history.close(i, 1)
+        self.assertEqual([e["seq"] for e in self.history.scan()],
+                         list(range(10)))
+        self.assertEqual([e["seq"] for e in self.history.scan(3)], [0, 1, 2])
+
+    def test_reopen(self):
+        for i in range(5):
+            self.history.append(i, make_notification(u"n{}".format(i)))
+        self.history.close(4, 1)
+        self.history.shutdown()
+
+        self.history = History(self.dir, segment_size=200)
+        self.assertEqual(len(self.history), 5)
+        seq = self.history.append(9, make_notification(u"again"))
+        self.assertEqual(seq, 5)
+        self.assertEqual(self.history.get(4)["reason"], 1)
+        self.assertEqual(self.history.get(5)["summary"], u"again")
+
+    def test_reopen_after_crash(self):
+        for i in range(3):
+            self.history.append(i, make_notification(u"n{}".format(i)))
+        self.history.close(2, 1)
+        self.history.shutdown()
+        # An entry without index record and half a line.
+        log = os.path.join(self.dir, "{:08d}.log".format(
+            self.history._segment))
+        with open(log, "ab") as fp:
+            fp.write(b'{"seq": 3, "summary": "lost"}\n{"seq": 4, "su')
+
+        self.history = History(self.dir, segment_size=200)
+        for i in range(3, 6):
+            self.history.append(i, make_notification(u"n{}".format(i)))
+        self.assertEqual([e["summary"] for e in self.history.scan()],
+                         [u"n{}".format(i) for i in range(6)])
+        self.assertEqual(self.history.get(2)["reason"], 1)
+
+    def test_read_while_writing(self):
+        self.history.append(0, make_notification(u"n0"))
+        self.history.flush()
+
+        # Reads don't wait for the writer thread.
+        release = threading.Event()
+        write = self.history._write
+
+        def blocked(*args):
+            release.wait()
+            write(*args)
+        self.history._write = blocked
+
+        def check():
+            self.assertEqual(
+                [(e["summary"], e["reason"], e["closed"])
+                 for e in self.history.recent(5)],
+                [(u"n1", 2, 300.0), (u"n0", 1, 200.0)])
+            self.assertEqual(self.history.get(1)["created"], 100.0)
+            self.assertEqual([e["seq"] for e in self.history.entries([1])],
+                             [1])
+            self.assertEqual([e["seq"] for e in self.history.scan()], [0, 1])
+
+        try:
+            self.history.append(1, make_notification(u"n1"), 100.0)
+            self.history.close(0, 1, 200.0)
+            self.history.close(1, 2, 300.0)
+            check()
+        finally:
+            release.set()
+        self.history.flush()
+        check()
+
+    def test_private(self):
+        path = os.path.join(self.dir, "new")
+        history = History(path, segment_size=200)
+        for i in range(10):
+            history.append(i, make_notification(u"n{}".format(i)))
+        history.shutdown()
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o700)
+        names = os.listdir(path)
+        self.assertTrue(len(names) > 2)
+        for name in names:
+            self.assertEqual(
+                os.stat(os.path.join(path, name)).st_mode & 0o777, 0o600)
+
+
+if __name__ == '__main__':
+    unittest.main()
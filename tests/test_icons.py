@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_icons
+----------------------------------
+
+Tests for `ktm.icons` module.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+
+try:
+    from gi.repository import GLib, GdkPixbuf, Gtk
+    from ktm.icons import IconCache
+    HAVE_DISPLAY = Gtk.init_check(None)[0]
+except (ImportError, ValueError):
+    HAVE_DISPLAY = False
+
+
+@unittest.skipUnless(HAVE_DISPLAY, "needs GTK and a display")
+class TestRequest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "icon.png")
+        pixbuf = GdkPixbuf.Pixbuf.new(GdkPixbuf.Colorspace.RGB, True, 8, 4, 4)
+        pixbuf.fill(0xff0000ff)
+        pixbuf.savev(self.path, "png", [], [])
+
+        self.icons = IconCache()
+        self.loaded = []
+        warnings.simplefilter("ignore")
+
+    def tearDown(self):
+        warnings.resetwarnings()
+        shutil.rmtree(self.dir)
+
+    def run_loop(self, timeout=2):
+        context = GLib.MainContext.default()
+        deadline = GLib.get_monotonic_time() + timeout * 1000000
+        while GLib.get_monotonic_time() < deadline:
+            context.iteration(False)
+
+    def request(self, tag):
+        return self.icons.request(
+            unicode_path(self.path), lambda pixbuf: self.loaded.append(
+                (tag, pixbuf)))
+
+    def test_loads_async(self):
+        pixbuf, ticket = self.request("a")
+        self.assertIsNotNone(ticket)
+        self.assertEqual(self.loaded, [])
+        self.run_loop()
+        self.assertEqual(len(self.loaded), 1)
+        self.assertEqual(self.loaded[0][1].get_width(), 4)
+
+    def test_cached_file_not_loaded_again(self):
+        self.request("a")
+        self.run_loop()
+        pixbuf, ticket = self.request("b")
+        self.assertIs(pixbuf, self.loaded[0][1])
+        self.run_loop()
+        self.assertEqual([tag for tag, pixbuf in self.loaded], ["a"])
+
+    def test_cancel(self):
+        pixbuf, ticket = self.request("a")
+        self.icons.cancel(ticket)
+        self.run_loop()
+        self.assertEqual(self.loaded, [])
+
+    def test_cancel_then_request(self):
+        pixbuf, ticket = self.request("a")
+        self.icons.cancel(ticket)
+        self.request("b")
+        self.run_loop()
+        self.assertEqual([tag for tag, pixbuf in self.loaded], ["b"])
+
+    def test_timeout(self):
+        self.icons.load_timeout = 10
+        self.icons._file_checked = lambda source, result, load: None
+        pixbuf, ticket = self.request("a")
+        self.run_loop(0.1)
+        self.assertEqual(self.loaded, [("a", None)])
+
+    def test_missing_file(self):
+        os.remove(self.path)
+        self.request("a")
+        self.run_loop()
+        self.assertEqual(self.loaded, [("a", None)])
+
+    def test_theme_icon_not_requested(self):
+        pixbuf, ticket = self.icons.request(u"image-loading", None)
+        self.assertIsNone(ticket)
+
+
+def unicode_path(path):
+    if isinstance(path, bytes):
+        return path.decode("utf-8")
+    return path
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_ingest
+----------------------------------
+
+Tests for `ktm.ingest` module.
+"""
+
+import struct
+import unittest
+
+from ktm.ingest import encode_frame, FrameDecoder, FrameError, LINES, \
+    notify_args, PREFIXED
+
+
+def prefixed(data):
+    return struct.pack(">I", len(data)) + data
+
+
+class TestFrameDecoder(unittest.TestCase):
+
+    def setUp(self):
+        self.decoder = FrameDecoder(max_frame=64)
+
+    def frames(self):
+        frames = []
+        frame = self.decoder.next_frame()
+        while frame is not None:
+            frames.append(frame)
+            frame = self.decoder.next_frame()
+        return frames
+
+    def test_empty(self):
+        self.assertIsNone(self.decoder.next_frame())
+        self.assertIsNone(self.decoder.mode)
+
+    def test_lines(self):
+        self.decoder.feed(b'{"a": 1}\n\n{"b": 2}\n{"c"')
+        self.assertEqual(self.frames(), [b'{"a": 1}', b'{"b": 2}'])
+        self.assertEqual(self.decoder.mode, LINES)
+        self.assertEqual(len(self.decoder), 4)
+        self.decoder.feed(b': 3}\n')
+        self.assertEqual(self.frames(), [b'{"c": 3}'])
+        self.assertEqual(len(self.decoder), 0)
+
+    def test_leading_whitespace_means_lines(self):
+        self.decoder.feed(b'\n{}\n')
+        self.assertEqual(self.frames(), [b'{}'])
+        self.assertEqual(self.decoder.mode, LINES)
+
+    def test_prefixed(self):
+        data = prefixed(b'{"a": 1}') + prefixed(b'{"b": 2}')
+        # One byte at a time.
+        frames = []
+        for x in range(len(data)):
+            self.decoder.feed(data[x:x + 1])
+            frames.extend(self.frames())
+        self.assertEqual(frames, [b'{"a": 1}', b'{"b": 2}'])
+        self.assertEqual(self.decoder.mode, PREFIXED)
+
+    def test_line_too_long(self):
+        self.decoder.feed(b"{" + b" " * 64)
+        self.assertRaises(FrameError, self.decoder.next_frame)
+
+    def test_prefixed_too_long(self):
+        self.decoder.feed(struct.pack(">I", 65))
+        self.assertRaises(FrameError, self.decoder.next_frame)
+
+    def test_many_frames(self):
+        decoder = FrameDecoder()
+        for x in range(20000):
+            decoder.feed(b'{"x": ' + str(x).encode("ascii") + b'}\n')
+        count = 0
+        while decoder.next_frame() is not None:
+            count += 1
+        self.assertEqual(count, 20000)
+        self.assertEqual(len(decoder), 0)
+
+
+class TestEncodeFrame(unittest.TestCase):
+
+    def test_round_trip(self):
+        for mode in (LINES, PREFIXED):
+            decoder = FrameDecoder()
+            decoder.feed(encode_frame(mode, {"id": 1}))
+            decoder.feed(encode_frame(mode, {"error": u"\xe4"}))
+            self.assertEqual(decoder.next_frame(), b'{"id":1}')
+            self.assertEqual(decoder.mode, mode)
+            self.assertEqual(decoder.next_frame(), b'{"error":"\\u00e4"}')
+
+
+class TestNotifyArgs(unittest.TestCase):
+
+    def test_defaults(self):
+        self.assertEqual(notify_args(b'{"summary": "s"}'),
+                         (u"", 0, u"", u"s", u"", [], {}, -1))
+
+    def test_all(self):
+        self.assertEqual(notify_args(
+            b'{"app_name": "a", "replaces_id": 3, "app_icon": "i", '
+            b'"summary": "s", "body": "b", "actions": ["x", "X"], '
+            b'"hints": {"urgency": 2}, "expire_timeout": 100}'),
+            (u"a", 3, u"i", u"s", u"b", [u"x", u"X"], {u"urgency": 2}, 100))
+
+    def test_invalid(self):
+        for frame in (b'[]', b'{"summary": 1}', b'{"replaces_id": -1}',
+                      b'{"expire_timeout": true}', b'{"actions": [1]}',
+                      b'{"hints": {"image-data": []}}', b'{"summary"'):
+            self.assertRaises(ValueError, notify_args, frame)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,9 +8,648 @@ test_ktm
 Tests for `ktm` module.
 """
 
+import collections
+import os
+import shutil
+import sys
+import tempfile
+import types
 import unittest
+import warnings
+
+
+def _module(name, **attributes):
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    sys.modules[name] = module
+    return module
+
+
+# The daemon is tested with a RecordingRenderer and the loop below, without a
+# bus. Where dbus-python or PyGObject are missing, stand-ins for the little
+# ktm uses at import time take their place.
+try:
+    import dbus.mainloop.glib
+    import dbus.service
+except ImportError:
+    def _decorator(**kwargs):
+        return lambda function: function
+
+    class _Object(object):
+        def __init__(self, *args, **kwargs):
+            pass
+
+    _dbus = _module("dbus", SessionBus=None)
+    _dbus.service = _module("dbus.service", Object=_Object, BusName=None,
+                            method=_decorator, signal=_decorator)
+    _dbus.mainloop = _module("dbus.mainloop")
+    _dbus.mainloop.glib = _module("dbus.mainloop.glib")
+
+try:
+    from gi.repository import GLib
+except ImportError:
+    _gi = _module("gi", require_version=lambda *args: None)
+    _gi.repository = _module("gi.repository", GLib=types.ModuleType("GLib"))
 
 from ktm import ktm
+from ktm.render import RecordingRenderer
+from ktm.rules import RuleSet
+
+
+class FakeLoop(object):
+    """
+    Takes the place of GLib in ktm.ktm. Idle callbacks run when run() is
+    called, in order of priority, timeouts when advance() gets the clock past
+    their time.
+    """
+
+    PRIORITY_HIGH_IDLE = 100
+    PRIORITY_DEFAULT_IDLE = 200
+    PRIORITY_LOW = 300
+
+    def __init__(self):
+        self.now = 0
+        self._sources = {}
+        self._nextID = 1
+
+    def _add(self, when, priority, function, args):
+        id = self._nextID
+        self._nextID += 1
+        self._sources[id] = (when, priority, function, args)
+        return id
+
+    def idle_add(self, function, *args, **kwargs):
+        priority = kwargs.get("priority", self.PRIORITY_DEFAULT_IDLE)
+        return self._add(None, priority, function, args)
+
+    def timeout_add(self, interval, function, *args):
+        return self._add(self.now + interval, 0, function, args)
+
+    def timeout_add_seconds(self, interval, function, *args):
+        return self.timeout_add(interval * 1000, function, *args)
+
+    def source_remove(self, id):
+        del self._sources[id]
+
+    def get_monotonic_time(self):
+        return self.now * 1000
+
+    def _dispatch(self, id):
+        when, priority, function, args = self._sources[id]
+        if not function(*args):
+            self._sources.pop(id, None)
+
+    def idle_sources(self):
+        return sum(1 for source in self._sources.values()
+                   if source[0] is None)
+
+    def run(self):
+        """
+        Runs idle callbacks until there are none left.
+
+        @returns: the number of callbacks run.
+        """
+        count = 0
+        while True:
+            idle = [(source[1], id) for id, source in self._sources.items()
+                    if source[0] is None]
+            if not idle:
+                return count
+            self._dispatch(min(idle)[1])
+            count += 1
+
+    def advance(self, ms):
+        """
+        Moves the clock forward by ms, running timeouts and idle callbacks
+        on the way.
+        """
+        end = self.now + ms
+        while True:
+            self.run()
+            due = [(source[0], id) for id, source in self._sources.items()
+                   if source[0] is not None and source[0] <= end]
+            if not due:
+                break
+            self.now, id = min(due)
+            self._dispatch(id)
+        self.now = end
+
+
+class DaemonTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+        self.loop = FakeLoop()
+        self._patched = ktm.GLib, ktm.UNREAD_FILE
+        ktm.GLib = self.loop
+        ktm.UNREAD_FILE = os.path.join(self.tempDir, "unread")
+
+        self.renderer = RecordingRenderer()
+        self.daemon = ktm.NotificationDaemon(
+            None, os.path.join(self.tempDir, "history"), self.renderer)
+        self.daemon.rate_limit = 0
+        self.closed = []
+        self.daemon.NotificationClosed = \
+            lambda id, reason: self.closed.append((id, reason))
+        self.loop.run()
+
+    def tearDown(self):
+        self.daemon.shutdown()
+        ktm.GLib, ktm.UNREAD_FILE = self._patched
+        shutil.rmtree(self.tempDir)
+
+    def notify(self, summary, app_name=u"app", replaces_id=0, hints=None,
+               expire_timeout=-1):
+        return self.daemon.Notify(app_name, replaces_id, u"", summary, u"",
+                                  [], hints or {}, expire_timeout)
+
+    def window(self, id):
+        """
+        @returns: the (summary, count, earlier) shown in the window of id.
+        """
+        summary, body, icon, count, earlier, position = \
+            self.renderer.windows[id]
+        return summary, count, earlier
+
+
+class TestUpdate(DaemonTestCase):
+
+    def test_changes_coalesced(self):
+        ids = [self.notify(u"message {}".format(x)) for x in range(3)]
+        self.daemon.CloseNotification(ids[1])
+        self.assertEqual(self.loop.idle_sources(), 1)
+        self.loop.run()
+        # The closed notification never got a window.
+        self.assertEqual(sorted(self.renderer.windows), [ids[0], ids[2]])
+        self.assertEqual((self.renderer.shown, self.renderer.hidden,
+                          self.renderer.moved), (2, 0, 2))
+
+        self.daemon.CloseNotification(ids[0])
+        self.notify(u"new")
+        self.loop.run()
+        self.assertEqual((self.renderer.shown, self.renderer.hidden), (3, 1))
+
+    def test_render_error_frees_slot(self):
+        def show(id, summary, *args):
+            if summary == u"bad":
+                raise ValueError(summary)
+            return RecordingRenderer.show(self.renderer, id, summary, *args)
+        self.renderer.show = show
+        self.daemon.max_visible = 1
+        bad = self.notify(u"bad")
+        good = self.notify(u"good")
+        self.loop.run()
+        self.assertEqual(self.closed, [(bad, 4)])
+        self.assertEqual(list(self.renderer.windows), [good])
+
+
+class TestRenderBudget(DaemonTestCase):
+
+    def setUp(self):
+        DaemonTestCase.setUp(self)
+        self.renderer.events = collections.deque(maxlen=100)
+        self.daemon.render_budget = 8
+
+        # Every window takes 5 ms to render.
+        def show(*args):
+            self.loop.now += 5
+            return RecordingRenderer.show(self.renderer, *args)
+        self.renderer.show = show
+
+    def calls(self):
+        return [event[0] for event in self.renderer.events]
+
+    def test_notify_answers_before_rendering(self):
+        self.notify(u"message")
+        self.assertEqual(self.renderer.shown, 0)
+        self.loop.run()
+        self.assertEqual(self.renderer.shown, 1)
+
+    def test_slices(self):
+        for x in range(5):
+            self.notify(u"message {}".format(x))
+        self.loop.run()
+        # Every slice renders until the budget is used up, then places the
+        # windows rendered so far.
+        self.assertEqual(self.calls(), ["show", "show", "move", "move"] * 2 +
+                         ["show", "move"])
+
+    def test_at_least_one_per_slice(self):
+        self.daemon.render_budget = 1
+        for x in range(2):
+            self.notify(u"message {}".format(x))
+        self.loop.run()
+        self.assertEqual(self.calls(), ["show", "move", "show", "move"])
+
+
+class TestQueue(DaemonTestCase):
+
+    def setUp(self):
+        DaemonTestCase.setUp(self)
+        self.daemon.max_visible = 2
+
+    def test_single_update(self):
+        ids = [self.notify(u"message {}".format(x)) for x in range(5)]
+        self.assertEqual(self.loop.idle_sources(), 1)
+        self.loop.run()
+        self.assertEqual(sorted(self.renderer.windows), ids[:2])
+        self.assertEqual(self.renderer.shown, 2)
+        self.assertEqual(len(self.daemon._pending), 3)
+
+    def test_promotion(self):
+        ids = [self.notify(u"message {}".format(x)) for x in range(3)]
+        critical = self.notify(u"critical", hints={u"urgency": 2})
+        self.loop.run()
+        self.daemon.CloseNotification(ids[0])
+        self.loop.run()
+        self.assertEqual(sorted(self.renderer.windows), [ids[1], critical])
+        self.daemon.CloseNotification(critical)
+        self.loop.run()
+        self.assertEqual(sorted(self.renderer.windows), ids[1:])
+
+    def test_replace_queued(self):
+        ids = [self.notify(u"message {}".format(x)) for x in range(3)]
+        self.assertEqual(self.notify(u"changed", replaces_id=ids[2]), ids[2])
+        self.daemon.CloseNotification(ids[0])
+        self.loop.run()
+        self.assertEqual(self.window(ids[2]), (u"changed", 1, ()))
+        self.assertEqual(self.closed, [(ids[0], 3)])
+
+
+class TestExpiry(DaemonTestCase):
+
+    def test_expire(self):
+        short = self.notify(u"short", expire_timeout=1000)
+        default = self.notify(u"default")
+        sticky = self.notify(u"sticky", expire_timeout=0)
+        self.loop.run()
+        self.loop.advance(999)
+        self.assertEqual(self.closed, [])
+        self.loop.advance(1)
+        self.assertEqual(self.closed, [(short, 1)])
+        self.assertEqual(sorted(self.renderer.windows), [default, sticky])
+        # Longer timeouts are cut to max_expire_timeout.
+        self.loop.advance(self.daemon.max_expire_timeout)
+        self.assertEqual(self.closed, [(short, 1), (default, 1)])
+        self.assertEqual(list(self.renderer.windows), [sticky])
+
+    def test_replace_restarts_timeout(self):
+        id = self.notify(u"first", expire_timeout=1000)
+        self.loop.run()
+        self.loop.advance(800)
+        self.notify(u"second", replaces_id=id, expire_timeout=1000)
+        self.loop.advance(800)
+        self.assertEqual(self.closed, [])
+        self.loop.advance(200)
+        self.assertEqual(self.closed, [(id, 1)])
+
+    def test_close_cancels_timeout(self):
+        id = self.notify(u"first", expire_timeout=1000)
+        self.loop.run()
+        self.daemon.CloseNotification(id)
+        self.loop.advance(1000)
+        self.assertEqual(self.closed, [(id, 3)])
+
+
+class TestCoalesce(DaemonTestCase):
+
+    def test_repeats(self):
+        ids = [self.notify(u"same") for x in range(3)]
+        other = self.notify(u"other")
+        self.loop.run()
+        self.assertEqual(sorted(self.renderer.windows), [ids[0], other])
+        self.assertEqual(self.window(ids[0]), (u"same", 3, ()))
+
+        self.daemon.CloseNotification(ids[1])
+        self.loop.run()
+        self.assertEqual(self.closed, [(ids[1], 3)])
+        self.assertEqual(self.window(ids[0]), (u"same", 2, ()))
+
+    def test_repeats_expire_together(self):
+        ids = [self.notify(u"same", expire_timeout=1000) for x in range(2)]
+        self.loop.run()
+        self.loop.advance(1000)
+        self.assertEqual(self.closed, [(id, 1) for id in ids])
+        self.assertEqual(self.renderer.windows, {})
+
+    def test_no_coalesce(self):
+        self.daemon.coalesce = False
+        ids = [self.notify(u"same") for x in range(2)]
+        self.loop.run()
+        self.assertEqual(sorted(self.renderer.windows), ids)
+
+
+class TestBatches(DaemonTestCase):
+
+    def notifications(self, *summaries):
+        return [(u"app", 0, u"", summary, u"", [], {}, -1)
+                for summary in summaries]
+
+    def test_notify_many(self):
+        ids = self.daemon.NotifyMany(self.notifications(u"a", u"b", u"c"))
+        self.assertEqual(ids, [1, 2, 3])
+        self.assertEqual(self.loop.idle_sources(), 1)
+        self.loop.run()
+        self.assertEqual(self.window(2), (u"b", 1, ()))
+        self.assertEqual(self.renderer.shown, 3)
+
+    def test_close_many(self):
+        self.daemon.max_visible = 2
+        ids = self.daemon.NotifyMany(self.notifications(u"a", u"b", u"c",
+                                                        u"d"))
+        self.loop.run()
+        shown = self.renderer.shown
+        with warnings.catch_warnings(record=True):
+            warnings.simplefilter("always")
+            self.daemon.CloseMany([ids[1], 99, ids[3], ids[0]])
+        self.assertEqual(self.closed,
+                         [(ids[1], 3), (ids[3], 3), (ids[0], 3)])
+        # The queued notification takes one of the places freed by the
+        # batch, in the same update that hides the closed windows.
+        self.assertEqual(self.loop.idle_sources(), 1)
+        self.loop.run()
+        self.assertEqual(list(self.renderer.windows), [ids[2]])
+        self.assertEqual(self.renderer.shown, shown + 1)
+
+    def test_close_many_merged(self):
+        self.daemon.group_by_app = True
+        ids = self.daemon.NotifyMany(self.notifications(u"a", u"b", u"c"))
+        self.loop.run()
+        self.daemon.CloseMany([ids[2], ids[0]])
+        self.loop.run()
+        self.assertEqual(self.closed, [(ids[2], 3), (ids[0], 3)])
+        self.assertEqual(self.window(ids[0]), (u"b", 1, ()))
+
+    def test_close_all(self):
+        self.daemon.max_visible = 2
+        self.daemon.group_by_app = True
+        group = self.daemon.NotifyMany(self.notifications(u"a", u"b"))
+        other = self.notify(u"other", app_name=u"other")
+        queued = self.notify(u"queued", app_name=u"queued")
+        self.daemon.digest_mode = True
+        waiting = self.notify(u"waiting", app_name=u"waiting")
+        self.loop.run()
+
+        self.daemon.CloseAll()
+        self.assertEqual(self.closed,
+            [(id, 3) for id in sorted(group + [other, queued, waiting])])
+        self.assertEqual(self.loop.idle_sources(), 1)
+        self.loop.run()
+        self.assertEqual(self.renderer.windows, {})
+        self.assertEqual(len(self.daemon._pending), 0)
+
+        self.daemon.CloseAll()
+        self.assertEqual(len(self.closed), 5)
+
+
+class TestRules(DaemonTestCase):
+
+    def setUp(self):
+        DaemonTestCase.setUp(self)
+        self.daemon.rules = RuleSet.from_string(
+            u"[quiet]\nsummary = quiet\naction = history\n\n"
+            u"[spam]\nsummary = spam\naction = suppress\n")
+
+    def history(self):
+        return [(entry[3], entry[7]) for entry in self.daemon.GetHistory(10)]
+
+    def test_history_only(self):
+        id = self.notify(u"quiet")
+        self.loop.run()
+        self.assertEqual(self.renderer.windows, {})
+        self.assertEqual(self.closed, [(id, 4)])
+        self.assertEqual(self.history(), [(u"quiet", 4)])
+
+    def test_replace_history_only(self):
+        id = self.notify(u"hello")
+        self.loop.run()
+        self.assertEqual(self.notify(u"quiet", replaces_id=id), id)
+        self.assertEqual(self.notify(u"spam", replaces_id=id), id)
+        self.loop.run()
+        # The window keeps its contents, the history has the replacement.
+        self.assertEqual(self.window(id)[0], u"hello")
+        self.assertEqual(self.history(), [(u"quiet", 0), (u"hello", 5)])
+        self.daemon.CloseNotification(id)
+        self.assertEqual(self.history(), [(u"quiet", 3), (u"hello", 5)])
+
+
+class TestRateLimit(DaemonTestCase):
+
+    def setUp(self):
+        DaemonTestCase.setUp(self)
+        self.daemon.rate_limit = 0.001
+        self.daemon.rate_burst = 2
+        self.daemon.coalesce = False
+
+    def test_off_by_default(self):
+        self.assertEqual(ktm.create_argument_parser().parse_args([])
+                         .rateLimit, 0)
+
+    def test_collapse(self):
+        ids = [self.notify(u"message {}".format(x)) for x in range(5)]
+        self.loop.run()
+        self.assertEqual(sorted(self.renderer.windows), ids[:2])
+        self.assertEqual(self.closed, [(id, 4) for id in ids[2:]])
+        self.loop.advance(1000)
+        summary, = set(self.renderer.windows) - set(ids)
+        self.assertEqual(self.window(summary)[0], u"3 more from app")
+        self.assertEqual(self.daemon.GetThrottleStats(), {u"app": 3})
+
+    def test_forgets_applications(self):
+        for x in range(300):
+            for y in range(3):
+                self.notify(u"message", app_name=u"app {}".format(x))
+        self.loop.advance(1000)
+        self.daemon.CloseAll()
+        for y in range(3):
+            self.notify(u"message", app_name=u"new")
+        self.assertEqual(list(self.daemon._collapsed), [u"new"])
+        self.assertEqual(len(self.daemon.GetThrottleStats()), 256)
+
+
+class TestGroups(DaemonTestCase):
+
+    def setUp(self):
+        DaemonTestCase.setUp(self)
+        self.daemon.group_by_app = True
+        self.ids = [self.notify(u"message {}".format(x)) for x in range(3)]
+        self.loop.run()
+
+    def test_grouped(self):
+        self.assertEqual(list(self.renderer.windows), [self.ids[0]])
+        self.assertEqual(self.window(self.ids[0]),
+                         (u"message 2", 3, (u"message 0", u"message 1")))
+
+    def test_close_oldest_member(self):
+        self.daemon.CloseNotification(self.ids[0])
+        self.loop.run()
+        self.assertEqual(self.closed, [(self.ids[0], 3)])
+        self.assertEqual(self.window(self.ids[0]),
+                         (u"message 2", 2, (u"message 1",)))
+
+        # The closed notification can neither be closed again nor replaced.
+        with warnings.catch_warnings(record=True):
+            warnings.simplefilter("always")
+            self.daemon.CloseNotification(self.ids[0])
+        self.assertEqual(self.closed, [(self.ids[0], 3)])
+        id = self.notify(u"new", replaces_id=self.ids[0])
+        self.assertNotEqual(id, self.ids[0])
+        self.loop.run()
+        self.assertEqual(self.window(self.ids[0])[:2], (u"new", 3))
+
+    def test_close_newest_member(self):
+        self.daemon.CloseNotification(self.ids[2])
+        self.loop.run()
+        self.assertEqual(self.closed, [(self.ids[2], 3)])
+        self.assertEqual(self.window(self.ids[0]),
+                         (u"message 1", 2, (u"message 0",)))
+
+    def test_close_last_member(self):
+        for id in self.ids:
+            self.daemon.CloseNotification(id)
+        self.loop.run()
+        self.assertEqual(self.closed, [(id, 3) for id in self.ids])
+        self.assertEqual(self.renderer.windows, {})
+
+        # A new notification of the application starts a new group.
+        id = self.notify(u"again")
+        self.loop.run()
+        self.assertEqual(self.window(id), (u"again", 1, ()))
+
+    def test_replace_member(self):
+        self.notify(u"changed", replaces_id=self.ids[0])
+        self.loop.run()
+        self.assertEqual(self.window(self.ids[0]),
+                         (u"message 2", 3, (u"changed", u"message 1")))
+        self.notify(u"changed", replaces_id=self.ids[2])
+        self.loop.run()
+        self.assertEqual(self.window(self.ids[0])[:2], (u"changed", 3))
+        self.assertEqual(self.closed, [])
+
+    def test_click_closes_group(self):
+        self.renderer.click(self.ids[0])
+        self.loop.run()
+        self.assertEqual(self.closed, [(id, 2) for id in self.ids])
+        self.assertEqual(self.renderer.windows, {})
+
+
+class TestDigest(DaemonTestCase):
+
+    def setUp(self):
+        DaemonTestCase.setUp(self)
+        self.daemon.digest_mode = True
+        self.ids = [self.notify(u"message {}".format(x), app_name=app_name)
+                    for x, app_name in enumerate((u"mail", u"ci", u"mail"))]
+        self.loop.run()
+        self.assertEqual(self.renderer.windows, {})
+        self.daemon.digest_mode = False
+        self.loop.run()
+        self.digestID, = self.renderer.windows
+
+    def body(self, id=None):
+        id = self.digestID if id is None else id
+        return self.renderer.windows[id][1].split(u"\n")
+
+    def test_shown(self):
+        self.assertEqual(self.window(self.digestID)[:2],
+                         (u"3 notifications", 1))
+        self.assertEqual(self.body(), [u"<b>mail</b> (2)", u"  message 0",
+            u"  message 2", u"<b>ci</b> (1)", u"  message 1"])
+
+    def test_close_item(self):
+        self.daemon.CloseNotification(self.ids[1])
+        self.loop.run()
+        self.assertEqual(self.closed, [(self.ids[1], 3)])
+        self.assertEqual(self.window(self.digestID)[0], u"2 notifications")
+        self.assertEqual(self.body(),
+                         [u"<b>mail</b> (2)", u"  message 0", u"  message 2"])
+
+    def test_close_last_item(self):
+        self.daemon.CloseMany(self.ids)
+        self.loop.run()
+        self.assertEqual(self.closed, [(self.ids[0], 3), (self.ids[1], 3),
+            (self.ids[2], 3), (self.digestID, 3)])
+        self.assertEqual(self.renderer.windows, {})
+
+    def test_close_digest(self):
+        self.daemon.CloseNotification(self.digestID)
+        self.loop.run()
+        self.assertEqual(self.closed, [(id, 3) for id in self.ids] +
+                         [(self.digestID, 3)])
+        self.assertEqual(self.renderer.windows, {})
+
+    def test_replace_item(self):
+        id = self.notify(u"changed", app_name=u"ci", replaces_id=self.ids[1])
+        self.loop.run()
+        self.assertEqual(id, self.ids[1])
+        self.assertEqual(list(self.renderer.windows), [self.digestID])
+        self.assertEqual(self.window(self.digestID)[0], u"3 notifications")
+        self.assertEqual(self.body()[-2:], [u"<b>ci</b> (1)", u"  changed"])
+        self.assertEqual(self.closed, [])
+
+    def test_replace_queued_digest_item(self):
+        self.daemon.max_visible = 1
+        self.daemon.digest_mode = True
+        id = self.notify(u"message 3")
+        self.daemon.digest_mode = False
+        self.loop.run()
+        queued, = self.daemon._pending
+        self.assertEqual(self.notify(u"message 3 changed", replaces_id=id),
+                         id)
+        self.daemon.CloseNotification(self.digestID)
+        self.loop.run()
+        self.assertEqual(list(self.renderer.windows), [queued])
+        self.assertEqual(self.body(queued),
+                         [u"<b>app</b> (1)", u"  message 3 changed"])
+
+
+class TestStartup(DaemonTestCase):
+
+    def start_daemon(self):
+        """
+        @returns: a daemon that loads self.renderer like the Gtk renderer,
+                  from an idle callback.
+        """
+        renderer = self.renderer
+
+        class Daemon(ktm.NotificationDaemon):
+            def _load_renderer(self):
+                self._set_renderer(renderer)
+                return False
+
+        self.lateDaemon = Daemon(
+            None, os.path.join(self.tempDir, "late"), None)
+        self.lateDaemon.rate_limit = 0
+        return self.lateDaemon
+
+    def tearDown(self):
+        if hasattr(self, "lateDaemon"):
+            self.lateDaemon.shutdown()
+        DaemonTestCase.tearDown(self)
+
+    def test_notify_before_renderer(self):
+        daemon = self.start_daemon()
+        daemon.name_acquired()
+        id = daemon.Notify(u"app", 0, u"", u"early", u"", [], {}, -1)
+        self.assertGreater(id, 0)
+        self.assertEqual(self.renderer.windows, {})
+        self.assertNotIn("first_popup", daemon.GetStartupTimes())
+
+        self.loop.run()
+        summary, body, icon, count, earlier, position = \
+            self.renderer.windows[id]
+        self.assertEqual(summary, u"early")
+        self.assertEqual(sorted(daemon.GetStartupTimes()),
+                         ["first_popup", "name_owned"])
+
+    def test_service_file(self):
+        path = os.path.join(os.path.dirname(__file__), os.pardir, "data",
+                            "org.freedesktop.Notifications.service")
+        with open(path) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines[0], "[D-BUS Service]")
+        self.assertIn("Name=org.freedesktop.Notifications", lines)
+        self.assertIn("Exec=/usr/bin/ktm", lines)
 
 
 class TestKtm(unittest.TestCase):
@@ -25,4 +664,4 @@ class TestKtm(unittest.TestCase):
         pass
 
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
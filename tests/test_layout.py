@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_layout
+----------------------------------
+
+Tests for `ktm.layout` module.
+"""
+
+import unittest
+
+from ktm.layout import LayoutAnchor, LayoutDirection, LayoutEngine
+
+
+class TestLayoutEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = LayoutEngine(
+            LayoutAnchor.NORTH_WEST, LayoutDirection.VERTICAL,
+            (1, 2, 3, 4), (0, 0, 1000, 800))
+        for id in range(1, 5):
+            self.engine.add(id, (100, 10 * id))
+
+    def test_north_west_vertical(self):
+        self.assertEqual(self.engine.update(), [
+            (1, 4, 1), (2, 4, 11), (3, 4, 31), (4, 4, 61)])
+        self.assertEqual(self.engine.update(), [])
+
+    def test_south_east_vertical(self):
+        self.engine.anchor = LayoutAnchor.SOUTH_EAST
+        self.assertEqual(self.engine.update(), [
+            (1, 898, 787), (2, 898, 767), (3, 898, 737), (4, 898, 697)])
+
+    def test_north_east_horizontal(self):
+        self.engine.anchor = LayoutAnchor.NORTH_EAST
+        self.engine.direction = LayoutDirection.HORIZONTAL
+        self.engine.resize(2, (50, 20))
+        self.assertEqual(self.engine.update(), [
+            (1, 898, 1), (2, 848, 1), (3, 748, 1), (4, 648, 1)])
+
+    def test_south_west_horizontal_with_area_offset(self):
+        self.engine.anchor = LayoutAnchor.SOUTH_WEST
+        self.engine.direction = LayoutDirection.HORIZONTAL
+        self.engine.area = (1000, 0, 500, 400)
+        self.assertEqual(self.engine.update()[:2], [
+            (1, 1004, 387), (2, 1104, 377)])
+
+    def test_removing_newest_moves_nothing(self):
+        self.engine.update()
+        self.engine.remove(4)
+        self.assertEqual(self.engine.update(), [])
+        self.assertNotIn(4, self.engine)
+
+    def test_removing_middle_moves_newer_windows(self):
+        self.engine.update()
+        self.engine.remove(2)
+        self.assertEqual(self.engine.update(), [(3, 4, 11), (4, 4, 41)])
+        self.assertEqual(self.engine.position(1), (4, 1))
+
+    def test_resize_moves_only_following_windows(self):
+        self.engine.update()
+        self.engine.resize(3, (100, 35))
+        self.assertEqual(self.engine.update(), [(4, 4, 66)])
+        self.engine.resize(3, (100, 35))
+        self.assertEqual(self.engine.update(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
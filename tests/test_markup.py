@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_markup
+----------------------------------
+
+Tests for `ktm.markup` module.
+"""
+
+import unittest
+
+from ktm.markup import ELLIPSIS, strip_markup, truncate
+
+
+class TestStripMarkup(unittest.TestCase):
+
+    def test_tags_and_entities(self):
+        self.assertEqual(
+            strip_markup(u"<b>bold</b> &amp; <i>it&apos;s</i> &lt;3"),
+            u"bold & it's <3")
+
+    def test_cut_off_tag(self):
+        self.assertEqual(strip_markup(u"text <span fo"), u"text ")
+
+
+class TestTruncate(unittest.TestCase):
+
+    def test_short_text_unchanged(self):
+        self.assertEqual(truncate(u"a\nb", 10, 2), u"a\nb")
+        self.assertEqual(truncate(u"abc", None, None), u"abc")
+
+    def test_max_chars(self):
+        self.assertEqual(truncate(u"abcdef", 3, None), u"abc" + ELLIPSIS)
+
+    def test_max_lines(self):
+        self.assertEqual(truncate(u"a\nb\nc\n", 10, 2), u"a\nb" + ELLIPSIS)
+        self.assertEqual(truncate(u"a\nb\n", 10, 2), u"a\nb\n")
+        self.assertEqual(truncate(u"a\nb", 10, 2), u"a\nb")
+
+    def test_both(self):
+        self.assertEqual(truncate(u"a\n" * 100, 10, 3),
+                         u"a\na\na" + ELLIPSIS)
+
+
+if __name__ == '__main__':
+    unittest.main()
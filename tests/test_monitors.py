@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_monitors
+----------------------------------
+
+Tests for `ktm.monitors` module.
+"""
+
+import unittest
+
+from ktm.monitors import MonitorGeometry, parse_monitor, POINTER, PRIMARY
+
+
+class TestParseMonitor(unittest.TestCase):
+
+    def test_names(self):
+        self.assertEqual(parse_monitor("primary"), PRIMARY)
+        self.assertEqual(parse_monitor(" Pointer"), POINTER)
+
+    def test_index(self):
+        self.assertEqual(parse_monitor("1"), 1)
+        self.assertEqual(parse_monitor(0), 0)
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, parse_monitor, "left")
+        self.assertRaises(ValueError, parse_monitor, "-1")
+
+
+class TestMonitorGeometry(unittest.TestCase):
+
+    def setUp(self):
+        self.monitors = MonitorGeometry(
+            [(0, 0, 1920, 1050), (1920, 0, 1280, 1024)], primary=1)
+
+    def test_primary(self):
+        self.assertEqual(self.monitors.area(PRIMARY), (1920, 0, 1280, 1024))
+
+    def test_index(self):
+        self.assertEqual(self.monitors.area(0), (0, 0, 1920, 1050))
+
+    def test_missing_index_is_primary(self):
+        self.assertEqual(self.monitors.area(5), (1920, 0, 1280, 1024))
+
+    def test_monitor_at(self):
+        self.assertEqual(self.monitors.monitor_at(100, 100), 0)
+        self.assertEqual(self.monitors.monitor_at(1920, 0), 1)
+        self.assertEqual(self.monitors.monitor_at(100, 1060), 1)
+
+    def test_update(self):
+        self.monitors.update([(0, 0, 800, 600)], primary=3)
+        self.assertEqual(len(self.monitors), 1)
+        self.assertEqual(self.monitors.primary, 0)
+        self.assertEqual(self.monitors.area(1), (0, 0, 800, 600))
+
+    def test_no_monitors(self):
+        self.assertEqual(MonitorGeometry().area(PRIMARY), (0, 0, 0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
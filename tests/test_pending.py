@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_pending
+----------------------------------
+
+Tests for `ktm.pending` module.
+"""
+
+import unittest
+
+from ktm.notification import Notification, Urgency
+from ktm.pending import PendingQueue
+
+
+class TestPendingQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.queue = PendingQueue()
+
+    def test_fifo_within_level(self):
+        for id in range(1, 4):
+            self.queue.push(id, str(id), Urgency.NORMAL)
+        self.assertEqual([self.queue.pop() for x in range(3)],
+                         [(1, "1"), (2, "2"), (3, "3")])
+        self.assertRaises(KeyError, self.queue.pop)
+
+    def test_higher_urgency_first(self):
+        self.queue.push(1, "low", Urgency.LOW)
+        self.queue.push(2, "normal", Urgency.NORMAL)
+        self.queue.push(3, "critical", Urgency.CRITICAL)
+        self.assertEqual([self.queue.pop()[0] for x in range(3)], [3, 2, 1])
+
+    def test_replace_keeps_position(self):
+        self.queue.push(1, "a", Urgency.NORMAL)
+        self.queue.push(2, "b", Urgency.NORMAL)
+        self.queue.push(1, "a2", Urgency.NORMAL)
+        self.assertEqual(len(self.queue), 2)
+        self.assertEqual(self.queue.pop(), (1, "a2"))
+
+    def test_replace_with_other_urgency_moves(self):
+        self.queue.push(1, "a", Urgency.NORMAL)
+        self.queue.push(2, "b", Urgency.NORMAL)
+        self.queue.push(2, "b2", Urgency.CRITICAL)
+        self.assertEqual(self.queue.pop(), (2, "b2"))
+        self.assertEqual(self.queue.pop(), (1, "a"))
+        self.assertFalse(self.queue)
+
+    def test_remove(self):
+        self.queue.push(1, "a", Urgency.NORMAL)
+        self.queue.push(2, "b", Urgency.NORMAL)
+        self.assertEqual(self.queue.remove(1), "a")
+        self.assertIsNone(self.queue.remove(1))
+        self.assertNotIn(1, self.queue)
+        self.assertEqual(self.queue.pop(), (2, "b"))
+
+    def test_iter(self):
+        self.queue.push(1, "a", Urgency.LOW)
+        self.queue.push(2, "b", Urgency.CRITICAL)
+        self.queue.push(3, "c", Urgency.NORMAL)
+        self.queue.remove(3)
+        self.assertEqual(sorted(self.queue), [1, 2])
+
+    def test_notification_urgency(self):
+        notification = Notification(
+            "app", "", "summary", "body", [], {"urgency": 7}, -1)
+        self.assertEqual(notification.urgency, Urgency.CRITICAL)
+        notification.hints = {}
+        self.assertEqual(notification.urgency, Urgency.NORMAL)
+
+    def test_notification_content_key(self):
+        notification = Notification(
+            "app", "", "summary", "body", ["default", "Open"], {}, -1)
+        repeat = Notification(
+            "app", "", "summary", "body", ["default", "Open"],
+            {"urgency": 2}, 5000)
+        other = Notification(
+            "app", "", "summary", "other body", ["default", "Open"], {}, -1)
+        self.assertEqual(notification.content_key, repeat.content_key)
+        self.assertNotEqual(notification.content_key, other.content_key)
+
+    def test_notification_group(self):
+        notification = Notification(
+            "app", "", "summary", "body", [], {"x-ktm-group": "room"}, -1)
+        self.assertEqual(notification.group, "room")
+        notification.hints = {"x-ktm-group": ""}
+        self.assertIsNone(notification.group)
+        notification.hints = {}
+        self.assertIsNone(notification.group)
+
+
+if __name__ == '__main__':
+    unittest.main()
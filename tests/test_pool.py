@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_pool
+----------------------------------
+
+Tests for `ktm.pool` module.
+"""
+
+import unittest
+
+from ktm.pool import WindowPool
+
+
+class FakeWindow(object):
+
+    def __init__(self):
+        self.visible = True
+        self.resets = 0
+        self.destroyed = False
+
+    def hide(self):
+        self.visible = False
+
+    def reset(self):
+        self.resets += 1
+
+    def destroy(self):
+        self.destroyed = True
+
+
+class TestWindowPool(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = WindowPool(FakeWindow, 2)
+
+    def test_reuses_released_windows(self):
+        win = self.pool.acquire()
+        self.pool.release(win)
+        self.assertFalse(win.visible)
+        self.assertEqual(win.resets, 1)
+        self.assertIs(self.pool.acquire(), win)
+        self.assertEqual((self.pool.created, self.pool.reused), (1, 1))
+
+    def test_high_water_mark(self):
+        windows = [self.pool.acquire() for x in range(3)]
+        for win in windows:
+            self.pool.release(win)
+        self.assertEqual(len(self.pool), 2)
+        self.assertTrue(windows[2].destroyed)
+
+    def test_shrinking_destroys_idle_windows(self):
+        windows = [self.pool.acquire() for x in range(2)]
+        for win in windows:
+            self.pool.release(win)
+        self.pool.max_size = 0
+        self.assertEqual(len(self.pool), 0)
+        self.assertTrue(all(win.destroyed for win in windows))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_ratelimit
+----------------------------------
+
+Tests for `ktm.ratelimit` module.
+"""
+
+import unittest
+
+from ktm.ratelimit import RateLimiter
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        self.limiter = RateLimiter(2.0, 3, lambda: self.now)
+
+    def test_burst_then_refill(self):
+        self.assertEqual([self.limiter.allow(u"log") for x in range(5)],
+                         [True, True, True, False, False])
+        self.now += 0.5
+        self.assertTrue(self.limiter.allow(u"log"))
+        self.assertFalse(self.limiter.allow(u"log"))
+        self.assertEqual(self.limiter.throttled, {u"log": 3})
+
+    def test_applications_are_independent(self):
+        for x in range(3):
+            self.limiter.allow(u"log")
+        self.assertFalse(self.limiter.allow(u"log"))
+        self.assertTrue(self.limiter.allow(u"mail"))
+
+    def test_refill_is_capped_at_burst(self):
+        self.limiter.allow(u"log")
+        self.now += 100
+        self.assertEqual(
+            sum(self.limiter.allow(u"log") for x in range(10)), 3)
+
+    def test_disabled(self):
+        self.limiter.rate = 0
+        self.assertTrue(all(self.limiter.allow(u"log") for x in range(100)))
+
+    def test_forgets_full_buckets(self):
+        self.limiter.MAX_BUCKETS = 2
+        self.limiter.allow(u"a")
+        self.limiter.allow(u"b")
+        self.now += 10
+        self.limiter.allow(u"c")
+        self.assertEqual(list(self.limiter._buckets), [u"c"])
+
+    def test_buckets_are_capped(self):
+        self.limiter.MAX_BUCKETS = 2
+        for app_name in (u"a", u"b", u"a", u"c"):
+            self.limiter.allow(app_name)
+        # b was used least recently and is not full yet.
+        self.assertEqual(list(self.limiter._buckets), [u"a", u"c"])
+
+    def test_throttled_is_capped(self):
+        self.limiter.MAX_BUCKETS = 2
+        self.limiter.burst = 0
+        for app_name in (u"a", u"b", u"a", u"c"):
+            self.assertFalse(self.limiter.allow(app_name))
+        self.assertEqual(self.limiter.throttled, {u"a": 2, u"c": 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_render
+----------------------------------
+
+Tests for `ktm.render` module.
+"""
+
+import unittest
+
+from ktm.render import RecordingRenderer
+
+
+class TestRecordingRenderer(unittest.TestCase):
+
+    def setUp(self):
+        self.renderer = RecordingRenderer(size=(200, 50), events=10)
+
+    def test_show_move_hide(self):
+        self.assertEqual(self.renderer.show(1, "summary", "body"), (200, 50))
+        self.renderer.move(1, 10, 20)
+        self.assertEqual(self.renderer.windows[1],
+                         ["summary", "body", None, 1, (), (10, 20)])
+        self.renderer.hide(1)
+        self.assertEqual(self.renderer.windows, {})
+        self.assertEqual(
+            (self.renderer.shown, self.renderer.moved, self.renderer.hidden),
+            (1, 1, 1))
+        self.assertEqual(list(self.renderer.events), [
+            ("show", 1, "summary", "body"), ("move", 1, 10, 20),
+            ("hide", 1)])
+
+    def test_show_again_keeps_position(self):
+        self.renderer.show(1, "summary", "body")
+        self.renderer.move(1, 10, 20)
+        self.renderer.show(1, "new", "body", count=2, earlier=["summary"])
+        self.assertEqual(self.renderer.windows[1],
+                         ["new", "body", None, 2, ("summary",), (10, 20)])
+
+    def test_no_events_kept_by_default(self):
+        renderer = RecordingRenderer()
+        renderer.show(1, "summary", "body")
+        self.assertEqual(len(renderer.events), 0)
+        self.assertEqual(renderer.shown, 1)
+
+    def test_click(self):
+        clicked = []
+        self.renderer.clicked = clicked.append
+        self.renderer.show(1, "summary", "body")
+        self.renderer.click(1)
+        self.assertEqual(clicked, [1])
+
+    def test_settings_are_kept(self):
+        self.renderer.pool_size = 0
+        self.renderer.set_text_limits(10, 1)
+        self.assertEqual(self.renderer.pool_size, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
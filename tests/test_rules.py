@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_rules
+----------------------------------
+
+Tests for `ktm.rules` module.
+"""
+
+import unittest
+import warnings
+
+from ktm.notification import Notification
+from ktm.rules import ConfigError, DEFAULT_RULES, RuleSet, _SubstringMatcher
+
+
+RULES = u"""
+[chat]
+summary = New message
+action = count
+
+[ci]
+app_name = Jenkins
+urgency = low
+action = timeout, priority
+timeout = 3000
+priority = critical
+
+[spam]
+body_regex = ^(buy|win)\\b
+action = suppress
+
+[category]
+hint.category = email.arrived
+body = invoice
+action = history
+"""
+
+
+def make_notification(summary=u"", body=u"", app_name=u"app", hints=None):
+    return Notification(app_name, u"", summary, body, [], hints or {}, -1)
+
+
+class TestRuleSet(unittest.TestCase):
+
+    def setUp(self):
+        self.rules = RuleSet.from_string(RULES)
+
+    def test_substring_ignores_case(self):
+        result = self.rules.match(make_notification(u"A NEW MESSAGE from x"))
+        self.assertEqual(result.rules, [u"chat"])
+        self.assertTrue(result.count)
+
+    def test_all_conditions_must_match(self):
+        result = self.rules.match(make_notification(
+            app_name=u"jenkins", hints={u"urgency": 0}))
+        self.assertEqual(result.rules, [u"ci"])
+        self.assertEqual((result.timeout, result.priority), (3000, 2))
+        result = self.rules.match(make_notification(app_name=u"jenkins"))
+        self.assertEqual(result.rules, [])
+
+    def test_regex_and_hints(self):
+        self.assertTrue(self.rules.match(
+            make_notification(body=u"win a prize")).suppress)
+        self.assertFalse(self.rules.match(
+            make_notification(body=u"you win")).suppress)
+        result = self.rules.match(make_notification(
+            body=u"Your invoice", hints={u"category": u"email.arrived"}))
+        self.assertTrue(result.history_only)
+
+    def test_several_rules_apply_in_order(self):
+        result = self.rules.match(make_notification(
+            u"New message", u"buy now", u"Jenkins", {u"urgency": 0}))
+        self.assertEqual(result.rules, [u"chat", u"ci", u"spam"])
+
+    def test_invalid_rules_are_skipped(self):
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            rules = RuleSet.from_string(u"[a]\naction = explode\n"
+                                        u"[b]\naction = timeout\n"
+                                        u"[c]\nbody = x\naction = count\n")
+        self.assertEqual([rule.name for rule in rules.rules], [u"c"])
+        self.assertEqual(len(caught), 2)
+
+    def test_invalid_file(self):
+        for text in (u"summary = x\n", u"[a\n"):
+            self.assertRaises(ConfigError, RuleSet.from_string, text)
+
+    def test_default_rules(self):
+        rules = RuleSet.from_string(DEFAULT_RULES)
+        self.assertTrue(rules.match(make_notification(u"New message")).count)
+        self.assertFalse(rules.match(make_notification(u"Other")).count)
+
+
+class TestSubstringMatcher(unittest.TestCase):
+
+    def test_finds_overlapping_words(self):
+        matcher = _SubstringMatcher(
+            [u"new", u"new message", u"message", u"sage", u"xyz"])
+        self.assertEqual(matcher.find(u"a new message"),
+                         set([u"new", u"new message", u"message", u"sage"]))
+        self.assertEqual(matcher.find(u"nothing"), set())
+
+
+if __name__ == '__main__':
+    unittest.main()
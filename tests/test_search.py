@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_search
+----------------------------------
+
+Tests for `ktm.search` module.
+"""
+
+import random
+import unittest
+
+from ktm.search import SearchIndex, tokenize
+
+
+class TestSearchIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = SearchIndex()
+        self.index.add(0, u"mail", u"New message", u"Lunch tomorrow?")
+        self.index.add(1, u"bank", u"Your 2FA code", u"The code is 123456")
+        self.index.add(2, u"chat", u"<b>Code</b> review", u"Please have a look")
+        self.index.add(3, u"mail", u"Re: lunch", u"Sure, see you")
+
+    def test_tokenize_ignores_markup(self):
+        self.assertEqual(tokenize(u"<b>Bold</b> and <i>ITALIC</i>"),
+                         [u"bold", u"and", u"italic"])
+
+    def test_all_words_must_match(self):
+        self.assertEqual(self.index.search(u"2fa code"), [1])
+        self.assertEqual(self.index.search(u"code missing"), [])
+        self.assertEqual(self.index.search(u""), [])
+
+    def test_ranking(self):
+        # Entry 1 mentions "code" in summary and body.
+        self.assertEqual(self.index.search(u"code"), [1, 2])
+        # Same weight, newer first.
+        self.assertEqual(self.index.search(u"lunch"), [3, 0])
+        self.assertEqual(self.index.search(u"mail"), [3, 0])
+
+    def test_paging(self):
+        self.assertEqual(self.index.search(u"code", 1, 5), [2])
+        self.assertEqual(self.index.search(u"code", 0, 1), [1])
+
+    def test_out_of_order_add(self):
+        self.index.add(10, u"x", u"lunch", u"")
+        self.index.add(5, u"x", u"lunch", u"")
+        self.assertEqual(self.index.search(u"lunch", 0, 2), [10, 5])
+
+    def test_readd_changes_weight(self):
+        self.index.add(0, u"mail", u"Code code", u"code")
+        self.assertEqual(self.index.search(u"code"), [0, 1, 2])
+
+    def test_same_as_scoring_every_match(self):
+        rng = random.Random(1)
+        words = [u"a", u"b", u"c", u"d", u"e"]
+        index = SearchIndex()
+        entries = {}
+        for seq in rng.sample(range(1000), 400):
+            texts = [u" ".join(rng.choice(words)
+                               for x in range(rng.randint(0, 4)))
+                     for y in range(3)]
+            index.add(seq, *texts)
+            entries[seq] = [tokenize(text) for text in texts]
+
+        def score(tokens, word):
+            app_name, summary, body = tokens
+            return 3 * summary.count(word) + 2 * app_name.count(word) + \
+                body.count(word)
+
+        for query in [u"a", u"b c", u"a d e"]:
+            query = query.split()
+            expected = sorted(
+                ((sum(score(tokens, word) for word in query), seq)
+                 for seq, tokens in entries.items()
+                 if all(score(tokens, word) for word in query)),
+                reverse=True)
+            for offset, limit in [(0, 10), (5, 7), (0, 1000)]:
+                self.assertEqual(
+                    index.search(u" ".join(query), offset, limit),
+                    [seq for x, seq in expected[offset:offset + limit]])
+
+
+if __name__ == '__main__':
+    unittest.main()
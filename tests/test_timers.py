@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_timers
+----------------------------------
+
+Tests for `ktm.timers` module.
+"""
+
+import random
+import unittest
+
+from ktm.timers import DeadlineHeap
+
+
+class TestDeadlineHeap(unittest.TestCase):
+
+    def setUp(self):
+        self.heap = DeadlineHeap()
+
+    def test_empty(self):
+        self.assertIsNone(self.heap.next_deadline())
+        self.assertEqual(self.heap.pop_expired(1000), [])
+        self.assertFalse(self.heap.cancel(1))
+
+    def test_pop_expired_in_order(self):
+        self.heap.schedule(1, 300)
+        self.heap.schedule(2, 100)
+        self.heap.schedule(3, 200)
+        self.heap.schedule(4, 200)
+        self.assertEqual(self.heap.next_deadline(), 100)
+        self.assertEqual(self.heap.pop_expired(99), [])
+        self.assertEqual(self.heap.pop_expired(200), [2, 3, 4])
+        self.assertEqual(self.heap.next_deadline(), 300)
+        self.assertEqual(len(self.heap), 1)
+
+    def test_reschedule(self):
+        self.heap.schedule(1, 100)
+        self.heap.schedule(1, 500)
+        self.assertEqual(self.heap.next_deadline(), 500)
+        self.assertEqual(self.heap.pop_expired(499), [])
+        self.assertEqual(self.heap.pop_expired(1000), [1])
+        self.assertNotIn(1, self.heap)
+
+    def test_cancel(self):
+        self.heap.schedule(1, 100)
+        self.heap.schedule(2, 200)
+        self.assertTrue(self.heap.cancel(1))
+        self.assertNotIn(1, self.heap)
+        self.assertEqual(self.heap.next_deadline(), 200)
+        self.assertEqual(self.heap.pop_expired(1000), [2])
+
+    def test_many(self):
+        deadlines = dict((id, random.randrange(10000)) for id in range(5000))
+        for id, deadline in deadlines.items():
+            self.heap.schedule(id, deadline)
+        for id in range(0, 5000, 2):
+            self.heap.cancel(id)
+            del deadlines[id]
+        # Cancelled entries don't pile up.
+        self.assertLess(len(self.heap._heap), 2 * len(deadlines) + 64)
+        expired = self.heap.pop_expired(5000)
+        self.assertEqual(sorted(expired), sorted(
+            id for id, deadline in deadlines.items() if deadline <= 5000))
+        self.assertEqual([deadlines[id] for id in expired],
+                         sorted(deadlines[id] for id in expired))
+
+
+if __name__ == '__main__':
+    unittest.main()